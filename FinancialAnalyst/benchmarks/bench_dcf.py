@@ -0,0 +1,41 @@
+"""
+bench_dcf.py - latency & peak memory of the Monte Carlo DCF valuation (see dcf.py), which
+should take well under a second per company, even with 10^6 paths
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import pytest
+
+from fin_analysis.dcf import DCFAssumptions, monte_carlo_dcf, sensitivity_grid
+from fixtures import benchmark_fixtures
+
+SYMBOLS = list(benchmark_fixtures())
+
+
+@pytest.mark.parametrize("symbol", SYMBOLS)
+@pytest.mark.parametrize("paths", [100_000, 1_000_000])
+def bench_monte_carlo_dcf(benchmark, provider, peak_memory, paths, symbol):
+    assumptions = DCFAssumptions.from_statements(provider.statements(symbol))
+    result = benchmark(monte_carlo_dcf, assumptions, paths, seed=42)
+    peak_memory(monte_carlo_dcf, assumptions, paths, seed=42)
+    assert result.values.shape == (paths,)
+
+
+@pytest.mark.parametrize("symbol", SYMBOLS)
+def bench_dcf_valuation(benchmark, provider, symbol):
+    # assumptions from a fresh snapshot & 10^5 paths - a DCF of one company, end to end
+    def valuation():
+        assumptions = DCFAssumptions.from_statements(provider.statements(symbol))
+        return monte_carlo_dcf(assumptions, seed=42)
+
+    benchmark(valuation)
+
+
+@pytest.mark.parametrize("symbol", SYMBOLS)
+def bench_sensitivity_grid(benchmark, provider, symbol):
+    assumptions = DCFAssumptions.from_statements(provider.statements(symbol))
+    grid = benchmark(sensitivity_grid, assumptions)
+    assert grid.notna().any().any()
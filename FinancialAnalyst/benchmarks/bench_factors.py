@@ -0,0 +1,52 @@
+"""
+bench_factors.py - latency of sector-neutral factor scoring (see factors.py) over a
+synthetic cross-section of BENCH_UNIVERSE_SIZE companies (sectors from the info of the
+synthetic universe) - a full fit, an incremental update of one company & the composite
+scores
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fin_analysis.factors import FactorModel, company_sectors
+
+
+@pytest.fixture(scope="module")
+def cross_section(universe):
+    # latest ratios (log-normal, with ~5% missing) & sector of each company
+    rng = np.random.default_rng(0)
+    sectors = company_sectors(
+        universe.statements(symbol, with_prices=False) for symbol in universe.fixtures
+    )
+    names = FactorModel().ratio_names
+    values = rng.lognormal(0, 1, size=(len(sectors), len(names)))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    ratios = pd.DataFrame(values, index=sectors.index, columns=names)
+    return ratios, sectors
+
+
+def bench_factor_fit(benchmark, cross_section, peak_memory):
+    ratios, sectors = cross_section
+    model = benchmark(lambda: FactorModel().fit(ratios, sectors))
+    peak_memory(lambda: FactorModel().fit(ratios, sectors))
+    assert len(model.zscores) == len(ratios)
+
+
+def bench_factor_update(benchmark, cross_section):
+    ratios, sectors = cross_section
+    model = FactorModel().fit(ratios, sectors)
+    symbol = ratios.index[0]
+    benchmark(model.update, symbol, ratios.loc[symbol] * 1.1, sectors[symbol])
+    assert len(model.zscores) == len(ratios)
+
+
+def bench_factor_scores(benchmark, cross_section):
+    model = FactorModel(weights={"value": 2, "quality": 1, "growth": 1})
+    model.fit(*cross_section)
+    scores = benchmark(model.scores)
+    assert scores["Composite"].notna().all()
@@ -0,0 +1,54 @@
+"""
+bench_query.py - latency of screening queries (see query.py) over a synthetic
+BENCH_UNIVERSE_SIZE x 10 years table of ratios - parsing, the first query (which
+builds the sorted indexes of its ratios) & repeated queries
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fin_analysis.panel import PANEL_GROUPS
+from fin_analysis.query import RatioTable, parse_query
+from fixtures import UNIVERSE_SIZE
+
+YEARS = 10
+QUERY = (
+    "RoE > 0.15 and D/E < 1 and Revenue Growth > 10 "
+    "and (P/E < 15 or P/B between 0.5 and 1.5) and not Interest Coverage < 3"
+)
+
+
+@pytest.fixture(scope="module")
+def table():
+    # ratios of every company & year (log-normal, with ~10% missing)
+    rng = np.random.default_rng(0)
+    ratios = [ratio for group in PANEL_GROUPS.values() for ratio in group]
+    rows = pd.MultiIndex.from_product(
+        [[f"SYN{i:05d}" for i in range(UNIVERSE_SIZE)], range(2015, 2015 + YEARS)],
+        names=["symbol", "fiscal_year"],
+    )
+    values = rng.lognormal(0, 1, size=(len(rows), len(ratios))).astype(np.float32)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return values, rows, ratios
+
+
+def bench_query_parse(benchmark):
+    benchmark(parse_query.__wrapped__, QUERY)
+
+
+def bench_query_first(benchmark, table):
+    # a new table every round, so that the sorted indexes are built again
+    mask = benchmark(lambda: RatioTable(*table).mask(QUERY))
+    assert mask.shape == (len(table[1]),)
+
+
+def bench_query_warm(benchmark, table):
+    ratios = RatioTable(*table)
+    expected = ratios.mask(QUERY)
+    mask = benchmark(ratios.mask, QUERY)
+    assert (mask == expected).all()
@@ -0,0 +1,82 @@
+"""
+bench_ratios.py - latency & peak memory of the ratio functions, served from fixtures
+
+Single-symbol benchmarks time each ratio function of ratios.py & the ratio stage of a
+whole report (snapshot, prices & all six ratio tables) for each recorded company (and
+the synthetic companies of fixtures.benchmark_fixtures). Universe benchmarks time all
+ratios of a synthetic universe of BENCH_UNIVERSE_SIZE companies - vectorized
+(panel.ratio_panel) & one company at a time (the ratio functions of ratios.py).
+
+Usage (from the FinancialAnalyst/benchmarks folder):
+    pytest                                   # all benchmarks
+    pytest -m "not universe"                 # single-symbol benchmarks only
+    pytest --benchmark-save=baseline         # save results, compare later runs with
+    pytest --benchmark-compare=0001_baseline
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+from typing import List
+
+import pandas as pd
+import pytest
+
+import fin_analysis.ratios as fira
+from fin_analysis.panel import ratio_panel
+from fin_analysis.ratio_cube import RATIO_FUNCTIONS
+from fixtures import FixtureProvider, benchmark_fixtures
+
+SYMBOLS = list(benchmark_fixtures())
+
+
+def report_ratios(provider: FixtureProvider, symbol: str) -> List[pd.DataFrame]:
+    """ratio stage of a report - a fresh snapshot, its prices & all six ratio tables"""
+    statements = provider.statements(symbol)
+    return [ratio_func(statements) for ratio_func in RATIO_FUNCTIONS]
+
+
+def per_symbol_ratios(statements: List[fira.FinancialStatements]) -> int:
+    for stmts in statements:
+        for ratio_func in RATIO_FUNCTIONS:
+            ratio_func(stmts)
+    return len(statements)
+
+
+@pytest.mark.parametrize("symbol", SYMBOLS)
+@pytest.mark.parametrize("ratio_func", RATIO_FUNCTIONS, ids=lambda f: f.__name__)
+def bench_ratio_function(benchmark, provider, ratio_func, symbol):
+    statements = provider.statements(symbol)
+    ratio_func(statements)  # statements are transposed on first access, keep it out
+    table = benchmark(ratio_func, statements)
+    assert len(table) == len(statements.balance_sheet)
+
+
+@pytest.mark.parametrize("symbol", SYMBOLS)
+def bench_report(benchmark, provider, peak_memory, symbol):
+    tables = benchmark(report_ratios, provider, symbol)
+    peak_memory(report_ratios, provider, symbol)
+    assert len(tables) == len(RATIO_FUNCTIONS)
+
+
+@pytest.mark.universe
+def bench_universe_panel(benchmark, universe, peak_memory):
+    panel = benchmark.pedantic(
+        ratio_panel,
+        setup=lambda: ((universe.all_statements(),), {}),
+        rounds=3,
+    )
+    peak_memory(ratio_panel, universe.all_statements())
+    assert panel.index.get_level_values("symbol").nunique() == len(universe.fixtures)
+
+
+@pytest.mark.universe
+def bench_universe_per_symbol(benchmark, universe, peak_memory):
+    count = benchmark.pedantic(
+        per_symbol_ratios,
+        setup=lambda: ((universe.all_statements(),), {}),
+        rounds=1,
+    )
+    peak_memory(per_symbol_ratios, universe.all_statements())
+    assert count == len(universe.fixtures)
@@ -0,0 +1,33 @@
+"""
+bench_scores.py - latency & peak memory of the accounting scores (see scores.py) - one
+company at a time & the synthetic universe in one pass
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import pytest
+
+from fin_analysis.scores import accounting_scores, score_panel
+from fixtures import benchmark_fixtures
+
+SYMBOLS = list(benchmark_fixtures())
+
+
+@pytest.mark.parametrize("symbol", SYMBOLS)
+def bench_accounting_scores(benchmark, provider, symbol):
+    statements = provider.statements(symbol)
+    scores = benchmark(accounting_scores, statements)
+    assert len(scores) == len(statements.balance_sheet)
+
+
+@pytest.mark.universe
+def bench_universe_scores(benchmark, universe, peak_memory):
+    scores = benchmark.pedantic(
+        score_panel,
+        setup=lambda: ((universe.all_statements(),), {}),
+        rounds=3,
+    )
+    peak_memory(score_panel, universe.all_statements())
+    assert scores.index.get_level_values("symbol").nunique() == len(universe.fixtures)
@@ -0,0 +1,63 @@
+"""
+conftest.py - fixtures shared by the benchmarks
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import tracemalloc
+from typing import Callable
+
+import pytest
+
+from fixtures import (
+    FIXTURE_SYMBOLS,
+    SYNTHETIC_ONLY_ENV_VAR,
+    UNIVERSE_SIZE,
+    FixtureProvider,
+    benchmark_fixtures,
+    load_fixtures,
+    synthetic_universe,
+)
+
+
+def pytest_report_header(config):
+    recorded = [s for s in FIXTURE_SYMBOLS if s in load_fixtures()]
+    header = f"recorded fixtures: {', '.join(recorded) or 'none'}"
+    if os.getenv(SYNTHETIC_ONLY_ENV_VAR):
+        header += f" ({SYNTHETIC_ONLY_ENV_VAR} is set - synthetic companies only)"
+    return header
+
+
+@pytest.fixture(scope="session")
+def provider() -> FixtureProvider:
+    """serves the recorded & synthetic fixtures (see fixtures.py) - without any network call"""
+    return FixtureProvider(benchmark_fixtures())
+
+
+@pytest.fixture(scope="session")
+def universe() -> FixtureProvider:
+    """serves a synthetic universe of UNIVERSE_SIZE companies"""
+    return FixtureProvider(synthetic_universe(UNIVERSE_SIZE))
+
+
+@pytest.fixture
+def peak_memory(benchmark) -> Callable:
+    """
+    runs func(*args) once more outside the timed rounds, and records its peak memory
+    allocation (in MB, as traced by tracemalloc) in the extra info of the benchmark
+    """
+
+    def measure(func: Callable, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory_mb"] = round(peak / 2**20, 3)
+        return result
+
+    return measure
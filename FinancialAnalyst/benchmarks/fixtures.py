@@ -0,0 +1,415 @@
+"""
+fixtures.py - recorded statements of real companies & a provider that serves them offline
+
+The benchmarks must not touch the network (Yahoo! Finance latency would swamp the
+timings of the ratio functions). This module records the statements, info & closing
+prices of a set of real companies to pickle files once, and serves them to
+FinancialStatements through FixtureProvider - a stand-in for both the statement cache
+(statement_cache.StatementCache) and the price history (prices.PriceHistory).
+
+The recorded companies cover statements with & without Inventory and financial years
+ending in March, June, September & December. They are not committed to the repository,
+so record them before running the benchmarks (or set BENCH_SYNTHETIC_ONLY to benchmark
+synthetic companies only). Synthetic companies (for a universe of thousands of symbols)
+are generated with the same line items.
+
+Record (or re-record) the fixtures from the FinancialAnalyst/benchmarks folder with:
+    python fixtures.py                    # all of FIXTURE_SYMBOLS
+    python fixtures.py AAPL RELIANCE.NS   # just these
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import sys
+import pickle
+import pathlib
+import argparse
+import functools
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, str(pathlib.Path(__file__).parent.parent / "src" / "FinancialAnalyst")
+)
+
+import fin_analysis.ratios as fira
+from fin_analysis.prices import AS_OF_TOLERANCE, download_closes
+
+FIXTURES_DIR = pathlib.Path(__file__).parent / "fixtures"
+
+# number of companies in the synthetic universe
+UNIVERSE_SIZE = int(os.getenv("BENCH_UNIVERSE_SIZE", "5000"))
+# set this environment variable (to anything) to run without the recorded fixtures
+SYNTHETIC_ONLY_ENV_VAR = "BENCH_SYNTHETIC_ONLY"
+
+# real companies to record - symbol: (reports Inventory, month of financial-year-end)
+FIXTURE_SYMBOLS = {
+    "AAPL": (True, 9),
+    "MSFT": (True, 6),
+    "JPM": (False, 12),
+    "RELIANCE.NS": (True, 3),
+    "TCS.NS": (False, 3),
+    "PERSISTENT.NS": (False, 3),
+}
+
+# yf.Ticker attributes of all statements (annual & quarterly)
+STATEMENT_ATTRIBUTES = [
+    prefix + name
+    for prefix in ("", "quarterly_")
+    for name in fira.FinancialStatements.STATEMENT_NAMES
+]
+
+# line items used by the ratio functions (see fin_analysis/registry.py) & the
+# accounting scores (see fin_analysis/scores.py)
+BALANCE_SHEET_ITEMS = [
+    "Current Assets",
+    "Current Liabilities",
+    "Cash And Cash Equivalents",
+    "Inventory",
+    "Total Assets",
+    "Stockholders Equity",
+    "Total Debt",
+    "Ordinary Shares Number",
+    "Retained Earnings",
+    "Total Liabilities Net Minority Interest",
+    "Accounts Receivable",
+    "Net PPE",
+    "Long Term Debt",
+]
+INCOME_ITEMS = [
+    "Total Revenue",
+    "Cost Of Revenue",
+    "Operating Income",
+    "EBIT",
+    "EBIDTA",
+    "Interest Expense",
+    "Net Income",
+    "Gross Profit",
+    "Selling General And Administration",
+]
+CASH_FLOW_ITEMS = [
+    "Operating Cash Flow",
+    "Capital Expenditure",
+    "Free Cash Flow",
+    "Depreciation And Amortization",
+]
+
+# range of each flow of synthetic companies, as a fraction of Total Revenue
+REVENUE_FRACTIONS = {
+    "Cost Of Revenue": (0.35, 0.75),
+    "Selling General And Administration": (0.05, 0.15),
+    "Depreciation And Amortization": (0.02, 0.06),
+    "Interest Expense": (0.0, 0.03),
+    "Operating Cash Flow": (0.08, 0.25),
+    "Capital Expenditure": (0.02, 0.07),
+}
+
+# sectors (as in yf.Ticker.info) of synthetic companies
+SECTORS = [
+    "Basic Materials",
+    "Communication Services",
+    "Consumer Cyclical",
+    "Consumer Defensive",
+    "Energy",
+    "Financial Services",
+    "Healthcare",
+    "Industrials",
+    "Real Estate",
+    "Technology",
+    "Utilities",
+]
+
+
+def fixture_path(
+    symbol: str, fixtures_dir: Optional[pathlib.Path] = None
+) -> pathlib.Path:
+    return pathlib.Path(fixtures_dir or FIXTURES_DIR) / f"{symbol}.pkl"
+
+
+def record_fixture(symbol: str, fixtures_dir: Optional[pathlib.Path] = None) -> Dict:
+    """downloads statements, info & closing prices of symbol & saves them as a fixture"""
+    import yfinance as yf
+
+    ticker = yf.Ticker(symbol)
+    statements = {name: getattr(ticker, name) for name in STATEMENT_ATTRIBUTES}
+    dates = pd.DatetimeIndex([])
+    for frame in statements.values():
+        dates = dates.union(pd.DatetimeIndex(frame.columns))
+    prices = pd.Series(dtype=float)
+    if not dates.empty:
+        closes = download_closes(
+            [symbol],
+            str((dates.min() - AS_OF_TOLERANCE).date()),
+            str((dates.max() + pd.Timedelta(days=1)).date()),
+        )
+        prices = closes[symbol].dropna()
+    fixture = {
+        "symbol": symbol,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "statements": statements,
+        "info": ticker.info,
+        "prices": prices,
+    }
+    path = fixture_path(symbol, fixtures_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(str(path), "wb") as f:
+        pickle.dump(fixture, f)
+    return fixture
+
+
+def load_fixtures(fixtures_dir: Optional[pathlib.Path] = None) -> Dict[str, Dict]:
+    """all recorded fixtures in fixtures_dir, by symbol"""
+    fixtures = {}
+    for path in sorted(pathlib.Path(fixtures_dir or FIXTURES_DIR).glob("*.pkl")):
+        with open(str(path), "rb") as f:
+            fixture = pickle.load(f)
+        fixtures[fixture["symbol"]] = fixture
+    return fixtures
+
+
+@functools.lru_cache(maxsize=None)
+def _synthetic_dates(fy_month: int, years: int):
+    # financial-year-end dates, quarter-end dates & business days of the price history
+    # (shared by all synthetic companies with the same financial year)
+    last_day = pd.Timestamp(2024, fy_month, 1) + pd.offsets.MonthEnd(0)
+    dates = pd.DatetimeIndex([last_day - pd.DateOffset(years=i) for i in range(years)])
+    quarter_dates = pd.date_range(end=last_day, periods=4 * years, freq="QE")[::-1]
+    price_dates = pd.bdate_range(dates.min() - AS_OF_TOLERANCE, dates.max())
+    return dates, quarter_dates, price_dates
+
+
+def synthetic_fixture(
+    symbol: str,
+    seed: int = 0,
+    inventory: bool = True,
+    fy_month: int = 3,
+    years: int = 4,
+    sector: Optional[str] = None,
+) -> Dict:
+    """
+    a fixture of made-up (but internally consistent) statements, with the line items of
+    the ratio functions, in Yahoo's layout (line items x dates, latest date first).
+    Flows are fractions of Total Revenue (see REVENUE_FRACTIONS), so margins are
+    realistic - e.g. Free Cash Flow is always below revenue.
+    """
+    rng = np.random.default_rng(seed)
+    dates, quarter_dates, price_dates = _synthetic_dates(fy_month, years)
+    if sector is None:
+        sector = SECTORS[seed % len(SECTORS)]
+
+    def growth(dates: pd.DatetimeIndex) -> np.ndarray:
+        # growing ~5-15% a year (dates are latest first)
+        return rng.uniform(0.85, 0.95, size=len(dates)).cumprod()
+
+    def balance_sheet(items: List[str], dates: pd.DatetimeIndex, scale: float):
+        # each line item is a fraction of the company's size
+        values = rng.uniform(0.05, 1.0, size=(len(items), 1)) * scale * growth(dates)
+        return pd.DataFrame(values, index=items, columns=dates)
+
+    def flows(dates: pd.DatetimeIndex, scale: float):
+        revenue = scale * growth(dates)
+        flow = {
+            item: rng.uniform(low, high, size=len(dates)) * revenue
+            for item, (low, high) in REVENUE_FRACTIONS.items()
+        }
+        gross_profit = revenue - flow["Cost Of Revenue"]
+        ebit = gross_profit - flow["Selling General And Administration"]
+        income = {
+            "Total Revenue": revenue,
+            "Cost Of Revenue": flow["Cost Of Revenue"],
+            "Operating Income": ebit,
+            "EBIT": ebit,
+            "EBIDTA": ebit + flow["Depreciation And Amortization"],
+            "Interest Expense": flow["Interest Expense"],
+            "Net Income": (ebit - flow["Interest Expense"]) * 0.75,
+            "Gross Profit": gross_profit,
+            "Selling General And Administration": flow[
+                "Selling General And Administration"
+            ],
+        }
+        cash_flow = {
+            "Operating Cash Flow": flow["Operating Cash Flow"],
+            # Yahoo! Finance reports capital expenditure as a negative number
+            "Capital Expenditure": -flow["Capital Expenditure"],
+            "Free Cash Flow": flow["Operating Cash Flow"] - flow["Capital Expenditure"],
+            "Depreciation And Amortization": flow["Depreciation And Amortization"],
+        }
+        return (
+            pd.DataFrame(income, index=dates).T.reindex(INCOME_ITEMS),
+            pd.DataFrame(cash_flow, index=dates).T.reindex(CASH_FLOW_ITEMS),
+        )
+
+    size = float(rng.lognormal(mean=22, sigma=1.5))
+    balance_items = [i for i in BALANCE_SHEET_ITEMS if inventory or i != "Inventory"]
+    statements = {}
+    for prefix, stmt_dates, scale in (
+        ("", dates, size),
+        ("quarterly_", quarter_dates, size / 4),
+    ):
+        income, cash_flow = flows(stmt_dates, scale)
+        statements[prefix + "balance_sheet"] = balance_sheet(
+            balance_items, stmt_dates, size
+        )
+        statements[prefix + "financials"] = income
+        statements[prefix + "income_stmt"] = income
+        statements[prefix + "cash_flow"] = cash_flow
+    prices = pd.Series(
+        rng.uniform(20, 200) * np.exp(np.cumsum(rng.normal(0, 0.02, len(price_dates)))),
+        index=price_dates,
+    )
+    return {
+        "symbol": symbol,
+        "recorded_at": None,
+        "statements": statements,
+        "info": {
+            "shortName": symbol,
+            "longName": f"{symbol} (synthetic)",
+            "sector": sector,
+            "marketCap": size * 3,
+            "trailingPE": float(rng.uniform(5, 60)),
+            "currentPrice": float(prices.iloc[-1]),
+        },
+        "prices": prices,
+    }
+
+
+def synthetic_universe(n: int, seed: int = 0) -> Dict[str, Dict]:
+    """
+    n synthetic companies - ~70% report Inventory, financial years end in any quarter,
+    spread across SECTORS
+    """
+    rng = np.random.default_rng(seed)
+    inventory = rng.random(n) < 0.7
+    fy_months = rng.choice([3, 6, 9, 12], size=n)
+    sectors = rng.choice(SECTORS, size=n)
+    return {
+        f"SYN{i:05d}": synthetic_fixture(
+            f"SYN{i:05d}",
+            seed + i,
+            bool(inventory[i]),
+            int(fy_months[i]),
+            sector=str(sectors[i]),
+        )
+        for i in range(n)
+    }
+
+
+def benchmark_fixtures(fixtures_dir: Optional[pathlib.Path] = None) -> Dict[str, Dict]:
+    """
+    recorded fixtures & synthetic companies covering statements with & without
+    Inventory and financial years ending in each quarter. Raises FileNotFoundError if
+    any of FIXTURE_SYMBOLS is not recorded, unless BENCH_SYNTHETIC_ONLY is set (then
+    only the synthetic companies are served).
+    """
+    fixtures = load_fixtures(fixtures_dir)
+    missing = [s for s in FIXTURE_SYMBOLS if s not in fixtures]
+    if missing and not os.getenv(SYNTHETIC_ONLY_ENV_VAR):
+        raise FileNotFoundError(
+            f"no recorded fixtures of {', '.join(missing)} in "
+            f"{fixtures_dir or FIXTURES_DIR} - record them with `python fixtures.py` "
+            f"(downloads from Yahoo! Finance), or set {SYNTHETIC_ONLY_ENV_VAR}=1 to "
+            f"benchmark synthetic companies only"
+        )
+    for seed, (inventory, fy_month) in enumerate(
+        [(True, 3), (False, 6), (True, 9), (False, 12)]
+    ):
+        symbol = f"SYN-{'INV' if inventory else 'NOINV'}-FY{fy_month:02d}"
+        fixtures[symbol] = synthetic_fixture(symbol, seed, inventory, fy_month)
+    return fixtures
+
+
+class FixtureProvider:
+    """
+    Serves fixtures in place of the statement cache & the price history, so
+    FinancialStatements never makes a network call
+
+    Example:
+        ```python
+        provider = FixtureProvider(load_fixtures())
+        statements = provider.statements("AAPL")  # FinancialStatements(..., cache=provider)
+        print(liquidity_ratios(statements))
+        ```
+    """
+
+    def __init__(self, fixtures: Optional[Mapping[str, Dict]] = None):
+        self.fixtures: Dict[str, Dict] = dict(fixtures or {})
+
+    def add(self, fixtures: Mapping[str, Dict]):
+        self.fixtures.update(fixtures)
+
+    def _fixture(self, symbol: str) -> Dict:
+        try:
+            return self.fixtures[symbol]
+        except KeyError:
+            raise KeyError(f"no fixture for {symbol!r}") from None
+
+    # --- StatementCache interface ---
+    def get_statement(
+        self, symbol: str, name: str, loader=None, force_refresh: bool = False
+    ) -> pd.DataFrame:
+        return self._fixture(symbol)["statements"].get(name, pd.DataFrame())
+
+    def get_info(self, symbol: str, loader=None, force_refresh: bool = False) -> Dict:
+        return self._fixture(symbol)["info"]
+
+    # --- PriceHistory interface ---
+    def closes(
+        self,
+        symbols: Iterable[str],
+        start,
+        end,
+        force_refresh: bool = False,
+        last_splits: Optional[Mapping[str, pd.Timestamp]] = None,
+    ) -> pd.DataFrame:
+        symbols = list(dict.fromkeys(symbols))
+        closes = pd.DataFrame({s: self._fixture(s)["prices"] for s in symbols})
+        return closes.loc[pd.Timestamp(start) : pd.Timestamp(end)].reindex(
+            columns=symbols
+        )
+
+    def all_statements(self) -> List[fira.FinancialStatements]:
+        """fresh snapshots of all companies, with prices (loaded together)"""
+        statements = [
+            fira.FinancialStatements(symbol, cache=self) for symbol in self.fixtures
+        ]
+        fira.load_prices(statements, price_history=self)
+        return statements
+
+    def statements(
+        self, symbol: str, frequency: str = "annual", with_prices: bool = True
+    ) -> fira.FinancialStatements:
+        """a fresh FinancialStatements snapshot of symbol, served from its fixture"""
+        statements = fira.FinancialStatements(symbol, cache=self, frequency=frequency)
+        if with_prices:
+            fira.load_prices([statements], price_history=self)
+        return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record statement fixtures")
+    parser.add_argument(
+        "symbols",
+        nargs="*",
+        default=list(FIXTURE_SYMBOLS),
+        help=f"symbols to record (default: {' '.join(FIXTURE_SYMBOLS)})",
+    )
+    parser.add_argument("--fixtures-dir", default=str(FIXTURES_DIR))
+    args = parser.parse_args()
+    for symbol in args.symbols:
+        fixture = record_fixture(symbol, pathlib.Path(args.fixtures_dir))
+        balance_sheet = fixture["statements"]["balance_sheet"]
+        print(
+            f"{symbol}: {balance_sheet.shape[1]} years, "
+            f"{'with' if 'Inventory' in balance_sheet.index else 'without'} Inventory, "
+            f"{len(fixture['prices'])} daily prices"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -22,308 +22,407 @@ from datetime import datetime
 import streamlit as st
 import yaml
 from datetime import datetime
+import time
+import queue
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List
 
 # local modules
 import fin_analysis.ratios as fira
+from fin_analysis.statement_cache import default_cache
+from fin_analysis.symbol_index import default_symbol_index
+from fin_analysis.tracing import Trace, latency_summary, propagate, span
+from llm_cache import LLMResponseCache
+from digest import estimate_tokens, log_token_savings
+from report_pipeline import (
+    MAX_CONCURRENT_LLM_CALLS,
+    SECTIONS,
+    basic_info,
+    build_prompt,
+    complete_structured,
+    create_llm,
+    overall_assessment_prompt,
+    report_header,
+    section_prompts,
+    section_tables,
+    sections_report,
+    structured_prompt,
+    structured_responses,
+    write_report,
+)
 
 # for supported LLMs
 from llama_index.llms.gemini import Gemini
-from llama_index.core.llms import ChatMessage, MessageRole
-from llama_index.core import ChatPromptTemplate
-import google.generativeai as genai
 
 # load all the LLM keys from local .env file
 load_dotenv()
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
+# token counts of the overall assessment prompt are logged to the console
+logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s: %(message)s")
+logging.getLogger("digest").setLevel(logging.INFO)
 
-# instantiate the LLM & ask a question
-llm = Gemini(model="models/gemini-1.5-flash")
+# Streamlit re-runs this script on every widget interaction, so the LLM client,
+# downloaded data & LLM analyses are cached, to be created just once (per process or
+# per browser session)
 
-config_file_path = pathlib.Path(__file__).parent / "config/prompts.yaml"
-assert (
-    config_file_path.exists()
-), f"FATAL ERROR: configuration file {config_file_path} does not exist!"
+# company data (statements, ratios) cached in memory is re-used for an hour
+DATA_TTL_SECONDS = 60 * 60
+
+# number of recorded runs summarized in the performance expander
+TRACE_HISTORY = 50
+
+
+@st.cache_resource
+def get_llm() -> Gemini:
+    """instantiates the LLM, once per process"""
+    return create_llm()
+
+
+@st.cache_resource
+def get_response_cache() -> LLMResponseCache:
+    """responses to prompts already sent to Gemini are served from a local cache"""
+    return LLMResponseCache()
+
+
+# LLM analysis modes - one streamed call per section (+ one for the overall assessment),
+# or a single call that returns the analyses of all sections as a JSON object
+STREAMED_MODE = "Section by section (streamed)"
+STRUCTURED_MODE = "All sections in one call (JSON)"
+
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS)
+def get_statements(ticker_symbol: str) -> fira.FinancialStatements:
+    """statements of a company, downloaded once & shared by all sessions"""
+    return fira.FinancialStatements(ticker_symbol)
+
+
+@st.cache_data(ttl=DATA_TTL_SECONDS)
+def is_valid_ticker(ticker_symbol: str) -> bool:
+    return fira.is_valid_ticker(get_statements(ticker_symbol))
+
+
+@st.cache_data(ttl=DATA_TTL_SECONDS)
+def company_info(ticker_symbol: str) -> dict:
+    return basic_info(get_statements(ticker_symbol))
+
+
+@st.cache_data(ttl=DATA_TTL_SECONDS)
+def ratio_tables(ticker_symbol: str) -> List[pd.DataFrame]:
+    """ratio tables of all report sections (in SECTIONS order)"""
+    return section_tables(get_statements(ticker_symbol))
+
+
+def timed_stream(stream: Iterator[str], timing: Dict[str, float]) -> Iterator[str]:
+    """
+    passes on text chunks of an LLM stream, recording time to first token & total
+    generation time (in seconds) in `timing`
+    """
+    start_time = time.perf_counter()
+    for chunk in stream:
+        if "time to first token (s)" not in timing:
+            timing["time to first token (s)"] = time.perf_counter() - start_time
+        yield chunk
+    timing["total time (s)"] = time.perf_counter() - start_time
+
+
+def stream_to_queue(stream: Iterator[str], chunks: queue.Queue):
+    """runs in a worker thread - puts chunks of stream on a queue, then None (or error)"""
+    try:
+        for chunk in stream:
+            chunks.put(chunk)
+        chunks.put(None)
+    except Exception as e:
+        chunks.put(e)
+
+
+def drain_queue(chunks: queue.Queue) -> Iterator[str]:
+    """yields chunks put on the queue by stream_to_queue, until the stream ends"""
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+
+def streamed_analysis(
+    company_name: str,
+    tables: List[pd.DataFrame],
+    placeholders: list,
+    report: str,
+    refresh: bool = False,
+):
+    """
+    one LLM call per section & one for the overall assessment, streamed onto the page
+    returns (section analyses, overall assessment, timings, caption of the timings)
+    """
+    llm = get_llm()
+    response_cache = get_response_cache()
+    prompts = section_prompts(company_name, tables)
+
+    # LLM analyses of the sections don't depend on each other, so they are requested
+    # concurrently (at most MAX_CONCURRENT_LLM_CALLS at a time). Each response is
+    # streamed into a queue by a worker thread & from there onto the page, token by
+    # token, in section order (sections that finish before their turn are shown at once)
+    timings = [{} for _ in SECTIONS]
+    chunk_queues = [queue.Queue() for _ in SECTIONS]
+    responses = []
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LLM_CALLS) as executor:
+        for prompt, timing, chunks in zip(prompts, timings, chunk_queues):
+            stream = response_cache.stream_complete(llm, prompt, refresh=refresh)
+            executor.submit(
+                propagate(stream_to_queue), timed_stream(stream, timing), chunks
+            )
+        for placeholder, chunks in zip(placeholders, chunk_queues):
+            with placeholder.container():
+                responses.append(st.write_stream(drain_queue(chunks)))
+
+    # --------------- FINAL RECOMMENDATION from LLM ---------------------------
+    # (the only call that waits for all the section analyses)
+    prompt = overall_assessment_prompt(company_name, tables, responses)
+    prompt_tokens = log_token_savings(
+        build_prompt(
+            "overall_assessment_prompt",
+            company_name=company_name,
+            performance_and_assessment=report + sections_report(tables, responses),
+        ),
+        prompt,
+    )
+    overall_timing = {}
+    overall = st.write_stream(
+        timed_stream(
+            response_cache.stream_complete(llm, prompt, refresh=refresh),
+            overall_timing,
+        )
+    )
 
-# load prompts from config
-config = None
-with open(str(config_file_path), "r") as f:
-    config = yaml.safe_load(f)
+    # time to first token shows how soon text appears, compared to total time
+    # (which is how long each section used to take to show up at all)
+    timings = pd.DataFrame(
+        timings + [overall_timing],
+        index=[title for title, _, _, _ in SECTIONS] + ["Overall Assessment"],
+    )
+    caption = (
+        f"Overall assessment prompt: ~{prompt_tokens['digest']} tokens "
+        f"(~{prompt_tokens['full report']} tokens with the full report)"
+    )
+    return responses, overall, timings, caption
+
+
+def structured_analysis(
+    company_name: str,
+    tables: List[pd.DataFrame],
+    placeholders: list,
+    refresh: bool = False,
+):
+    """
+    a single LLM call for the analyses of all sections & the overall assessment, which
+    are returned as a JSON object (see structured_analysis.py) & shown in the same layout
+    returns (section analyses, overall assessment, timings, caption of the timings)
+    """
+    llm = get_llm()
+    response_cache = get_response_cache()
+    prompt = structured_prompt(company_name, tables)
+
+    start_time = time.perf_counter()
+    with st.spinner("Analyzing all ratios with a single Gemini call..."):
+        analysis = complete_structured(llm, response_cache, prompt, refresh=refresh)
+    timings = pd.DataFrame(
+        [{"total time (s)": time.perf_counter() - start_time}],
+        index=["All sections (one call)"],
+    )
 
-if config is None:
-    raise RuntimeError(
-        f"FATAL ERROR: unable to read from configuration file at {config_file_path}"
+    responses = structured_responses(analysis)
+    for placeholder, response in zip(placeholders, responses):
+        placeholder.markdown(response)
+    st.markdown(analysis.overall_recommendation)
+    caption = f"Prompt with all ratio tables: ~{estimate_tokens(prompt)} tokens"
+    return responses, analysis.overall_recommendation, timings, caption
+
+
+def invalidate_company(ticker_symbol: str):
+    """forgets all data & analyses of a company, so they are downloaded/generated again"""
+    statement_cache = default_cache()
+    if statement_cache is not None:
+        statement_cache.invalidate(ticker_symbol)
+    # (clears in-memory data of all companies, which is re-read from the local cache)
+    for cached_func in (get_statements, is_valid_ticker, company_info, ratio_tables):
+        cached_func.clear()
+    st.session_state.setdefault("analyses", {}).pop(ticker_symbol, None)
+
+
+def clear_all_caches():
+    """forgets everything - downloaded data, LLM responses & analyses of all companies"""
+    statement_cache = default_cache()
+    if statement_cache is not None:
+        statement_cache.invalidate()
+    get_response_cache().clear()
+    get_statements.clear()
+    st.cache_data.clear()
+    st.session_state["analyses"] = {}
+
+
+def show_analysis(
+    ticker_symbol: str, analyses: dict, analysis_mode: str, refresh_llm: bool = False
+):
+    """shows company info, ratio tables & LLM analysis of a company & writes its report"""
+    with span("validate ticker"):
+        valid = is_valid_ticker(ticker_symbol)
+    if not valid:
+        st.error(
+            f"{ticker_symbol} appears to be an invalid ticker symbol. Please enter a valid ticker symbol"
+        )
+        # suggest listed symbols starting with what was entered (if we have listings)
+        symbol_index = default_symbol_index()
+        if symbol_index is not None:
+            suggestions = symbol_index.complete(ticker_symbol.split(".")[0])
+            if suggestions:
+                st.info(
+                    "Did you mean: "
+                    + ", ".join(
+                        f"{s} ({symbol_index.names[s]})"
+                        if s in symbol_index.names
+                        else s
+                        for s in suggestions
+                    )
+                )
+        st.stop()
+
+    with span("company info"):
+        info = company_info(ticker_symbol)
+    report = report_header(ticker_symbol, info)
+
+    st.markdown(f"## Basic Info for {ticker_symbol}")
+    st.markdown(f"**Company Name:** {info['longName']}")
+    st.markdown(f"**Business Summary:**")
+    st.markdown(f"{info['longBusinessSummary']}")
+    st.markdown(f"## Financial Ratios")
+
+    # analysis already generated in this session (e.g. page re-run after a click)
+    analysis = analyses.get(ticker_symbol)
+    if analysis is not None and analysis["mode"] != analysis_mode:
+        analysis = None
+
+    # ratio tables of all sections are shown first, each followed by a placeholder
+    # for its LLM analysis, so the page keeps section order while analyses arrive
+    with span("ratio tables"):
+        tables = ratio_tables(ticker_symbol)
+    placeholders = []
+    for (title, _, _, _), ratio_table in zip(SECTIONS, tables):
+        st.markdown(f"### {title}:")
+        st.dataframe(ratio_table)
+        placeholder = st.empty()
+        placeholder.markdown(f"_Analyzing {title.lower()}..._")
+        placeholders.append(placeholder)
+
+    if analysis is not None:
+        for placeholder, response in zip(placeholders, analysis["responses"]):
+            placeholder.markdown(response)
+        st.markdown(analysis["overall"])
+        st.caption(f"Report saved to {analysis['report_file_path']}")
+        with st.expander("LLM generation times"):
+            st.dataframe(analysis["timings"])
+        return
+
+    if analysis_mode == STRUCTURED_MODE:
+        try:
+            responses, response, timings, timings_caption = structured_analysis(
+                info["longName"], tables, placeholders, refresh=refresh_llm
+            )
+        except ValueError as e:
+            st.error(f"Gemini did not return a valid analysis: {e}")
+            st.stop()
+    else:
+        responses, response, timings, timings_caption = streamed_analysis(
+            info["longName"], tables, placeholders, report, refresh=refresh_llm
+        )
+
+    with st.expander("LLM generation times"):
+        st.dataframe(timings)
+        st.caption(timings_caption)
+
+    cache_stats = get_response_cache().stats()
+    st.caption(
+        f"LLM response cache: {cache_stats['hits']} hits, "
+        f"{cache_stats['misses']} misses ({cache_stats['entries']} responses cached)"
     )
 
-def main():
+    # write the report to file (& add it to the searchable report index)
+    report_file_path = write_report(ticker_symbol, info, tables, responses, response)
+    analyses[ticker_symbol] = {
+        "responses": responses,
+        "overall": response,
+        "report_file_path": str(report_file_path),
+        "timings": timings,
+        "mode": analysis_mode,
+    }
 
-    NL2 = "\n\n"
-    report: str = ""
+
+def main():
 
     st.title("Financial Analysis of a Company Stock")
     st.markdown("### With LlamaIndex 🦙 and Google Gemini ♊")
     ticker_symbol = st.text_input(
         "Enter the Company Ticker as used by Yahoo! Finance (e.g AAPL, PERSISTENT.NS):"
     )
-
-    if ticker_symbol:
-        if not fira.is_valid_ticker(ticker_symbol):
-            st.error(
-                f"{ticker_symbol} appears to be an invalid ticker symbol. Please enter a valid ticker symbol"
-            )
-            st.stop()
-
-        ticker = yf.Ticker(ticker_symbol)
-
-        basic_info = f"## Basic Info for {ticker_symbol}"
-        st.markdown(basic_info)
-        report += basic_info + NL2
-
-        company_name = f"**Company Name:** {ticker.info['longName']}"
-        st.markdown(company_name)
-        report += company_name + NL2
-
-        business_summary = f"**Business Summary:**"
-        st.markdown(business_summary)
-        long_business_summary = f"{ticker.info['longBusinessSummary']}"
-        st.markdown(long_business_summary)
-        report += long_business_summary + NL2
-
-        ratios_title = f"## Financial Ratios"
-        st.markdown(ratios_title)
-        report += ratios_title + NL2
-
-        # ---- Liquidity Ratios --------------------------
-        liquidity_ratios_title = f"### Liquidity Ratios:"
-        st.markdown(liquidity_ratios_title)
-        report += liquidity_ratios_title + NL2
-
-        liquidity_ratios = fira.liquidity_ratios(ticker_symbol)
-        st.dataframe(liquidity_ratios)
-        report += liquidity_ratios.to_markdown() + NL2
-
-        # LLM analysis of liquidity ratios
-
-        # build the chat prompt (prompts text defined in config/prompts.yaml file)
-        liquidity_ratios_messages = [
-            ChatMessage(
-                role=MessageRole.SYSTEM,
-                content=config["prompts"]["system_prompt"],
-            ),
-            ChatMessage(
-                role=MessageRole.USER,
-                content=config["prompts"]["liquidity_ratios_analysis_prompt"],
-            ),
-        ]
-        liquidity_ratios_template = ChatPromptTemplate(liquidity_ratios_messages)
-        prompt = liquidity_ratios_template.format(
-            company_name=ticker.info["longName"],
-            liquidity_ratios_table=liquidity_ratios.to_markdown(),
-        )
-        response = llm.complete(prompt)
-        st.markdown(str(response))
-        report += str(response) + NL2
-
-        # ---- Profitability Ratios --------------------------
-        profitability_ratios_title = f"### Profitability Ratios:"
-        st.markdown(profitability_ratios_title)
-        report += profitability_ratios_title + NL2
-
-        profitability_ratios = fira.profitability_ratios(ticker_symbol)
-        st.dataframe(profitability_ratios)
-        report += profitability_ratios.to_markdown() + NL2
-
-        # LLM analysis of profitability ratios
-
-        # build the chat prompt (prompts text defined in config/prompts.yaml file)
-        profitability_ratios_messages = [
-            ChatMessage(
-                role=MessageRole.SYSTEM,
-                content=config["prompts"]["system_prompt"],
-            ),
-            ChatMessage(
-                role=MessageRole.USER,
-                content=config["prompts"]["profitability_ratios_analysis_prompt"],
-            ),
-        ]
-        profitability_ratios_template = ChatPromptTemplate(
-            profitability_ratios_messages
-        )
-        prompt = profitability_ratios_template.format(
-            company_name=ticker.info["longName"],
-            profitability_ratios_table=profitability_ratios.to_markdown(),
-        )
-        response = llm.complete(prompt)
-        st.markdown(str(response))
-        report += str(response) + NL2
-
-        # ---- Efficiency Ratios --------------------------
-        efficiency_ratios_title = f"### Efficiency Ratios:"
-        st.markdown(efficiency_ratios_title)
-        report += efficiency_ratios_title + NL2
-
-        efficiency_ratios = fira.efficiency_ratios(ticker_symbol)
-        st.dataframe(efficiency_ratios)
-        report += efficiency_ratios.to_markdown() + NL2
-
-        # LLM analysis of efficiency ratios
-
-        # build the chat prompt (prompts text defined in config/prompts.yaml file)
-        efficiency_ratios_messages = [
-            ChatMessage(
-                role=MessageRole.SYSTEM,
-                content=config["prompts"]["system_prompt"],
-            ),
-            ChatMessage(
-                role=MessageRole.USER,
-                content=config["prompts"]["efficiency_ratios_analysis_prompt"],
-            ),
-        ]
-        efficiency_ratios_template = ChatPromptTemplate(
-            efficiency_ratios_messages
-        )
-        prompt = efficiency_ratios_template.format(
-            company_name=ticker.info["longName"],
-            efficiency_ratios_table=efficiency_ratios.to_markdown(),
-        )
-        response = llm.complete(prompt)
-        st.markdown(str(response))
-        report += str(response) + NL2
-
-        # ---- Valuation Ratios --------------------------
-        valuation_ratios_title = f"### Valuation Ratios:"
-        st.markdown(valuation_ratios_title)
-        report += valuation_ratios_title + NL2
-
-        valuation_ratios = fira.valuation_ratios(ticker_symbol)
-        st.dataframe(valuation_ratios)
-        report += valuation_ratios.to_markdown() + NL2
-
-        # LLM analysis of valuation ratios
-
-        # build the chat prompt (prompts text defined in config/prompts.yaml file)
-        valuation_ratios_messages = [
-            ChatMessage(
-                role=MessageRole.SYSTEM,
-                content=config["prompts"]["system_prompt"],
-            ),
-            ChatMessage(
-                role=MessageRole.USER,
-                content=config["prompts"]["valuation_ratios_analysis_prompt"],
-            ),
-        ]
-        valuation_ratios_template = ChatPromptTemplate(
-            valuation_ratios_messages
-        )
-        prompt = valuation_ratios_template.format(
-            company_name=ticker.info["longName"],
-            valuation_ratios_table=valuation_ratios.to_markdown(),
-        )
-        response = llm.complete(prompt)
-        st.markdown(str(response))
-        report += str(response) + NL2
-
-        # ---- Leverage Ratios --------------------------
-        leverage_ratios_title = f"### Leverage Ratios:"
-        st.markdown(leverage_ratios_title)
-        report += leverage_ratios_title + NL2
-
-        leverage_ratios = fira.leverage_ratios(ticker_symbol)
-        st.dataframe(leverage_ratios)
-        report += leverage_ratios.to_markdown() + NL2
-
-        # LLM analysis of leverage ratios
-
-        # build the chat prompt (prompts text defined in config/prompts.yaml file)
-        leverage_ratios_messages = [
-            ChatMessage(
-                role=MessageRole.SYSTEM,
-                content=config["prompts"]["system_prompt"],
-            ),
-            ChatMessage(
-                role=MessageRole.USER,
-                content=config["prompts"]["leverage_ratios_analysis_prompt"],
-            ),
-        ]
-        leverage_ratios_template = ChatPromptTemplate(
-            leverage_ratios_messages
+    # listed symbols are used as spelled by Yahoo! Finance (e.g. BRK-B for BRK.B)
+    symbol_index = default_symbol_index()
+    if ticker_symbol and symbol_index is not None:
+        ticker_symbol = symbol_index.normalize(ticker_symbol) or ticker_symbol
+
+    # analyses generated in this browser session, by ticker symbol
+    analyses = st.session_state.setdefault("analyses", {})
+    refresh_llm = False
+
+    with st.sidebar:
+        st.markdown("### LLM analysis")
+        analysis_mode = st.radio(
+            "Analyze ratio sections",
+            [STREAMED_MODE, STRUCTURED_MODE],
+            help="A single call returns all analyses at once, as a JSON object - "
+            "fewer round-trips & prompt tokens, but nothing is shown until it's done",
         )
-        prompt = leverage_ratios_template.format(
-            company_name=ticker.info["longName"],
-            leverage_ratios_table=leverage_ratios.to_markdown(),
+        st.markdown("### Performance")
+        record_trace = st.checkbox(
+            "Record performance trace",
+            help="times each stage of the run (validation, downloads, ratios, prompts, "
+            "LLM calls, report) & shows them with p50/p95 latencies of earlier runs",
         )
-        response = llm.complete(prompt)
-        st.markdown(str(response))
-        report += str(response) + NL2
 
-        # ---- Performance & Growth Metrics --------------------------
-        performance_and_growth_metrics_title = f"### Performance & Growth Metrics:"
-        st.markdown(performance_and_growth_metrics_title)
-        report += performance_and_growth_metrics_title + NL2
-
-        performance_and_growth_metrics = fira.performance_and_growth_metrics(
-            ticker_symbol
-        )
-        st.dataframe(performance_and_growth_metrics)
-        report += performance_and_growth_metrics.to_markdown() + NL2
-
-        # LLM analysis of performance_and_growth ratios
-
-        # build the chat prompt (prompts text defined in config/prompts.yaml file)
-        performance_and_growth_metrics_messages = [
-            ChatMessage(
-                role=MessageRole.SYSTEM,
-                content=config["prompts"]["system_prompt"],
-            ),
-            ChatMessage(
-                role=MessageRole.USER,
-                content=config["prompts"]["performance_and_growth_metrics_prompt"],
-            ),
-        ]
-        performance_and_growth_metrics_template = ChatPromptTemplate(
-            performance_and_growth_metrics_messages
-        )
-        prompt = performance_and_growth_metrics_template.format(
-            company_name=ticker.info["longName"],
-            performance_and_growth_ratios_table=performance_and_growth_metrics.to_markdown(),
-        )
-        response = llm.complete(prompt)
-        st.markdown(str(response))
-        report += str(response) + NL2
-
-        # --------------- FINAL RECOMMENDATION from LLM ---------------------------
-        final_recommendation_messages = [
-            ChatMessage(
-                role=MessageRole.SYSTEM,
-                content=config["prompts"]["system_prompt"],
-            ),
-            ChatMessage(
-                role=MessageRole.USER,
-                content=config["prompts"]["overall_assessment_prompt"],
-            ),
-        ]
-        final_recommendation_template = ChatPromptTemplate(
-            final_recommendation_messages
-        )
-        prompt = final_recommendation_template.format(
-            company_name=ticker.info["longName"],
-            performance_and_assessment=report,
-        )
-        response = llm.complete(prompt)
-        st.markdown(str(response))
-        report += str(response) + NL2
-
-        # write the report to file
-        if report != "":
-            reports_dir = pathlib.Path(__file__).parent / "reports"
-            reports_dir.mkdir(exist_ok=True)
-            datetime_str = datetime.now().strftime("%d%b%Y_%H%M%S")
-            report_file_path = (
-                reports_dir / f"Analysis Report {ticker_symbol}_{datetime_str}.md"
+    if ticker_symbol:
+        with st.sidebar:
+            st.markdown("### Cached data")
+            st.caption(
+                "Data & analyses are cached, so they are not downloaded/generated "
+                "again when you interact with the page"
             )
-            with open(str(report_file_path), "w") as f:
-                f.write(report)
+            if st.button(f"Re-download data for {ticker_symbol}"):
+                invalidate_company(ticker_symbol)
+            if st.button("Re-generate LLM analysis"):
+                analyses.pop(ticker_symbol, None)
+                refresh_llm = True
+            if st.button("Clear all caches"):
+                clear_all_caches()
+                analyses = st.session_state["analyses"]
+
+    if ticker_symbol:
+        # stages of the run are timed when a performance trace is recorded
+        trace = Trace(ticker_symbol) if record_trace else contextlib.nullcontext()
+        with trace:
+            show_analysis(ticker_symbol, analyses, analysis_mode, refresh_llm)
+        if record_trace:
+            with st.expander("Performance", expanded=True):
+                st.markdown("Time taken by each stage of this run:")
+                st.dataframe(trace.spans_frame(), hide_index=True)
+                st.markdown(
+                    f"Latency of each stage over the last {TRACE_HISTORY} "
+                    f"recorded runs:"
+                )
+                st.dataframe(latency_summary(last=TRACE_HISTORY))
+                st.caption(f"Trace saved to {trace.path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+"""
+batch_reports.py - generates analysis reports of many companies, without the Streamlit UI
+
+Reads a list of ticker symbols (one per line, lines starting with # are ignored) and
+writes the same analysis report as app.py for each company to the `reports` folder.
+Statements are downloaded with a bounded pool of threads, prices of all companies with a
+single bulk download, and LLM calls of all reports share one limit on concurrent calls
+(keep it within the requests-per-minute limit of your Gemini API key).
+
+Progress is saved to a checkpoint file after each report, so a run that crashed (or was
+stopped) resumes where it left off - symbols already reported are skipped & failed
+symbols are tried again. LLM responses already received are served from the local LLM
+response cache, so a report that was cut short does not pay for them again.
+
+Usage:
+    python batch_reports.py watchlist.txt
+    python batch_reports.py watchlist.txt --fetch-workers 16 --llm-concurrency 4
+    python batch_reports.py watchlist.txt --structured --restart
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict
+
+from dotenv import load_dotenv
+
+# local modules
+import fin_analysis.ratios as fira
+from fin_analysis.tracing import Trace, latency_summary
+from llm_cache import LLMResponseCache
+from report_pipeline import (
+    MAX_CONCURRENT_LLM_CALLS,
+    REPORTS_DIR,
+    basic_info,
+    create_llm,
+    generate_analysis,
+    write_report,
+)
+from screener import fetch_universe, read_symbols
+
+
+class Checkpoint:
+    """
+    progress of a batch run, saved to a JSON file after every change - report file of
+    each symbol done & error of each symbol that failed
+    """
+
+    def __init__(self, path: pathlib.Path, restart: bool = False):
+        self.path = pathlib.Path(path)
+        self.done: Dict[str, str] = {}
+        self.failed: Dict[str, str] = {}
+        if self.path.exists() and not restart:
+            with open(str(self.path), "r") as f:
+                saved = json.load(f)
+            self.done = saved.get("done", {})
+            self.failed = saved.get("failed", {})
+        self._lock = threading.Lock()
+
+    def _save(self):
+        # write to a temporary file & rename, so a crash never leaves a half-written file
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(str(tmp_path), "w") as f:
+            json.dump({"done": self.done, "failed": self.failed}, f, indent=2)
+        os.replace(str(tmp_path), str(self.path))
+
+    def mark_done(self, symbol: str, report_file_path: pathlib.Path):
+        with self._lock:
+            self.done[symbol] = str(report_file_path)
+            self.failed.pop(symbol, None)
+            self._save()
+
+    def mark_failed(self, symbol: str, error: str):
+        with self._lock:
+            self.failed[symbol] = error
+            self._save()
+
+
+def report_company(
+    statements: fira.FinancialStatements,
+    llm,
+    response_cache: LLMResponseCache,
+    llm_executor: ThreadPoolExecutor,
+    reports_dir: pathlib.Path,
+    structured: bool = False,
+    refresh: bool = False,
+    trace: bool = False,
+) -> pathlib.Path:
+    """
+    generates & writes the report of one company, returns path of the report file
+    (set trace=True to record a performance trace of the report, see tracing.py)
+    """
+    with Trace(statements.ticker_symbol) if trace else contextlib.nullcontext():
+        tables, responses, overall = generate_analysis(
+            statements,
+            llm,
+            response_cache,
+            structured=structured,
+            llm_executor=llm_executor,
+            refresh=refresh,
+        )
+        return write_report(
+            statements.ticker_symbol,
+            basic_info(statements),
+            tables,
+            responses,
+            overall,
+            reports_dir=reports_dir,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate analysis reports for a list of companies"
+    )
+    parser.add_argument("symbols_file", help="file with one ticker symbol per line")
+    parser.add_argument(
+        "--reports-dir",
+        default=str(REPORTS_DIR),
+        help=f"folder to write reports to (default: {REPORTS_DIR})",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=8,
+        help="number of threads downloading statements (default: 8)",
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=MAX_CONCURRENT_LLM_CALLS,
+        help="max number of LLM calls at the same time, across all reports "
+        f"(default: {MAX_CONCURRENT_LLM_CALLS})",
+    )
+    parser.add_argument(
+        "--structured",
+        action="store_true",
+        help="ask for all analyses of a report with a single LLM call (JSON), instead "
+        "of one call per section & one for the overall assessment",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="PATH",
+        help="checkpoint file of the run (default: <symbols_file>.checkpoint.json)",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="ignore the checkpoint & generate reports of all symbols again",
+    )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="download statements & ask the LLM again, even if cached copies are fresh",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="record a performance trace of each report & print p50/p95 latency of "
+        "each stage at the end",
+    )
+    args = parser.parse_args()
+
+    # load all the LLM keys from local .env file
+    load_dotenv()
+
+    symbols_file_path = pathlib.Path(args.symbols_file)
+    symbols = read_symbols(symbols_file_path)
+    if not symbols:
+        print(f"No symbols found in {args.symbols_file}", file=sys.stderr)
+        sys.exit(1)
+
+    checkpoint = Checkpoint(
+        args.checkpoint
+        or symbols_file_path.with_name(f"{symbols_file_path.name}.checkpoint.json"),
+        restart=args.restart,
+    )
+    pending = [s for s in symbols if s not in checkpoint.done]
+    print(
+        f"Generating reports of {len(pending)} symbols from {args.symbols_file} "
+        f"({len(symbols) - len(pending)} already done, see {checkpoint.path})"
+    )
+    if not pending:
+        return
+
+    start_time = time.perf_counter()
+    statements, failures = fetch_universe(
+        pending, max_workers=args.fetch_workers, force_refresh=args.force_refresh
+    )
+    for symbol, error in failures.items():
+        checkpoint.mark_failed(symbol, error)
+    # prices of all companies (for valuation ratios) with one bulk download
+    fira.load_prices(statements)
+    fetch_time = time.perf_counter() - start_time
+    print(
+        f"Fetched {len(statements)} symbols ({len(failures)} failed) in {fetch_time:.2f}s"
+    )
+
+    llm = create_llm()
+    response_cache = LLMResponseCache()
+    reports_dir = pathlib.Path(args.reports_dir)
+    llm_workers = max(args.llm_concurrency, 1)
+    # reports are put together by one pool of threads, while their LLM calls run on
+    # another - which limits the number of concurrent LLM calls across all reports
+    with ThreadPoolExecutor(max_workers=llm_workers) as llm_executor:
+        with ThreadPoolExecutor(max_workers=llm_workers) as report_executor:
+            futures = {
+                report_executor.submit(
+                    report_company,
+                    stmts,
+                    llm,
+                    response_cache,
+                    llm_executor,
+                    reports_dir,
+                    args.structured,
+                    args.force_refresh,
+                    args.trace,
+                ): stmts.ticker_symbol
+                for stmts in statements
+            }
+            written = 0
+            for count, future in enumerate(as_completed(futures), start=1):
+                symbol = futures[future]
+                try:
+                    report_file_path = future.result()
+                    checkpoint.mark_done(symbol, report_file_path)
+                    written += 1
+                    print(f"[{count}/{len(futures)}] {symbol}: {report_file_path}")
+                except Exception as e:
+                    checkpoint.mark_failed(symbol, f"{type(e).__name__}: {e}")
+                    print(f"[{count}/{len(futures)}] {symbol}: FAILED ({e})")
+
+    total_time = time.perf_counter() - start_time
+    print(
+        f"Wrote {written} reports in {total_time:.2f}s, {len(checkpoint.failed)} "
+        f"symbols failed (run again to retry them)"
+    )
+    if args.trace and written:
+        print(f"Latency of each stage over the last {written} reports:")
+        print(latency_summary(last=written).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+digest.py - compact digest of the ratio sections, for the overall assessment prompt
+
+The overall assessment used to be asked for with the whole report (business summary,
+all six ratio tables & all six LLM analyses) in the prompt, which made it the most
+expensive & slowest LLM call. This module builds a compact digest instead - the key
+values of each ratio and the verdict of each section's analysis - and shrinks it step
+by step (fewer years, shorter verdicts) until it fits within a token budget.
+
+Tokens are estimated locally (no call to the LLM's tokenizer), which is close enough
+to decide how much detail fits in the budget.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import re
+import math
+import logging
+from typing import List, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# default token budget of the digest (set FINANCIAL_ANALYST_DIGEST_TOKENS to change)
+DEFAULT_TOKEN_BUDGET = 1500
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    fast local estimate of the number of LLM tokens in text - the larger of the number
+    of words & punctuation marks and (number of characters / 4), as English text
+    averages about 4 characters per token
+    """
+    if not text:
+        return 0
+    return max(len(_TOKEN_PATTERN.findall(text)), math.ceil(len(text) / 4))
+
+
+def section_verdict(response: str, max_sentences: int = 2) -> str:
+    """
+    returns the verdict of a section's analysis - first sentences of the overall
+    assessment that follows the title (the prompts ask for title, assessment & a
+    bulleted list of reasons)
+    """
+    paragraph = []
+    for line in response.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            if paragraph:
+                break
+            continue
+        if line.startswith(("-", "*", "+")) or re.match(r"^\d+\.", line):
+            break
+        paragraph.append(line)
+    text = " ".join(paragraph).replace("**", "")
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    return " ".join(sentences[:max_sentences]).strip()
+
+
+def _format_value(value) -> str:
+    if pd.isna(value):
+        return "n/a"
+    return f"{value:.4g}"
+
+
+def key_ratios(table: pd.DataFrame, years: int = 0) -> List[str]:
+    """
+    one line per ratio, with its values of the last `years` financial years
+    (0 = all years, 1 = latest year only)
+    """
+    table = table.sort_index()
+    if years:
+        table = table.iloc[-years:]
+    labels = [
+        str(d.year) if isinstance(d, pd.Timestamp) else str(d) for d in table.index
+    ]
+    lines = []
+    for column in table.columns:
+        values = ", ".join(
+            f"{label}: {_format_value(v)}" for label, v in zip(labels, table[column])
+        )
+        lines.append(f"- {column}: {values}")
+    return lines
+
+
+# digest levels, from most to least detailed - (years of ratio values, verdict sentences)
+DETAIL_LEVELS = [(0, 3), (3, 2), (2, 2), (1, 1), (1, 0)]
+
+
+def build_digest(
+    titles: Sequence[str],
+    tables: Sequence[pd.DataFrame],
+    responses: Sequence[str],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> str:
+    """
+    Builds a compact digest of the ratio sections - key ratio values & the verdict of
+    each section's analysis - at the most detailed level that fits in token_budget
+    (see DETAIL_LEVELS). If even the least detailed digest does not fit, lines are
+    dropped from its end until it does.
+
+    Args:
+        titles - section titles (e.g. "Liquidity Ratios")
+        tables - ratio table of each section
+        responses - LLM analysis of each section
+        token_budget - max number of tokens (as estimated by estimate_tokens)
+    """
+    digest = ""
+    for years, sentences in DETAIL_LEVELS:
+        parts = []
+        for title, table, response in zip(titles, tables, responses):
+            parts.append(f"### {title}")
+            parts.extend(key_ratios(table, years))
+            verdict = section_verdict(response, sentences) if sentences else ""
+            if verdict:
+                parts.append(f"Verdict: {verdict}")
+        digest = "\n".join(parts)
+        if estimate_tokens(digest) <= token_budget:
+            return digest
+    # drop lines from the end until it fits
+    lines = digest.split("\n")
+    while lines and estimate_tokens("\n".join(lines)) > token_budget:
+        lines.pop()
+    return "\n".join(lines)
+
+
+def log_token_savings(full_prompt: str, digest_prompt: str) -> dict:
+    """logs (& returns) estimated tokens of the full-report prompt vs the digest prompt"""
+    full_tokens = estimate_tokens(full_prompt)
+    digest_tokens = estimate_tokens(digest_prompt)
+    logger.info(
+        f"Overall assessment prompt: {full_tokens} tokens with full report, "
+        f"{digest_tokens} tokens with digest "
+        f"({100.0 * (1 - digest_tokens / max(full_tokens, 1)):.0f}% fewer)"
+    )
+    return {"full report": full_tokens, "digest": digest_tokens}
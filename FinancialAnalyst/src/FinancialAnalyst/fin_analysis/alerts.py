@@ -0,0 +1,422 @@
+"""
+alerts.py - threshold alerts on ratios, evaluated incrementally as statements refresh
+
+The ratio functions (see ratios.py) spell out danger thresholds, e.g. Current Ratio < 1
+is risky, Interest Coverage < 3 means higher risk of default & D/E > 2 is a high debt
+burden. This module keeps such rules - queries as in query.py - in a local SQLite
+database and checks them against the latest period of each company's ratio history
+(see history.py). Instead of rescanning the whole watchlist on every refresh, the
+AlertEngine keeps an index of ratio -> rules that use it, and after a company's ratio
+history is refreshed it checks only
+    - that company, and only if its latest period's ratios changed, and
+    - the rules that use any of the ratios that changed.
+A rule that starts matching a company adds a "triggered" alert to an outbox table (and
+a "cleared" alert when it stops matching), so the same alert is not raised on every
+refresh. Other code (e.g. a notifier) reads pending alerts with outbox() & marks them
+as delivered with mark_delivered().
+
+Example:
+    ```python
+    engine = AlertEngine()  # with DEFAULT_RULES
+    engine.add_rule(AlertRule("Expensive", "P/E > 40", "priced for perfection"))
+    alerts = engine.refresh(FinancialStatements("TCS.NS", force_refresh=True))
+    for alert in engine.outbox():
+        print(alert.message)
+    ```
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from .history import RatioHistoryStore, RefreshResult
+from .query import Node, QueryError, RatioTable, parse_query, ratio_aliases
+from .ratios import FinancialStatements
+from .statement_cache import connect
+
+TRIGGERED = "triggered"
+CLEARED = "cleared"
+
+
+class AlertRule:
+    """
+    A named query over a company's latest ratios, that raises an alert when it matches
+
+    Args:
+        name (str) - unique name of the rule
+        expression (str) - query over ratios, e.g. "Current Ratio < 1" (see query.py)
+        description (str) - what a match means, used in alert messages
+    """
+
+    def __init__(self, name: str, expression: str, description: str = ""):
+        self.name = name
+        self.expression = expression
+        self.description = description
+        self.node: Node = parse_query(expression)
+
+    def inputs(self, ratios: Iterable[str]) -> List[str]:
+        """names of the ratios (out of `ratios`) used by the rule"""
+        aliases = ratio_aliases(ratios)
+        inputs = []
+        for name in self.node.ratios():
+            try:
+                inputs.append(aliases[name.strip().lower()])
+            except KeyError:
+                raise QueryError(
+                    f"unknown ratio {name!r} in rule {self.name!r}"
+                ) from None
+        return list(dict.fromkeys(inputs))
+
+    def __repr__(self):
+        return f"AlertRule({self.name!r}, {self.expression!r})"
+
+
+# danger thresholds from the docstrings of the ratio functions in ratios.py
+DEFAULT_RULES = [
+    AlertRule(
+        "Low current ratio",
+        "Current Ratio < 1",
+        "may not be able to cover its short-term liabilities",
+    ),
+    AlertRule(
+        "Low interest coverage",
+        "Interest Coverage < 3",
+        "higher risk of defaulting on its debt",
+    ),
+    AlertRule("High debt burden", "D/E > 2", "high debt burden"),
+    AlertRule("Loss making", "Net Profit Margin < 0", "loss making business"),
+    AlertRule("Declining EPS", "EPS Growth < 0", "earnings per share are declining"),
+    AlertRule("Declining FCF", "FCF Growth < 0", "free cash flow is declining"),
+]
+
+
+class Alert:
+    """
+    A rule that started (event "triggered") or stopped ("cleared") matching a company
+
+    Attributes:
+        id (int) - id of the alert in the outbox
+        symbol (str) - ticker symbol of the company
+        rule (str) - name of the rule
+        event (str) - "triggered" or "cleared"
+        period_end (str) - end date of the period whose ratios were checked
+        values (dict) - values of the rule's ratios
+        message (str) - human readable alert
+        created_at (float) - when the alert was raised (seconds since the epoch)
+    """
+
+    def __init__(
+        self,
+        id: Optional[int],
+        symbol: str,
+        rule: str,
+        event: str,
+        period_end: str,
+        values: Dict[str, Optional[float]],
+        message: str,
+        created_at: float,
+    ):
+        self.id = id
+        self.symbol = symbol
+        self.rule = rule
+        self.event = event
+        self.period_end = period_end
+        self.values = values
+        self.message = message
+        self.created_at = created_at
+
+    def __repr__(self):
+        return f"Alert({self.symbol!r}, {self.rule!r}, {self.event!r})"
+
+
+def _format_values(values: Dict[str, Optional[float]]) -> str:
+    return ", ".join(
+        f"{name} = {'n/a' if value is None else f'{value:.4g}'}"
+        for name, value in values.items()
+    )
+
+
+class AlertEngine:
+    """
+    SQLite backed rules, rule state & outbox of alerts on the ratio history of companies
+
+    Args:
+        store (RatioHistoryStore) - ratio history the rules are checked against
+            (default: RatioHistoryStore() in the statement cache folder)
+        rules (list) - rules to save when the database is first created
+            (default: DEFAULT_RULES)
+    """
+
+    def __init__(
+        self,
+        store: Optional[RatioHistoryStore] = None,
+        rules: Optional[Iterable[AlertRule]] = None,
+    ):
+        self.store = store if store is not None else RatioHistoryStore()
+        self.db_path = self.store.cache_dir / "alerts.sqlite"
+        self._create_tables(DEFAULT_RULES if rules is None else rules)
+        self._load_rules()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _create_tables(self, rules: Iterable[AlertRule]):
+        with self._connect() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alert_rules'"
+            ).fetchone()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS alert_rules (
+                    name TEXT PRIMARY KEY,
+                    expression TEXT NOT NULL,
+                    description TEXT NOT NULL
+                )
+                """)
+            # whether each rule matched each company when it was last checked
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS alert_state (
+                    symbol TEXT NOT NULL,
+                    rule TEXT NOT NULL,
+                    period_end TEXT NOT NULL,
+                    triggered INTEGER NOT NULL,
+                    checked_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, rule)
+                )
+                """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS alert_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    rule TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    period_end TEXT NOT NULL,
+                    ratios TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    delivered_at REAL
+                )
+                """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS alert_outbox_pending
+                ON alert_outbox (delivered_at, id)
+                """)
+            if not exists:
+                conn.executemany(
+                    "INSERT INTO alert_rules VALUES (?, ?, ?)",
+                    [(r.name, r.expression, r.description) for r in rules],
+                )
+
+    def _load_rules(self):
+        # rules, their input ratios & the index of ratio -> names of rules that use it
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, expression, description FROM alert_rules ORDER BY name"
+            ).fetchall()
+        self.rules: Dict[str, AlertRule] = {}
+        self.rule_inputs: Dict[str, List[str]] = {}
+        self.rules_by_ratio: Dict[str, Set[str]] = {}
+        for name, expression, description in rows:
+            rule = AlertRule(name, expression, description)
+            self.rules[name] = rule
+            self.rule_inputs[name] = rule.inputs(self.store.ratios)
+            for ratio in self.rule_inputs[name]:
+                self.rules_by_ratio.setdefault(ratio, set()).add(name)
+
+    def add_rule(self, rule: AlertRule):
+        """
+        saves a rule (replacing the rule of the same name). It is checked against a
+        company on the company's next refresh - call scan() to check it right away.
+        """
+        rule.inputs(self.store.ratios)  # raises QueryError for unknown ratios
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO alert_rules VALUES (?, ?, ?)",
+                (rule.name, rule.expression, rule.description),
+            )
+            conn.execute("DELETE FROM alert_state WHERE rule = ?", (rule.name,))
+        self._load_rules()
+
+    def remove_rule(self, name: str):
+        """deletes a rule & its state (alerts already in the outbox are kept)"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM alert_rules WHERE name = ?", (name,))
+            conn.execute("DELETE FROM alert_state WHERE rule = ?", (name,))
+        self._load_rules()
+
+    def rules_to_check(self, result: RefreshResult) -> Set[str]:
+        """names of the rules whose input ratios changed in the latest period"""
+        if result.history.empty:
+            return set()
+        latest = result.history.index[-1]
+        changed = result.changed_ratios.get(latest, set())
+        return {
+            rule for ratio in changed for rule in self.rules_by_ratio.get(ratio, ())
+        }
+
+    def process(self, results: Iterable[RefreshResult]) -> List[Alert]:
+        """
+        checks the rules affected by refreshes of companies' ratio history (see
+        RatioHistoryStore.refresh) & adds alerts of rules that started or stopped
+        matching to the outbox
+
+        Returns:
+            the new alerts
+        """
+        to_check = {}
+        latest = {}
+        for result in results:
+            rules = self.rules_to_check(result)
+            if rules:
+                to_check[result.symbol] = rules
+                latest[result.symbol] = result.history.iloc[-1]
+        return self._evaluate(latest, to_check)
+
+    def refresh(self, statements: FinancialStatements) -> List[Alert]:
+        """refreshes the ratio history of a company & checks the affected rules"""
+        return self.process([self.store.refresh(statements)])
+
+    def scan(
+        self,
+        symbols: Optional[Iterable[str]] = None,
+        rules: Optional[Iterable[str]] = None,
+    ) -> List[Alert]:
+        """
+        checks rules (default: all) against the latest stored ratios of companies
+        (default: all companies in the ratio history), e.g. after adding a rule
+        """
+        symbols = list(symbols) if symbols is not None else self.store.symbols()
+        rules = set(rules) if rules is not None else set(self.rules)
+        latest = {}
+        for symbol in symbols:
+            history = self.store.load(symbol)
+            if not history.empty:
+                latest[symbol] = history.iloc[-1]
+        return self._evaluate(latest, {symbol: rules for symbol in latest})
+
+    def _evaluate(
+        self, latest: Dict[str, pd.Series], to_check: Dict[str, Set[str]]
+    ) -> List[Alert]:
+        # latest - symbol -> latest period's ratios (named by the period-end date),
+        # to_check - symbol -> names of rules to check for it
+        if not latest:
+            return []
+        period_ends = {s: str(pd.Timestamp(r.name).date()) for s, r in latest.items()}
+        latest = pd.DataFrame(
+            [row.reindex(self.store.ratios) for row in latest.values()],
+            index=list(latest),
+        ).astype(float)
+        table = RatioTable.from_frame(latest)
+        state = self._load_state(list(to_check))
+        now = time.time()
+
+        alerts, state_rows = [], []
+        for name in sorted({rule for rules in to_check.values() for rule in rules}):
+            rule = self.rules[name]
+            rows = np.array([name in to_check.get(s, ()) for s in latest.index])
+            # companies without values of the rule's ratios keep their state
+            rows &= table.available(self.rule_inputs[name])
+            matches = rule.node.evaluate(table)
+            for i in np.flatnonzero(rows):
+                symbol = latest.index[i]
+                triggered = bool(matches[i])
+                state_rows.append(
+                    (symbol, name, period_ends[symbol], int(triggered), now)
+                )
+                if triggered == state.get((symbol, name), False):
+                    continue
+                values = {
+                    ratio: None if pd.isna(v) else float(v)
+                    for ratio, v in latest.loc[symbol, self.rule_inputs[name]].items()
+                }
+                event = TRIGGERED if triggered else CLEARED
+                message = (
+                    f"{symbol}: {name} ({rule.expression}) "
+                    + (f"- {rule.description}" if triggered else "no longer matches")
+                    + f" [{_format_values(values)}, period ending {period_ends[symbol]}]"
+                )
+                alerts.append(
+                    Alert(
+                        None,
+                        symbol,
+                        name,
+                        event,
+                        period_ends[symbol],
+                        values,
+                        message,
+                        now,
+                    )
+                )
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO alert_state VALUES (?, ?, ?, ?, ?)",
+                state_rows,
+            )
+            for alert in alerts:
+                alert.id = conn.execute(
+                    """
+                    INSERT INTO alert_outbox
+                    (symbol, rule, event, period_end, ratios, message, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        alert.symbol,
+                        alert.rule,
+                        alert.event,
+                        alert.period_end,
+                        json.dumps(alert.values),
+                        alert.message,
+                        alert.created_at,
+                    ),
+                ).lastrowid
+        return alerts
+
+    def _load_state(self, symbols: List[str]) -> Dict[tuple, bool]:
+        # (symbol, rule) -> whether the rule matched when it was last checked
+        state = {}
+        with self._connect() as conn:
+            for start in range(0, len(symbols), 500):
+                batch = symbols[start : start + 500]
+                rows = conn.execute(
+                    f"""
+                    SELECT symbol, rule, triggered FROM alert_state
+                    WHERE symbol IN ({", ".join("?" * len(batch))})
+                    """,
+                    batch,
+                ).fetchall()
+                state.update({(s, r): bool(t) for s, r, t in rows})
+        return state
+
+    def outbox(self, pending: bool = True, limit: Optional[int] = None) -> List[Alert]:
+        """alerts in the outbox, oldest first (only those not yet delivered by default)"""
+        sql = """
+            SELECT id, symbol, rule, event, period_end, ratios, message, created_at
+            FROM alert_outbox
+            """
+        if pending:
+            sql += " WHERE delivered_at IS NULL"
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            rows = conn.execute(sql).fetchall()
+        return [
+            Alert(id, symbol, rule, event, period_end, json.loads(ratios), msg, at)
+            for id, symbol, rule, event, period_end, ratios, msg, at in rows
+        ]
+
+    def mark_delivered(self, ids: Iterable[int]):
+        """marks alerts of the outbox as delivered"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE alert_outbox SET delivered_at = ? WHERE id = ?",
+                [(now, int(id)) for id in ids],
+            )
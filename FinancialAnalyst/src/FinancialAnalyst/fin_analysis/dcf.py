@@ -0,0 +1,335 @@
+"""
+dcf.py - intrinsic value of a company with a Monte Carlo discounted cash flow (DCF) model
+
+The ratio functions of ratios.py look back at what a company has done. This module
+estimates what its shares are worth, from the same Free Cash Flow & Total Revenue
+series (so it needs no downloads beyond those of the company's FinancialStatements).
+
+Free cash flow is projected as revenue x FCF margin over PROJECTION_YEARS, with revenue
+growth fading linearly to the terminal growth rate by the last year, and a terminal
+value (Gordon growth) after it. Everything is discounted at the WACC, net debt is
+taken off & the equity value is divided by the shares outstanding. Growth, FCF margin
+& WACC are uncertain, so each is drawn from a normal distribution (centred on the
+company's history) for each of 10^5-10^6 simulated paths. All paths are simulated at
+once with NumPy arrays (in chunks of CHUNK_SIZE paths, to bound memory), which takes
+well under a second per company.
+
+Example:
+    ```python
+    statements = FinancialStatements("TCS.NS")
+    result = dcf_valuation(statements, paths=200_000)
+    print(result.summary())  # percentiles of value per share, P(undervalued)...
+    print(sensitivity_grid(result.assumptions))  # value per share, WACC x terminal growth
+    ```
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .ratios import FinancialStatements, get_statements
+from .tracing import traced
+
+# cash flows are projected over this many years, before the terminal value
+PROJECTION_YEARS = 5
+# default number of simulated paths
+DEFAULT_PATHS = 100_000
+# paths simulated at a time (memory used is ~ 6 arrays of CHUNK_SIZE x years floats)
+CHUNK_SIZE = 250_000
+
+# WACC = E/(D+E) x cost of equity + D/(D+E) x cost of debt x (1 - tax rate), with cost
+# of equity from CAPM = risk free rate + beta x equity risk premium
+RISK_FREE_RATE = 0.04
+EQUITY_RISK_PREMIUM = 0.055
+TAX_RATE = 0.25
+# WACC if it can't be estimated (e.g. no beta or market cap), & the range it is kept in
+DEFAULT_WACC = 0.09
+WACC_RANGE = (0.05, 0.20)
+TERMINAL_GROWTH = 0.025
+# WACC of each path is at least terminal growth + this spread (else the terminal value
+# of the path would be infinite or negative)
+MIN_WACC_SPREAD = 0.01
+
+
+class DCFAssumptions:
+    """
+    Inputs of the DCF model - base revenue, distributions of revenue growth, FCF margin
+    & WACC (mean & standard deviation, as fractions), terminal growth, net debt, shares
+    outstanding & the current share price. Use from_statements to estimate them from a
+    company's history & override any of them (e.g. wacc_mean=0.11).
+    """
+
+    def __init__(
+        self,
+        revenue: float,
+        growth_mean: float,
+        growth_std: float,
+        margin_mean: float,
+        margin_std: float,
+        wacc_mean: float = DEFAULT_WACC,
+        wacc_std: float = 0.01,
+        terminal_growth: float = TERMINAL_GROWTH,
+        net_debt: float = 0.0,
+        shares: float = 1.0,
+        price: float = np.nan,
+        ticker_symbol: Optional[str] = None,
+    ):
+        if shares <= 0 or not np.isfinite(shares):
+            raise ValueError(f"shares outstanding must be > 0 (got {shares})")
+        self.revenue = revenue
+        self.growth_mean = growth_mean
+        self.growth_std = growth_std
+        self.margin_mean = margin_mean
+        self.margin_std = margin_std
+        self.wacc_mean = wacc_mean
+        self.wacc_std = wacc_std
+        self.terminal_growth = terminal_growth
+        self.net_debt = net_debt
+        self.shares = shares
+        self.price = price
+        self.ticker_symbol = ticker_symbol
+
+    @classmethod
+    def from_statements(
+        cls, ticker_symbol: Union[str, FinancialStatements], **overrides
+    ) -> "DCFAssumptions":
+        """
+        estimates the assumptions from the statements of a company - growth & FCF margin
+        from its yearly revenue growth & Free Cash Flow / Total Revenue (with a floor on
+        their standard deviations, as a few years of history understate uncertainty),
+        WACC from beta, market cap, debt & interest expense (see estimate_wacc)
+        & the current share price from info (period-end closes of statements.prices
+        can be up to a year old). Statements must be annual.
+        """
+        statements = get_statements(ticker_symbol)
+        if statements.frequency != "annual":
+            raise ValueError(
+                f"DCF needs annual statements, got {statements.frequency} statements "
+                f"of {statements.ticker_symbol}"
+            )
+        financials = statements.financials
+        balance_sheet = statements.balance_sheet
+        if "Free Cash Flow" not in statements.cash_flow.columns:
+            raise ValueError(f"{statements.ticker_symbol} reports no Free Cash Flow")
+        revenue = financials["Total Revenue"].dropna()
+        if revenue.empty:
+            raise ValueError(f"{statements.ticker_symbol} reports no Total Revenue")
+        margins = (statements.cash_flow["Free Cash Flow"] / revenue).dropna()
+        growth = revenue.pct_change().dropna()
+
+        latest = balance_sheet.iloc[-1]
+        net_debt = np.nan_to_num(latest.get("Total Debt", np.nan)) - np.nan_to_num(
+            latest.get("Cash And Cash Equivalents", np.nan)
+        )
+        info = statements.info
+        price = info.get("currentPrice") or info.get("regularMarketPrice") or np.nan
+
+        assumptions = dict(
+            revenue=float(revenue.iloc[-1]),
+            growth_mean=(
+                float(np.clip(growth.mean(), -0.10, 0.25)) if not growth.empty else 0.0
+            ),
+            growth_std=max(float(np.nan_to_num(growth.std())), 0.02),
+            margin_mean=float(margins.mean()) if not margins.empty else 0.0,
+            margin_std=max(float(np.nan_to_num(margins.std())), 0.01),
+            wacc_mean=estimate_wacc(statements),
+            net_debt=float(net_debt),
+            shares=float(latest.get("Ordinary Shares Number", np.nan)),
+            price=float(price),
+            ticker_symbol=statements.ticker_symbol,
+        )
+        assumptions.update(overrides)
+        return cls(**assumptions)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"DCFAssumptions({fields})"
+
+
+def estimate_wacc(ticker_symbol: Union[str, FinancialStatements]) -> float:
+    """
+    weighted average cost of capital of a company, from beta & market cap (info) and
+    total debt & interest expense of the latest year (DEFAULT_WACC if any are missing)
+    """
+    statements = get_statements(ticker_symbol)
+    beta = statements.info.get("beta")
+    equity = statements.info.get("marketCap")
+    if not beta or not equity:
+        return DEFAULT_WACC
+    cost_of_equity = RISK_FREE_RATE + beta * EQUITY_RISK_PREMIUM
+    debt = np.nan_to_num(statements.balance_sheet.iloc[-1].get("Total Debt", np.nan))
+    interest = np.nan_to_num(
+        statements.financials.iloc[-1].get("Interest Expense", np.nan)
+    )
+    cost_of_debt = interest / debt if debt > 0 else 0.0
+    wacc = (equity * cost_of_equity + debt * cost_of_debt * (1 - TAX_RATE)) / (
+        equity + debt
+    )
+    return float(np.clip(wacc, *WACC_RANGE))
+
+
+def _discount_factors(wacc: np.ndarray, years: int) -> np.ndarray:
+    # (1 + wacc)^-t for t = 1..years, one row per wacc
+    t = np.arange(1, years + 1)
+    return np.exp(-np.log1p(wacc)[..., None] * t)
+
+
+def _growth_paths(
+    growth: np.ndarray, terminal_growth: np.ndarray, years: int
+) -> np.ndarray:
+    # growth of each year, fading linearly from `growth` to `terminal_growth`
+    fade = np.arange(1, years + 1) / years
+    return growth[..., None] * (1 - fade) + terminal_growth[..., None] * fade
+
+
+def _values_per_share(
+    assumptions: DCFAssumptions,
+    growth: np.ndarray,
+    margin: np.ndarray,
+    wacc: np.ndarray,
+    terminal_growth: np.ndarray,
+    years: int,
+) -> np.ndarray:
+    """value per share of each (broadcast) combination of growth, margin & WACC"""
+    revenue = assumptions.revenue * np.cumprod(
+        1 + _growth_paths(growth, terminal_growth, years), axis=-1
+    )
+    fcf = revenue * margin[..., None]
+    discount = _discount_factors(wacc, years)
+    terminal_value = fcf[..., -1] * (1 + terminal_growth) / (wacc - terminal_growth)
+    enterprise_value = (fcf * discount).sum(axis=-1) + terminal_value * discount[
+        ..., -1
+    ]
+    return (enterprise_value - assumptions.net_debt) / assumptions.shares
+
+
+class DCFResult:
+    """value per share of each simulated path of a Monte Carlo DCF (see dcf_valuation)"""
+
+    def __init__(self, values: np.ndarray, assumptions: DCFAssumptions):
+        self.values = values
+        self.assumptions = assumptions
+
+    def percentiles(self, q: Sequence[float] = (5, 25, 50, 75, 95)) -> pd.Series:
+        return pd.Series(
+            np.percentile(self.values, q), index=[f"p{p:g}" for p in q], name="value"
+        )
+
+    def summary(self) -> pd.Series:
+        """
+        mean & percentiles of value per share, current price, margin of safety (median
+        value / price - 1) & probability that the shares are undervalued (value > price)
+        """
+        price = self.assumptions.price
+        median = float(np.median(self.values))
+        summary = pd.concat(
+            [pd.Series({"mean": float(self.values.mean())}), self.percentiles()]
+        )
+        summary["price"] = price
+        summary["margin of safety"] = median / price - 1 if price > 0 else np.nan
+        summary["P(undervalued)"] = (
+            float((self.values > price).mean()) if price > 0 else np.nan
+        )
+        summary.name = self.assumptions.ticker_symbol
+        return summary
+
+    def histogram(self, bins: int = 50) -> pd.Series:
+        """number of paths in each of `bins` buckets of value per share (p1 - p99)"""
+        lo, hi = np.percentile(self.values, [1, 99])
+        counts, edges = np.histogram(self.values, bins=bins, range=(lo, hi))
+        return pd.Series(counts, index=np.round(edges[1:], 2), name="paths")
+
+
+@traced("dcf.monte_carlo")
+def monte_carlo_dcf(
+    assumptions: DCFAssumptions,
+    paths: int = DEFAULT_PATHS,
+    years: int = PROJECTION_YEARS,
+    seed: Optional[int] = None,
+) -> DCFResult:
+    """
+    simulates `paths` DCF valuations, with growth, FCF margin & WACC of each path drawn
+    from normal distributions (WACC kept above terminal growth + MIN_WACC_SPREAD)
+    """
+    rng = np.random.default_rng(seed)
+    values = np.empty(paths)
+    min_wacc = assumptions.terminal_growth + MIN_WACC_SPREAD
+    terminal_growth = np.float64(assumptions.terminal_growth)
+    for start in range(0, paths, CHUNK_SIZE):
+        n = min(CHUNK_SIZE, paths - start)
+        growth = rng.normal(assumptions.growth_mean, assumptions.growth_std, n)
+        margin = rng.normal(assumptions.margin_mean, assumptions.margin_std, n)
+        wacc = np.maximum(
+            rng.normal(assumptions.wacc_mean, assumptions.wacc_std, n), min_wacc
+        )
+        values[start : start + n] = _values_per_share(
+            assumptions, growth, margin, wacc, terminal_growth, years
+        )
+    return DCFResult(values, assumptions)
+
+
+def dcf_valuation(
+    ticker_symbol: Union[str, FinancialStatements],
+    paths: int = DEFAULT_PATHS,
+    years: int = PROJECTION_YEARS,
+    seed: Optional[int] = None,
+    **overrides,
+) -> DCFResult:
+    """
+    Monte Carlo DCF valuation of a company
+
+    Args:
+        ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
+            or a FinancialStatements snapshot of the company
+        paths (int) - number of simulated paths (10^5 - 10^6)
+        years (int) - number of years of projected cash flows, before the terminal value
+        seed (int) - seed of the random number generator (for repeatable results)
+        overrides - assumptions to use instead of the estimates from the company's
+            history, e.g. wacc_mean=0.11, terminal_growth=0.03 (see DCFAssumptions)
+
+    Returns:
+        a DCFResult, with the value per share of each path
+    """
+    assumptions = DCFAssumptions.from_statements(ticker_symbol, **overrides)
+    return monte_carlo_dcf(assumptions, paths, years, seed)
+
+
+@traced("dcf.sensitivity_grid")
+def sensitivity_grid(
+    assumptions: DCFAssumptions,
+    waccs: Optional[Sequence[float]] = None,
+    terminal_growths: Optional[Sequence[float]] = None,
+    years: int = PROJECTION_YEARS,
+) -> pd.DataFrame:
+    """
+    value per share at mean growth & FCF margin, for every WACC (rows) x terminal growth
+    (columns) - default: WACC ±3% & terminal growth 1-4%, in steps of 0.5%. Cells where
+    WACC <= terminal growth are NaN.
+    """
+    if waccs is None:
+        waccs = assumptions.wacc_mean + np.arange(-0.03, 0.0301, 0.005)
+    if terminal_growths is None:
+        terminal_growths = np.arange(0.01, 0.0401, 0.005)
+    waccs = np.asarray(waccs, dtype=float)
+    terminal_growths = np.asarray(terminal_growths, dtype=float)
+    # one cell per (WACC, terminal growth) - rows x columns, by broadcasting
+    wacc, terminal_growth = np.meshgrid(waccs, terminal_growths, indexing="ij")
+    values = _values_per_share(
+        assumptions,
+        np.full(wacc.shape, assumptions.growth_mean),
+        np.full(wacc.shape, assumptions.margin_mean),
+        wacc,
+        terminal_growth,
+        years,
+    )
+    values[wacc <= terminal_growth] = np.nan
+    return pd.DataFrame(
+        values,
+        index=pd.Index(np.round(waccs, 4), name="WACC"),
+        columns=pd.Index(np.round(terminal_growths, 4), name="terminal growth"),
+    )
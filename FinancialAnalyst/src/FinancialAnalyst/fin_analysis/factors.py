@@ -0,0 +1,284 @@
+"""
+factors.py - cross-sectional factor scores (value, quality, growth) of a universe of companies
+
+Ranking companies on a single ratio (screener.py --rank-by) favours whole sectors -
+banks always look cheap on P/B & software companies always look expensive. This module
+combines several ratios of the latest period of each company into factor scores, each
+ratio standardized within the company's sector:
+    1. ratios are oriented so that higher is better (e.g. -D/E, 1/P-E = earnings yield)
+    2. winsorized - clipped to the 5th & 95th percentile of the sector (by default)
+    3. z-scored - (value - sector mean) / sector standard deviation
+A factor score is the mean z-score of its ratios & the composite score is the weighted
+mean of the factor scores (both ignore missing values). Sectors with fewer than
+min_sector_size companies are pooled together. All steps are vectorized group-by
+operations over the whole universe, and a change to one company's ratios only
+re-standardizes the companies of its sector (see FactorModel.update).
+
+Example:
+    ```python
+    statements = [FinancialStatements(s) for s in symbols]
+    model = FactorModel(weights={"value": 0.5, "quality": 0.3, "growth": 0.2})
+    model.fit_statements(statements)
+    print(model.scores().head(20))  # best composite scores first
+
+    # statements of one company were refreshed - re-scores its sector only
+    model.update_statements(FinancialStatements("TCS.NS", force_refresh=True))
+    ```
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .panel import ratio_panel
+from .ratios import FinancialStatements, get_statements
+
+# ratios of each factor & how they are oriented so that higher is better -
+# "higher" (as is), "lower" (negated) or "inverse" (1 / ratio, e.g. earnings yield
+# from P/E, which keeps loss-making companies at the bottom instead of the top)
+DEFAULT_FACTORS: Dict[str, Dict[str, str]] = {
+    "value": {
+        "Price-to-Earnings (P/E)": "inverse",
+        "Price-to-Book (P/B)": "inverse",
+        "Price-to-Sales (P/S)": "inverse",
+        "EV/EBIDTA": "inverse",
+    },
+    "quality": {
+        "Return on Equity (RoE)": "higher",
+        "Return on Capital Employed (RoCE)": "higher",
+        "Operating Margin": "higher",
+        "Debt-to-Equity (D/E)": "lower",
+        "Interest Coverage": "higher",
+    },
+    "growth": {
+        "Revenue Growth (%)": "higher",
+        "EBIT Growth (%)": "higher",
+        "EPS Growth (%)": "higher",
+        "FCF Growth (%)": "higher",
+    },
+}
+DEFAULT_WEIGHTS = {"value": 1.0, "quality": 1.0, "growth": 1.0}
+# percentiles (within each sector) ratios are clipped to, before z-scoring
+DEFAULT_LIMITS = (0.05, 0.95)
+# companies of sectors smaller than this are standardized together, as one group
+MIN_SECTOR_SIZE = 5
+UNKNOWN_SECTOR = "Unknown"
+SMALL_SECTORS = "(small sectors)"
+
+
+def latest_ratios(panel: pd.DataFrame) -> pd.DataFrame:
+    """latest period's ratios of each company in a ratio panel, indexed by symbol"""
+    return panel.groupby(level="symbol").tail(1).droplevel("fiscal_year")
+
+
+def company_sectors(
+    statements: Iterable[Union[str, FinancialStatements]],
+) -> pd.Series:
+    """sector of each company (yf.Ticker.info["sector"]), indexed by symbol"""
+    sectors = {}
+    for stmts in statements:
+        stmts = get_statements(stmts)
+        sectors[stmts.ticker_symbol] = stmts.info.get("sector") or UNKNOWN_SECTOR
+    return pd.Series(sectors, name="sector", dtype=object)
+
+
+def orient(ratios: pd.DataFrame, directions: Mapping[str, str]) -> pd.DataFrame:
+    """ratios (columns of `directions`) turned so that higher is better"""
+    oriented = {}
+    for ratio, direction in directions.items():
+        values = ratios[ratio].astype(float) if ratio in ratios else np.nan
+        if direction == "lower":
+            values = -values
+        elif direction == "inverse":
+            values = 1.0 / values
+        elif direction != "higher":
+            raise ValueError(f"unknown direction {direction!r} of {ratio!r}")
+        oriented[ratio] = values
+    oriented = pd.DataFrame(oriented, index=ratios.index)
+    return oriented.replace([np.inf, -np.inf], np.nan)
+
+
+def winsorize(
+    values: pd.DataFrame, groups: pd.Series, limits: Tuple[float, float]
+) -> pd.DataFrame:
+    """clips each column to its `limits` percentiles within each group"""
+    grouped = values.groupby(groups)
+    lower = grouped.quantile(limits[0]).reindex(groups).to_numpy()
+    upper = grouped.quantile(limits[1]).reindex(groups).to_numpy()
+    return values.clip(lower, upper, axis=None)
+
+
+def group_zscores(values: pd.DataFrame, groups: pd.Series) -> pd.DataFrame:
+    """
+    z-score of each value within its group - (value - group mean) / group standard
+    deviation, 0 when all values of the group are the same (or it has just one value)
+    """
+    grouped = values.groupby(groups)
+    std = grouped.transform("std")
+    zscores = (values - grouped.transform("mean")) / std.where(std > 0)
+    return zscores.where(values.isna() | zscores.notna(), 0.0)
+
+
+class FactorModel:
+    """
+    Sector-neutral factor scores of a universe of companies, kept up to date one company
+    at a time
+
+    Args:
+        factors (dict) - factor name -> {ratio name: "higher" | "lower" | "inverse"}
+            (default: DEFAULT_FACTORS - value, quality & growth)
+        weights (dict) - factor name -> weight in the composite score (default: equal)
+        limits (tuple) - percentiles (within each sector) ratios are winsorized to
+        min_sector_size (int) - sectors with fewer companies are pooled together
+    """
+
+    def __init__(
+        self,
+        factors: Optional[Mapping[str, Mapping[str, str]]] = None,
+        weights: Optional[Mapping[str, float]] = None,
+        limits: Tuple[float, float] = DEFAULT_LIMITS,
+        min_sector_size: int = MIN_SECTOR_SIZE,
+    ):
+        self.factors = {f: dict(r) for f, r in (factors or DEFAULT_FACTORS).items()}
+        self.limits = limits
+        self.min_sector_size = min_sector_size
+        self.set_weights(
+            weights or {f: DEFAULT_WEIGHTS.get(f, 1.0) for f in self.factors}
+        )
+        self.directions = {
+            ratio: direction
+            for ratios in self.factors.values()
+            for ratio, direction in ratios.items()
+        }
+        self.ratios = pd.DataFrame(columns=list(self.directions), dtype=float)
+        self.sectors = pd.Series(dtype=object, name="sector")
+        self.groups = pd.Series(dtype=object, name="group")
+        self.zscores = pd.DataFrame(columns=list(self.directions), dtype=float)
+
+    @property
+    def ratio_names(self) -> List[str]:
+        """names of all ratios used by the factors"""
+        return list(self.directions)
+
+    def set_weights(self, weights: Mapping[str, float]):
+        """weights of the factors in the composite score (factors left out weigh 0)"""
+        unknown = set(weights) - set(self.factors)
+        if unknown:
+            raise ValueError(f"unknown factors {sorted(unknown)}")
+        self.weights = pd.Series(
+            {f: float(weights.get(f, 0.0)) for f in self.factors}, dtype=float
+        )
+
+    def _group_labels(self) -> pd.Series:
+        # sector of each company, or SMALL_SECTORS if the sector is too small
+        sizes = self.sectors.map(self.sectors.value_counts())
+        return self.sectors.where(sizes >= self.min_sector_size, SMALL_SECTORS).rename(
+            "group"
+        )
+
+    def _standardize(self, rows: pd.Index) -> pd.DataFrame:
+        # z-scores of companies `rows`, which must be all companies of their groups
+        groups = self.groups.loc[rows]
+        oriented = orient(self.ratios.loc[rows], self.directions)
+        return group_zscores(winsorize(oriented, groups, self.limits), groups)
+
+    def fit(self, ratios: pd.DataFrame, sectors: pd.Series) -> "FactorModel":
+        """
+        standardizes the ratios of all companies
+
+        Args:
+            ratios - latest ratios of each company, indexed by symbol (see latest_ratios)
+            sectors - sector of each company, indexed by symbol (see company_sectors)
+        """
+        self.ratios = ratios.reindex(columns=self.ratio_names).astype(float)
+        self.sectors = (
+            sectors.reindex(self.ratios.index).fillna(UNKNOWN_SECTOR).astype(object)
+        )
+        self.groups = self._group_labels()
+        self.zscores = self._standardize(self.ratios.index)
+        return self
+
+    def fit_statements(
+        self, statements: Iterable[Union[str, FinancialStatements]]
+    ) -> "FactorModel":
+        """calculates the ratios (with one ratio panel) & standardizes them"""
+        statements = [get_statements(s) for s in statements]
+        panel = ratio_panel(statements, ratios=self.ratio_names)
+        return self.fit(latest_ratios(panel), company_sectors(statements))
+
+    def _refresh_groups(self, changed: Iterable[str], old_groups: pd.Series):
+        # re-standardizes the groups that any of the changed companies left or joined,
+        # or that gained/lost companies because a sector crossed min_sector_size
+        self.groups = self._group_labels()
+        moved = self.groups.index[self.groups.ne(old_groups.reindex(self.groups.index))]
+        affected = (
+            set(old_groups.reindex(list(changed)).dropna())
+            | set(self.groups.reindex(list(changed)).dropna())
+            | set(old_groups.reindex(moved).dropna())
+            | set(self.groups.loc[moved])
+        )
+        rows = self.groups.index[self.groups.isin(affected)]
+        zscores = self.zscores.drop(
+            index=self.zscores.index.difference(self.groups.index)
+        )
+        zscores = zscores.reindex(self.groups.index)
+        zscores.loc[rows] = self._standardize(rows)
+        self.zscores = zscores
+
+    def update(self, symbol: str, ratios: pd.Series, sector: Optional[str] = None):
+        """
+        replaces the ratios (& sector) of one company - or adds it - and re-standardizes
+        only the companies of the sector(s) it affects
+        """
+        old_groups = self.groups.copy()
+        self.ratios.loc[symbol] = ratios.reindex(self.ratio_names).astype(float)
+        if sector is not None or symbol not in self.sectors.index:
+            self.sectors.loc[symbol] = sector or UNKNOWN_SECTOR
+        self._refresh_groups([symbol], old_groups)
+
+    def update_statements(self, statements: Union[str, FinancialStatements]):
+        """recalculates the ratios of one company (e.g. after its statements changed)"""
+        statements = get_statements(statements)
+        panel = ratio_panel([statements], ratios=self.ratio_names)
+        ratios = latest_ratios(panel)
+        self.update(
+            statements.ticker_symbol,
+            ratios.iloc[0] if not ratios.empty else pd.Series(dtype=float),
+            company_sectors([statements]).iloc[0],
+        )
+
+    def remove(self, symbol: str):
+        """drops a company from the universe (re-standardizing its sector)"""
+        old_groups = self.groups.copy()
+        self.ratios = self.ratios.drop(index=symbol)
+        self.sectors = self.sectors.drop(index=symbol)
+        self._refresh_groups([symbol], old_groups)
+
+    def factor_scores(self) -> pd.DataFrame:
+        """score of each factor (mean z-score of its ratios), one column per factor"""
+        return pd.DataFrame(
+            {
+                factor: self.zscores[list(ratios)].mean(axis=1)
+                for factor, ratios in self.factors.items()
+            },
+            index=self.zscores.index,
+        )
+
+    def scores(self) -> pd.DataFrame:
+        """
+        factor scores, composite score (weighted mean of the available factor scores) &
+        rank of each company, with its sector - best composite scores first
+        """
+        factor_scores = self.factor_scores()
+        weights = factor_scores.notna() * self.weights
+        composite = (factor_scores.fillna(0.0) * self.weights).sum(
+            axis=1
+        ) / weights.sum(axis=1).where(lambda w: w > 0)
+        scores = factor_scores.assign(Composite=composite, Sector=self.sectors)
+        scores.insert(0, "Rank", composite.rank(ascending=False, method="min"))
+        return scores.sort_values("Composite", ascending=False, na_position="last")
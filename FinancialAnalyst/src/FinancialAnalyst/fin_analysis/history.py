@@ -0,0 +1,277 @@
+"""
+history.py - persisted ratio history of companies, refreshed incrementally
+
+Yahoo! Finance returns only the last 4-5 years of statements, and a nightly job that
+recalculates every company's ratios from scratch wastes most of its time on periods
+that did not change. This module saves calculated ratios of each company, one row per
+financial period, in a local SQLite database along with a hash of the statement values
+each row was calculated from. A refresh hashes the newly downloaded statement rows and
+recalculates only
+    - new periods & restated periods (whose statement values changed), and
+    - the growth metrics (the pct_change columns of performance_and_growth_metrics,
+      average inventory etc.) of the periods following them, which depend on them.
+So refresh time depends on what changed, not on the length of the history.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import json
+import time
+import pathlib
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from .panel import StatementPanel, add_prices, info_frame, statement_matrix
+from .ratios import FinancialStatements
+from .registry import REGISTRY, compile_ratios, lookback_periods
+from .statement_cache import CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR, connect
+
+
+def default_history_ratios() -> List[str]:
+    """
+    names of registered ratios calculated from statements (& period-end share prices).
+    Ratios that use current yf.Ticker.info values are left out, as those are not historical.
+    """
+    return [name for name, ratio in REGISTRY.items() if not ratio.uses_info]
+
+
+class RefreshResult:
+    """
+    Outcome of RatioHistoryStore.refresh for one company
+
+    Attributes:
+        symbol (str) - ticker symbol of the company
+        new_periods (list) - period-end dates that were not in the history
+        restated_periods (list) - period-end dates whose statement values changed
+        recomputed_periods (list) - period-end dates whose ratios were recalculated
+            (new & restated periods, plus the periods following them)
+        changed_ratios (dict) - period-end date -> names of ratios whose values changed
+        history (pd.DataFrame) - full ratio history of the company after the refresh
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.new_periods: List[pd.Timestamp] = []
+        self.restated_periods: List[pd.Timestamp] = []
+        self.recomputed_periods: List[pd.Timestamp] = []
+        self.changed_ratios: Dict[pd.Timestamp, Set[str]] = {}
+        self.history = pd.DataFrame()
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.changed_ratios)
+
+    def __repr__(self):
+        return (
+            f"RefreshResult({self.symbol!r}, new={len(self.new_periods)}, "
+            f"restated={len(self.restated_periods)}, "
+            f"recomputed={len(self.recomputed_periods)})"
+        )
+
+
+class RatioHistoryStore:
+    """
+    SQLite backed store of ratio history of companies
+
+    Args:
+        cache_dir (str or pathlib.Path) - folder where the database is created
+            (default: same folder as the statement cache)
+        ratios (list) - names of ratios to keep history of (default: all registered
+            ratios that are calculated from statements alone, see default_history_ratios)
+
+    Example:
+        ```python
+        store = RatioHistoryStore()
+        result = store.refresh(FinancialStatements("TCS.NS", force_refresh=True))
+        print(result)  # e.g. RefreshResult('TCS.NS', new=1, restated=0, recomputed=2)
+        print(store.load("TCS.NS"))
+        ```
+    """
+
+    def __init__(
+        self, cache_dir: Optional[str] = None, ratios: Optional[Iterable[str]] = None
+    ):
+        if cache_dir is None:
+            cache_dir = os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "ratio_history.sqlite"
+        self.ratios = list(ratios) if ratios is not None else default_history_ratios()
+        self._create_tables()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _create_tables(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ratio_history (
+                    symbol TEXT NOT NULL,
+                    frequency TEXT NOT NULL,
+                    period_end TEXT NOT NULL,
+                    row_hash TEXT NOT NULL,
+                    ratios TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, frequency, period_end)
+                )
+                """)
+
+    def _stored_rows(self, symbol: str, frequency: str) -> Dict[str, tuple]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT period_end, row_hash, ratios FROM ratio_history
+                WHERE symbol = ? AND frequency = ?
+                """,
+                (symbol, frequency),
+            ).fetchall()
+        return {period_end: (row_hash, ratios) for period_end, row_hash, ratios in rows}
+
+    def symbols(self, frequency: str = "annual") -> List[str]:
+        """returns symbols of all companies in the store"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT symbol FROM ratio_history WHERE frequency = ?",
+                (frequency,),
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def load(self, symbol: str, frequency: str = "annual") -> pd.DataFrame:
+        """
+        returns saved ratio history of a company, as a pandas dataframe with datetime
+        index of period-end dates & one column per ratio (empty if symbol is not saved)
+        """
+        stored = self._stored_rows(symbol, frequency)
+        if not stored:
+            return pd.DataFrame(columns=self.ratios)
+        history = pd.DataFrame.from_dict(
+            {
+                pd.Timestamp(period_end): json.loads(ratios)
+                for period_end, (_, ratios) in stored.items()
+            },
+            orient="index",
+        )
+        history = history.reindex(columns=self.ratios).astype(float).sort_index()
+        history.index.name = "fiscal_year"
+        return history
+
+    def _row_hashes(self, matrix: pd.DataFrame) -> np.ndarray:
+        """hash of the statement values each row's ratios are calculated from"""
+        inputs = list(
+            dict.fromkeys(
+                item for name in self.ratios for item in REGISTRY[name].inputs
+            )
+        )
+        values = matrix.reindex(columns=pd.MultiIndex.from_tuples(inputs))
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        return np.array([f"{h:016x}" for h in hashes])
+
+    def refresh(self, statements: FinancialStatements) -> RefreshResult:
+        """
+        Updates the ratio history of a company from (newly downloaded) statements,
+        recalculating only new & restated periods and the periods depending on them.
+
+        Args:
+            statements (FinancialStatements) - snapshot of the company's statements
+
+        Returns:
+            a RefreshResult, listing what was recalculated & which ratio values changed
+        """
+        symbol = statements.ticker_symbol
+        frequency = statements.frequency
+        periods_per_year = statements.periods_per_year
+        result = RefreshResult(symbol)
+
+        matrix = statement_matrix([statements])
+        if any(REGISTRY[name].uses_prices for name in self.ratios):
+            matrix = add_prices(matrix, [statements])
+        dates = matrix.index.get_level_values("fiscal_year")
+        period_ends = np.array([str(pd.Timestamp(d).date()) for d in dates])
+        hashes = self._row_hashes(matrix)
+        stored = self._stored_rows(symbol, frequency)
+
+        is_new = np.array([p not in stored for p in period_ends], dtype=bool)
+        is_restated = np.array(
+            [p in stored and stored[p][0] != h for p, h in zip(period_ends, hashes)],
+            dtype=bool,
+        )
+        changed = is_new | is_restated
+        result.new_periods = list(dates[is_new])
+        result.restated_periods = list(dates[is_restated])
+        if not changed.any():
+            result.history = self.load(symbol, frequency)
+            return result
+
+        plan = compile_ratios(ratios=self.ratios, ttm=periods_per_year > 1)
+        ratio_lookback = {
+            name: lookback_periods(expr, periods_per_year)
+            for name, expr in plan.exprs.items()
+        }
+        lookback = max(ratio_lookback.values(), default=0)
+
+        # rows that follow a changed row (within lookback) have growth metrics that
+        # depend on it - they get only those ratios recalculated
+        changed_idx = np.flatnonzero(changed)
+        dependent = np.zeros(len(matrix), dtype=bool)
+        for periods in range(1, lookback + 1):
+            later = changed_idx + periods
+            dependent[later[later < len(matrix)]] = True
+        dependent &= ~changed
+        affected = changed | dependent
+
+        # evaluate over the smallest contiguous slice that has all inputs of affected rows
+        affected_idx = np.flatnonzero(affected)
+        first = max(affected_idx[0] - lookback, 0)
+        last = affected_idx[-1] + 1
+        uses_info = any(REGISTRY[name].uses_info for name in plan.names)
+        panel = StatementPanel(
+            matrix.iloc[first:last],
+            info_frame([statements]) if uses_info else pd.DataFrame(),
+            periods_per_year=periods_per_year,
+        )
+        values = pd.DataFrame(plan.evaluate(panel), columns=plan.names)
+        values.index = np.arange(first, last)
+
+        earlier_period_ratios = [name for name, n in ratio_lookback.items() if n > 0]
+        rows_to_save = []
+        for idx in affected_idx:
+            period_end = period_ends[idx]
+            old = json.loads(stored[period_end][1]) if period_end in stored else {}
+            new = dict(old)
+            names = self.ratios if changed[idx] else earlier_period_ratios
+            for name in names:
+                if idx < ratio_lookback[name] and name in old:
+                    # the periods this ratio looks back to are no longer in the
+                    # downloaded statements - keep the value calculated when they were
+                    continue
+                value = values.at[idx, name]
+                new[name] = None if pd.isna(value) else float(value)
+            changed_names = {
+                name for name in self.ratios if old.get(name) != new.get(name)
+            }
+            if changed_names:
+                result.changed_ratios[dates[idx]] = changed_names
+            result.recomputed_periods.append(dates[idx])
+            rows_to_save.append(
+                (
+                    symbol,
+                    frequency,
+                    period_end,
+                    hashes[idx],
+                    json.dumps(new),
+                    time.time(),
+                )
+            )
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ratio_history VALUES (?, ?, ?, ?, ?, ?)",
+                rows_to_save,
+            )
+        result.history = self.load(symbol, frequency)
+        return result
@@ -0,0 +1,266 @@
+"""
+panel.py - calculates financial ratios for many companies in one go
+
+The functions in ratios.py calculate ratios for one company at a time. When screening
+an index (hundreds or thousands of companies), this module stacks the statements of all
+companies into one aligned matrix and calculates every ratio with whole-array NumPy
+operations over that matrix. The formulas (declared in registry.py) are the same as
+those in ratios.py, so the values for any company match those returned by the
+single-company functions.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .prices import PriceHistory, closes_at
+from .ratios import FinancialStatements, get_statements, load_prices
+from .registry import PRICE_STATEMENT, REGISTRY, compile_ratios, ratio_groups
+
+# names of the index levels of the statement matrix & ratio panel
+INDEX_NAMES = ["symbol", "fiscal_year"]
+
+# ratio columns of the panel, grouped by the ratios.py function that calculates them
+PANEL_GROUPS: Dict[str, List[str]] = ratio_groups()
+
+
+def statement_matrix(
+    statements: Iterable[Union[str, FinancialStatements]],
+) -> pd.DataFrame:
+    """
+    Stacks the statements of several companies into one aligned matrix.
+
+    Args:
+        statements - ticker symbols and/or FinancialStatements snapshots of the companies
+
+    Returns:
+        a pandas dataframe with a (symbol, fiscal_year) MultiIndex, where fiscal_year is
+        the financial-year-end date, and (statement, line item) MultiIndex columns,
+        e.g. ("balance_sheet", "Total Assets"). Line items that a company does not report
+        are NaN. Rows are sorted by date within each symbol.
+    """
+    frames = []
+    for stmts in statements:
+        stmts = get_statements(stmts)
+        # align all statements of a company on financial-year-end dates
+        joined = pd.concat(
+            {
+                name: getattr(stmts, name)
+                for name in FinancialStatements.STATEMENT_NAMES
+            },
+            axis=1,
+        ).sort_index()
+        joined.index = pd.MultiIndex.from_arrays(
+            [[stmts.ticker_symbol] * len(joined), joined.index], names=INDEX_NAMES
+        )
+        frames.append(joined)
+
+    if not frames:
+        return pd.DataFrame(
+            index=pd.MultiIndex.from_arrays([[], []], names=INDEX_NAMES)
+        )
+    return pd.concat(frames).astype(float)
+
+
+def add_prices(
+    matrix: pd.DataFrame,
+    statements: Iterable[FinancialStatements],
+    price_history: Optional[PriceHistory] = None,
+) -> pd.DataFrame:
+    """
+    Adds closing share price of each company at each period-end to a statement matrix,
+    as column ("prices", "Close"). Prices of all companies that are not yet downloaded
+    are downloaded together (see ratios.load_prices) & joined onto the period-end dates
+    with one vectorized as-of join.
+    """
+    statements = list(statements)
+    load_prices(statements, price_history)
+    closes = pd.DataFrame({s.ticker_symbol: s.prices for s in statements})
+    matrix = matrix.copy()
+    matrix[(PRICE_STATEMENT, "Close")] = closes_at(
+        closes,
+        matrix.index.get_level_values("symbol"),
+        matrix.index.get_level_values("fiscal_year"),
+    )
+    return matrix
+
+
+def info_frame(
+    statements: Iterable[Union[str, FinancialStatements]],
+    fields=("marketCap", "trailingPE"),
+) -> pd.DataFrame:
+    """returns a dataframe of yf.Ticker.info fields, indexed by symbol"""
+    rows = {}
+    for stmts in statements:
+        stmts = get_statements(stmts)
+        rows[stmts.ticker_symbol] = {f: stmts.info.get(f, np.nan) for f in fields}
+    return pd.DataFrame.from_dict(rows, orient="index", columns=list(fields)).astype(
+        float
+    )
+
+
+class StatementPanel:
+    """
+    Array views of a statement matrix (see statement_matrix) & yf.Ticker.info fields
+    of the companies, with helpers for per-company lagged values. This is the context
+    over which registry.Plan evaluates ratio expressions.
+
+    Args:
+        matrix (pd.DataFrame) - statement matrix of the companies
+        info (pd.DataFrame) - yf.Ticker.info fields of the companies (see info_frame)
+        periods_per_year (int) - 1 for annual statements, 4 for quarterly statements
+    """
+
+    def __init__(
+        self,
+        matrix: pd.DataFrame,
+        info: Optional[pd.DataFrame] = None,
+        periods_per_year: int = 1,
+    ):
+        self.matrix = matrix
+        self.info = info if info is not None else pd.DataFrame()
+        self.nrows = len(matrix)
+        self.periods_per_year = periods_per_year
+        self.codes = (
+            np.asarray(matrix.index.codes[0]) if len(matrix) else np.zeros(0, int)
+        )
+        # True for the first (oldest) row of each company
+        self.group_start = np.ones(len(matrix), dtype=bool)
+        self.group_start[1:] = self.codes[1:] != self.codes[:-1]
+        # period-end dates as month numbers, to detect missing quarters
+        dates = pd.DatetimeIndex(matrix.index.get_level_values(1))
+        self.months = np.asarray(dates.year * 12 + dates.month)
+
+    def col(self, statement: str, item: str) -> np.ndarray:
+        """values of a line item, all NaN if no company reports it"""
+        if (statement, item) in self.matrix.columns:
+            return self.matrix[(statement, item)].to_numpy(dtype=float)
+        return np.full(len(self.matrix), np.nan)
+
+    def reported(self, values: np.ndarray) -> np.ndarray:
+        """True for every row of a company that reports the line item in any year"""
+        if len(values) == 0:
+            return np.zeros(0, dtype=bool)
+        starts = np.flatnonzero(self.group_start)
+        per_company = np.logical_or.reduceat(~np.isnan(values), starts)
+        return np.repeat(per_company, np.diff(np.append(starts, len(values))))
+
+    def prev(self, values: np.ndarray, periods: int = 1) -> np.ndarray:
+        """
+        values `periods` rows earlier for the same company (NaN where there is no such
+        row). For quarterly data, the earlier row must also be the expected number of
+        months earlier, so a quarter missing from Yahoo's data gives NaN, not a wrong value.
+        """
+        lagged = np.full(len(values), np.nan)
+        if periods == 0:
+            return values
+        if periods >= len(values):
+            return lagged
+        lagged[periods:] = values[:-periods]
+        valid = np.zeros(len(values), dtype=bool)
+        valid[periods:] = self.codes[periods:] == self.codes[:-periods]
+        if self.periods_per_year > 1:
+            months_apart = self.months[periods:] - self.months[:-periods]
+            expected = periods * 12 // self.periods_per_year
+            # allow for 52/53-week fiscal quarters ending just before/after month-end
+            valid[periods:] &= np.abs(months_apart - expected) <= 1
+        lagged[~valid] = np.nan
+        return lagged
+
+    def year_ago(self, values: np.ndarray) -> np.ndarray:
+        """values of the same period of the previous year for the same company"""
+        return self.prev(values, self.periods_per_year)
+
+    def rolling_sum(self, values: np.ndarray, window: int) -> np.ndarray:
+        """sum of the last `window` periods (NaN unless all periods are available)"""
+        total = values.astype(float)
+        for periods in range(1, window):
+            total = total + self.prev(values, periods)
+        return total
+
+    def broadcast(self, per_symbol: pd.Series) -> np.ndarray:
+        """repeats a per-symbol value (e.g. market cap) for every year of the company"""
+        symbols = self.matrix.index.get_level_values(0)
+        return per_symbol.reindex(symbols).to_numpy(dtype=float)
+
+    def info_field(self, field: str) -> np.ndarray:
+        if field not in self.info.columns:
+            return np.full(self.nrows, np.nan)
+        return self.broadcast(self.info[field])
+
+
+def ratio_panel(
+    statements: Iterable[Union[str, FinancialStatements]],
+    groups: Optional[Iterable[str]] = None,
+    ratios: Optional[Iterable[str]] = None,
+) -> pd.DataFrame:
+    """
+    Calculates financial ratios for many companies at once. If the companies' statements
+    are quarterly (FinancialStatements(symbol, frequency="quarterly")), the ratios are
+    trailing-twelve-month (TTM) ratios, calculated at each quarter-end (see registry.to_ttm).
+
+    Args:
+        statements - ticker symbols and/or FinancialStatements snapshots of the companies
+            (e.g. ["AAPL", "MSFT", "RELIANCE.NS"])
+        groups - names of ratio groups to return (keys of PANEL_GROUPS, which are the
+            names of the functions in ratios.py)
+        ratios - names of individual ratios to return (e.g. ["Current Ratio", "EPS"]),
+            in addition to those of `groups`. Default is all ratios of all groups.
+
+    Returns:
+        a pandas dataframe with a (symbol, fiscal_year) MultiIndex, where fiscal_year is
+        the financial-year-end date (quarter-end date for quarterly statements), and one
+        column per ratio. Ratios that cannot be calculated for a company (e.g. Quick Ratio
+        when Inventory is not reported) are NaN.
+
+    Example:
+        ```python
+        panel = ratio_panel(["AAPL", "MSFT", "RELIANCE.NS"])
+        # Return on Equity of all companies, one column per company
+        print(panel["Return on Equity (RoE)"].unstack("symbol"))
+
+        # TTM ratios at each quarter-end
+        quarterly = [FinancialStatements(s, frequency="quarterly") for s in ["AAPL", "MSFT"]]
+        print(ratio_panel(quarterly, groups=["profitability_ratios"]))
+        ```
+    """
+    statements = [get_statements(s) for s in statements]
+    frequencies = {s.frequency for s in statements}
+    if len(frequencies) > 1:
+        raise ValueError("can't mix annual & quarterly statements in one panel")
+    periods_per_year = statements[0].periods_per_year if statements else 1
+
+    plan = compile_ratios(ratios, groups, ttm=periods_per_year > 1)
+    matrix = statement_matrix(statements)
+    if any(REGISTRY[name].uses_prices for name in plan.names):
+        matrix = add_prices(matrix, statements)
+    # info is downloaded one company at a time, so only when a ratio needs it
+    if any(REGISTRY[name].uses_info for name in plan.names):
+        info = info_frame(statements)
+    else:
+        info = pd.DataFrame()
+    panel = StatementPanel(matrix, info, periods_per_year=periods_per_year)
+    values = plan.evaluate(panel)
+    return pd.DataFrame(
+        {name: values[name] for name in plan.names}, index=panel.matrix.index
+    )
+
+
+def select_ratios(
+    ticker_symbol: Union[str, FinancialStatements],
+    ratios: Iterable[str],
+) -> pd.DataFrame:
+    """
+    Calculates any subset of ratios (from any groups) for one company in one pass,
+    e.g. select_ratios("TCS.NS", ["Current Ratio", "Return on Equity (RoE)", "EPS"])
+
+    Returns:
+        a pandas dataframe, with datetime index of financial year-end dates
+        and the requested ratios as columns
+    """
+    return ratio_panel([ticker_symbol], ratios=ratios).droplevel("symbol")
@@ -0,0 +1,271 @@
+"""
+prices.py - historical closing prices of many companies, for point-in-time valuation ratios
+
+Valuation ratios (P/E, P/S, P/B & EV/EBIDTA) of past financial years need the market
+capitalization at each financial-year-end, i.e. the share price on that date. This module
+downloads the daily price history of a whole batch of companies with a single
+yf.download call, saves it in a local SQLite cache and looks up the closing price of
+each company on (or just before) each financial-period-end date with a vectorized as-of
+join.
+
+Yahoo! Finance adjusts historical prices for all stock splits up to today. Share counts
+in statements are as reported, so prices are un-adjusted again before they are multiplied
+by share counts - prices are always downloaded up to today, so the split history
+downloaded with them has every split that Yahoo! Finance adjusted them for.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import time
+import pickle
+import pathlib
+import logging
+from typing import Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from .statement_cache import (
+    CACHE_DIR_ENV_VAR,
+    DEFAULT_CACHE_DIR,
+    NO_CACHE_ENV_VAR,
+    connect,
+)
+
+logger = logging.getLogger(__name__)
+
+# a financial year that ends on a weekend or holiday uses the last close before it
+AS_OF_TOLERANCE = pd.Timedelta(days=7)
+
+
+def unadjusted_closes(closes: pd.DataFrame, splits: pd.DataFrame) -> pd.DataFrame:
+    """
+    reverses Yahoo's split adjustment of closing prices (dates x symbols), using the
+    "Stock Splits" column of yf.download (split ratio on split dates, 0 elsewhere)
+    """
+    ratios = splits.reindex_like(closes).fillna(0.0).replace(0.0, 1.0)
+    # price on a date is adjusted by all splits after that date
+    later_splits = ratios[::-1].cumprod()[::-1].shift(-1).fillna(1.0)
+    return closes * later_splits
+
+
+def download_closes(
+    symbols: List[str], start: str, end: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    downloads daily closing prices (not split-adjusted) of all symbols from start to
+    end (exclusive, default: up to today) with one yf.download call, returns a dataframe
+    of dates x symbols. Prices are always downloaded up to today, as Yahoo! Finance
+    adjusts them for all splits up to today, even those after end.
+    """
+    data = yf.download(
+        symbols,
+        start=start,
+        auto_adjust=False,
+        actions=True,
+        group_by="column",
+        progress=False,
+        threads=True,
+    )
+    if data is None or data.empty:
+        return pd.DataFrame(columns=symbols, dtype=float)
+    if isinstance(data.columns, pd.MultiIndex):
+        closes, splits = data["Close"], data.get("Stock Splits")
+    else:
+        # older versions of yfinance return flat columns for a single symbol
+        closes = data[["Close"]].set_axis(symbols, axis=1)
+        splits = data[["Stock Splits"]].set_axis(symbols, axis=1)
+    closes = closes.reindex(columns=symbols).astype(float)
+    if splits is not None:
+        closes = unadjusted_closes(closes, splits.reindex(columns=symbols))
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None)
+    if end is not None:
+        closes = closes.loc[closes.index < pd.Timestamp(end)]
+    return closes
+
+
+def closes_at(
+    closes: pd.DataFrame, symbols: Iterable[str], dates: Iterable
+) -> np.ndarray:
+    """
+    vectorized as-of join - returns closing price of symbols[i] on (or within a week
+    before) dates[i], NaN where there is no price
+
+    Args:
+        closes (pd.DataFrame) - daily closing prices, dates x symbols
+        symbols, dates - symbol & period-end date of each row (same length)
+    """
+    left = pd.DataFrame(
+        {"symbol": list(symbols), "date": pd.DatetimeIndex(list(dates))}
+    )
+    left["row"] = np.arange(len(left))
+    if left.empty or closes.empty:
+        return np.full(len(left), np.nan)
+    right = closes.rename_axis(index="date", columns="symbol").stack().dropna()
+    right = right.rename("close").reset_index().sort_values("date")
+    merged = pd.merge_asof(
+        left.sort_values("date"),
+        right,
+        on="date",
+        by="symbol",
+        direction="backward",
+        tolerance=AS_OF_TOLERANCE,
+    )
+    return merged.sort_values("row")["close"].to_numpy(dtype=float)
+
+
+class PriceHistory:
+    """
+    SQLite backed cache of daily closing prices, downloaded in bulk
+
+    Args:
+        cache_dir (str or pathlib.Path) - folder where the cache database is created
+            (default: same folder as the statement cache). Set persist=False to keep
+            prices in memory only.
+        ttl_days (float) - number of days after which prices are downloaded again
+            (Yahoo! Finance revises past prices only for splits & corrections, and
+            prices cached before a split passed to closes() are downloaded again)
+        persist (bool) - save prices to the cache database
+
+    Example:
+        ```python
+        prices = PriceHistory()
+        closes = prices.closes(["AAPL", "MSFT"], "2020-01-01", "2024-12-31")  # one download
+        print(closes_at(closes, ["AAPL", "MSFT"], ["2023-09-30", "2023-06-30"]))
+        ```
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl_days: float = 7.0,
+        persist: bool = True,
+    ):
+        self.ttl_days = ttl_days
+        self.persist = persist
+        self._memory = {}
+        if persist:
+            if cache_dir is None:
+                cache_dir = os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))
+            self.cache_dir = pathlib.Path(cache_dir)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.db_path = self.cache_dir / "prices.sqlite"
+            self._create_tables()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _create_tables(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prices (
+                    symbol TEXT PRIMARY KEY,
+                    start TEXT NOT NULL,
+                    end TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    payload BLOB NOT NULL
+                )
+                """)
+
+    def _cached(self, symbols: List[str]) -> dict:
+        if not self.persist:
+            return {s: self._memory[s] for s in symbols if s in self._memory}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT symbol, start, end, fetched_at, payload FROM prices "
+                f"WHERE symbol IN ({','.join('?' * len(symbols))})",
+                symbols,
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def _save(self, rows: List[tuple]):
+        if not self.persist:
+            self._memory.update({row[0]: row[1:] for row in rows})
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def closes(
+        self,
+        symbols: Iterable[str],
+        start,
+        end,
+        force_refresh: bool = False,
+        last_splits: Optional[Mapping[str, pd.Timestamp]] = None,
+    ) -> pd.DataFrame:
+        """
+        Returns daily closing prices (not split-adjusted) of symbols between start & end
+        dates, as a dataframe of dates x symbols. Symbols whose cached prices are stale
+        or do not cover the dates are downloaded together, with one yf.download call.
+        If the download fails, stale cached prices are used (or NaN if there are none).
+
+        last_splits (symbol -> date of the company's latest stock split, e.g. from
+        yf.Ticker.info's lastSplitDate) invalidates prices cached before that split -
+        Yahoo! Finance does not always adjust prices & publish the split on the same
+        day, so prices downloaded around a split may be un-adjusted wrongly.
+        """
+        last_splits = last_splits or {}
+        symbols = list(dict.fromkeys(symbols))
+        start = str(pd.Timestamp(start).date())
+        end = str(pd.Timestamp(end).date())
+        cached = self._cached(symbols) if symbols else {}
+
+        def is_fresh(symbol):
+            if symbol not in cached or force_refresh:
+                return False
+            cached_start, cached_end, fetched_at, _ = cached[symbol]
+            split_at = last_splits.get(symbol)
+            return (
+                cached_start <= start
+                and cached_end >= end
+                and (time.time() - fetched_at) < self.ttl_days * 24 * 60 * 60
+                and (
+                    split_at is None or fetched_at > pd.Timestamp(split_at).timestamp()
+                )
+            )
+
+        stale = [s for s in symbols if not is_fresh(s)]
+        series = {s: pickle.loads(cached[s][3]) for s in symbols if s in cached}
+        if stale:
+            # downloaded up to today (see download_closes), so the cached prices
+            # cover any end date up to today
+            end = max(end, str(pd.Timestamp.now().date()))
+            try:
+                downloaded = download_closes(stale, start)
+            except Exception as e:
+                logger.warning(f"Price download failed for {len(stale)} symbols: {e}")
+                downloaded = pd.DataFrame()
+            rows = []
+            for symbol in stale:
+                if symbol not in downloaded.columns:
+                    continue
+                closes = downloaded[symbol].dropna()
+                if closes.empty:
+                    continue
+                series[symbol] = closes
+                rows.append((symbol, start, end, time.time(), pickle.dumps(closes)))
+            self._save(rows)
+
+        if not series:
+            return pd.DataFrame(columns=symbols, dtype=float)
+        return pd.DataFrame(series).reindex(columns=symbols).sort_index()
+
+
+_default_price_history: Optional[PriceHistory] = None
+
+
+def default_price_history() -> PriceHistory:
+    """
+    Returns the process-wide PriceHistory (prices are kept in memory only if
+    FINANCIAL_ANALYST_NO_CACHE is set)
+    """
+    global _default_price_history
+    if _default_price_history is None:
+        _default_price_history = PriceHistory(persist=not os.getenv(NO_CACHE_ENV_VAR))
+    return _default_price_history
@@ -0,0 +1,407 @@
+"""
+query.py - screening queries over stored ratios, e.g. "RoE > 0.15 and D/E < 1"
+
+A query is a boolean expression of comparisons of ratios with numbers
+    RoE > 0.15 and D/E < 1 and Revenue Growth > 10
+    (P/E < 15 or P/B < 1.5) and not Interest Coverage < 3
+    Current Ratio between 1.5 and 3
+joined with `and`, `or`, `not` & parentheses. Comparisons are >, >=, <, <=, = (or ==),
+!= & `between ... and ...` (inclusive). Ratios are named as in the ratio panel
+("Return on Equity (RoE)", "Revenue Growth (%)"), by the abbreviation in brackets
+("RoE", "D/E", "P/E"), by the name without the brackets ("Revenue Growth") - case does
+not matter - or in double quotes for any other name. Note that growth metrics are in percent
+("Revenue Growth > 10" is growth above 10%), while margins & returns are fractions.
+
+A query is parsed once (& cached), then evaluated as NumPy boolean masks over a
+RatioTable - ratios of many companies, one row per company (one fiscal year or each
+company's latest year of a RatioCube) or per company & year. Each comparison is
+answered by binary search (np.searchsorted) in a sorted index of the ratio's values,
+which is built the first time the ratio is queried, so a query over 10,000 companies x
+10 years takes well under a millisecond per comparison.
+
+Example:
+    ```python
+    table = RatioTable.from_cube(RatioCube("nifty500_cube.npy"), period="latest")
+    print(table.screen("RoE > 0.15 and D/E < 1 and Revenue Growth > 10"))
+    ```
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import re
+import functools
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .ratio_cube import RatioCube
+
+KEYWORDS = ("and", "or", "not", "between")
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?![\w/])
+      | "(?P<quoted>[^"]+)"
+      | (?P<op>>=|<=|==|!=|>|<|=)
+      | (?P<suffix>\([^()<>=!"]+\))
+      | (?P<paren>[()])
+      | (?P<word>[^\s()<>=!"]+)
+    )""",
+    re.VERBOSE,
+)
+
+
+class QueryError(ValueError):
+    """a query that can't be parsed, or names a ratio that is not in the table"""
+
+
+def tokenize(query: str) -> List[Tuple[str, str]]:
+    """(kind, text) tokens of a query - number, name, op, paren or keyword"""
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _TOKEN_PATTERN.match(query, pos)
+        if match is None or match.end() == pos:
+            raise QueryError(f"unexpected {query[pos:].strip()!r} in query")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "suffix" and tokens and tokens[-1][0] == "name":
+            # a bracketed suffix of a ratio name (e.g. Return on Equity (RoE))
+            tokens[-1] = ("name", f"{tokens[-1][1]} {text}")
+        elif kind == "suffix":
+            # else the bracket opens a group - tokenize its contents separately
+            tokens.append(("paren", "("))
+            pos = match.start(kind) + 1
+        elif kind == "word" and text.lower() in KEYWORDS:
+            tokens.append(("keyword", text.lower()))
+        elif kind == "word" and tokens and tokens[-1][0] == "name":
+            # consecutive words are one ratio name (e.g. Revenue Growth)
+            tokens[-1] = ("name", f"{tokens[-1][1]} {text}")
+        elif kind in ("word", "quoted"):
+            tokens.append(("name", text))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+class Node:
+    """node of a parsed query - evaluates to a boolean mask over the rows of a table"""
+
+    def ratios(self) -> List[str]:
+        """ratio names (as written in the query) used by this node"""
+        return [r for child in getattr(self, "children", []) for r in child.ratios()]
+
+    def evaluate(self, table: "RatioTable") -> np.ndarray:
+        raise NotImplementedError
+
+
+class Comparison(Node):
+    def __init__(self, ratio: str, op: str, value: float):
+        self.ratio = ratio
+        self.op = "==" if op == "=" else op
+        self.value = value
+
+    def ratios(self):
+        return [self.ratio]
+
+    def evaluate(self, table):
+        return table.index(self.ratio).mask(self.op, self.value)
+
+    def __repr__(self):
+        return f"({self.ratio} {self.op} {self.value:g})"
+
+
+class Between(Node):
+    def __init__(self, ratio: str, low: float, high: float):
+        self.ratio = ratio
+        self.low = low
+        self.high = high
+
+    def ratios(self):
+        return [self.ratio]
+
+    def evaluate(self, table):
+        return table.index(self.ratio).between(self.low, self.high)
+
+    def __repr__(self):
+        return f"({self.ratio} between {self.low:g} and {self.high:g})"
+
+
+class And(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+
+    def evaluate(self, table):
+        return functools.reduce(
+            np.logical_and, (c.evaluate(table) for c in self.children)
+        )
+
+    def __repr__(self):
+        return "(" + " and ".join(map(repr, self.children)) + ")"
+
+
+class Or(Node):
+    def __init__(self, children: List[Node]):
+        self.children = children
+
+    def evaluate(self, table):
+        return functools.reduce(
+            np.logical_or, (c.evaluate(table) for c in self.children)
+        )
+
+    def __repr__(self):
+        return "(" + " or ".join(map(repr, self.children)) + ")"
+
+
+class Not(Node):
+    def __init__(self, child: Node):
+        self.children = [child]
+
+    def evaluate(self, table):
+        # rows where the ratio is missing do not match a comparison, nor its negation
+        child = self.children[0]
+        return ~child.evaluate(table) & table.available(child.ratios())
+
+    def __repr__(self):
+        return f"not {self.children[0]!r}"
+
+
+class _Parser:
+    """recursive descent parser - query: or_expr, or_expr: and_expr ("or" and_expr)*..."""
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind: str, text: Optional[str] = None) -> str:
+        token_kind, token_text = self.peek()
+        if token_kind != kind or (text is not None and token_text != text):
+            found = repr(token_text) if token_kind else "end of query"
+            raise QueryError(f"expected {text or kind}, found {found}")
+        self.pos += 1
+        return token_text
+
+    def parse(self) -> Node:
+        node = self.or_expr()
+        if self.pos < len(self.tokens):
+            raise QueryError(f"unexpected {self.tokens[self.pos][1]!r} in query")
+        return node
+
+    def or_expr(self) -> Node:
+        children = [self.and_expr()]
+        while self.peek() == ("keyword", "or"):
+            self.pos += 1
+            children.append(self.and_expr())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def and_expr(self) -> Node:
+        children = [self.not_expr()]
+        while self.peek() == ("keyword", "and"):
+            self.pos += 1
+            children.append(self.not_expr())
+        return children[0] if len(children) == 1 else And(children)
+
+    def not_expr(self) -> Node:
+        if self.peek() == ("keyword", "not"):
+            self.pos += 1
+            return Not(self.not_expr())
+        if self.peek() == ("paren", "("):
+            self.pos += 1
+            node = self.or_expr()
+            self.take("paren", ")")
+            return node
+        return self.comparison()
+
+    def comparison(self) -> Node:
+        ratio = self.take("name")
+        if self.peek() == ("keyword", "between"):
+            self.pos += 1
+            low = float(self.take("number"))
+            self.take("keyword", "and")
+            return Between(ratio, low, float(self.take("number")))
+        op = self.take("op")
+        return Comparison(ratio, op, float(self.take("number")))
+
+
+@functools.lru_cache(maxsize=256)
+def parse_query(query: str) -> Node:
+    """parses a query (each distinct query is parsed just once)"""
+    tokens = tokenize(query)
+    if not tokens:
+        raise QueryError("empty query")
+    return _Parser(tokens).parse()
+
+
+def ratio_aliases(ratios: Iterable[str]) -> Dict[str, str]:
+    """
+    lower-case alias -> ratio name, for each ratio its name, the abbreviation in
+    brackets & the name without the brackets (full names take precedence over aliases)
+    """
+    ratios = list(ratios)
+    aliases = {r.lower(): r for r in ratios}
+    for ratio in ratios:
+        match = re.fullmatch(r"(.*?)\s*\((.+)\)", ratio)
+        if match:
+            for alias in match.groups():
+                if alias != "%":
+                    aliases.setdefault(alias.strip().lower(), ratio)
+    return aliases
+
+
+class SortedIndex:
+    """values of one ratio (NaN excluded) in sorted order, with their row positions"""
+
+    def __init__(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        self.nrows = len(values)
+        order = np.argsort(values, kind="stable")  # NaN sort last
+        self.count = int(np.count_nonzero(~np.isnan(values)))
+        self.order = order[: self.count]
+        self.sorted = values[self.order]
+
+    def positions(self, op: str, value: float) -> np.ndarray:
+        """row positions whose value satisfies `<value> op value`, by binary search"""
+        left = np.searchsorted(self.sorted, value, side="left")
+        right = np.searchsorted(self.sorted, value, side="right")
+        if op == ">":
+            return self.order[right:]
+        if op == ">=":
+            return self.order[left:]
+        if op == "<":
+            return self.order[:left]
+        if op == "<=":
+            return self.order[:right]
+        if op == "==":
+            return self.order[left:right]
+        if op == "!=":
+            return np.concatenate([self.order[:left], self.order[right:]])
+        raise QueryError(f"unknown comparison {op!r}")
+
+    def _mask(self, positions: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.nrows, dtype=bool)
+        mask[positions] = True
+        return mask
+
+    def mask(self, op: str, value: float) -> np.ndarray:
+        return self._mask(self.positions(op, value))
+
+    def between(self, low: float, high: float) -> np.ndarray:
+        left = np.searchsorted(self.sorted, low, side="left")
+        right = np.searchsorted(self.sorted, high, side="right")
+        return self._mask(self.order[left:right])
+
+    def available(self) -> np.ndarray:
+        return self._mask(self.order)
+
+
+class RatioTable:
+    """
+    Ratios of many companies to screen with queries - one row per company (or per
+    company & fiscal year) & one column per ratio
+
+    Args:
+        values (np.ndarray) - 2D array of ratio values, rows x ratios
+        rows (pd.Index) - label of each row (symbol, or (symbol, fiscal year))
+        ratios (list) - names of the ratios (columns)
+    """
+
+    def __init__(self, values: np.ndarray, rows: pd.Index, ratios: List[str]):
+        self.values = values
+        self.rows = rows
+        self.ratios = list(ratios)
+        self._ratio_pos = {r: i for i, r in enumerate(self.ratios)}
+        self._aliases = ratio_aliases(self.ratios)
+        self._indexes: Dict[str, SortedIndex] = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return f"RatioTable({len(self.rows)} rows x {len(self.ratios)} ratios)"
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "RatioTable":
+        """table of a dataframe of ratios (e.g. a ratio panel, or the latest ratios)"""
+        return cls(df.to_numpy(dtype=float), df.index, list(df.columns))
+
+    @classmethod
+    def from_cube(
+        cls, cube: RatioCube, period: Union[int, str, None] = "latest"
+    ) -> "RatioTable":
+        """
+        table of the ratios in a ratio cube
+
+        Args:
+            cube - the RatioCube
+            period - a fiscal year (one row per company), "latest" (one row per company,
+                its latest fiscal year with any ratio) or None (one row per company &
+                fiscal year, all-NaN rows left out)
+        """
+        values = np.asarray(cube.values)
+        if period is None:
+            flat = values.reshape(-1, len(cube.ratios))
+            keep = ~np.isnan(flat).all(axis=1)
+            rows = pd.MultiIndex.from_product(
+                [cube.symbols, cube.periods], names=["symbol", "fiscal_year"]
+            )[keep]
+            return cls(flat[keep], rows, cube.ratios)
+        if period == "latest":
+            has_data = ~np.isnan(values).all(axis=2)
+            latest = len(cube.periods) - 1 - np.argmax(has_data[:, ::-1], axis=1)
+            table = values[np.arange(len(cube.symbols)), latest]
+            rows = pd.Index(cube.symbols, name="symbol")
+            return cls(table, rows, cube.ratios)
+        return cls(
+            np.asarray(cube.period(period).to_numpy()),
+            pd.Index(cube.symbols, name="symbol"),
+            cube.ratios,
+        )
+
+    def resolve(self, name: str) -> str:
+        """ratio name of a name or alias used in a query"""
+        try:
+            return self._aliases[name.strip().lower()]
+        except KeyError:
+            raise QueryError(f"unknown ratio {name!r}") from None
+
+    def index(self, name: str) -> SortedIndex:
+        """sorted index of a ratio, built on first use"""
+        ratio = self.resolve(name)
+        if ratio not in self._indexes:
+            self._indexes[ratio] = SortedIndex(self.values[:, self._ratio_pos[ratio]])
+        return self._indexes[ratio]
+
+    def available(self, names: Iterable[str]) -> np.ndarray:
+        """True for rows that have values of all the ratios"""
+        mask = np.ones(len(self.rows), dtype=bool)
+        for name in names:
+            mask &= self.index(name).available()
+        return mask
+
+    def mask(self, query: str) -> np.ndarray:
+        """boolean mask of rows that match the query"""
+        return parse_query(query).evaluate(self)
+
+    def screen(
+        self, query: str, columns: Optional[Iterable[str]] = None
+    ) -> pd.DataFrame:
+        """
+        rows that match the query, with the ratios used by the query (or `columns`)
+        """
+        node = parse_query(query)
+        mask = node.evaluate(self)
+        names = columns if columns is not None else node.ratios()
+        ratios = list(dict.fromkeys(self.resolve(n) for n in names))
+        positions = [self._ratio_pos[r] for r in ratios]
+        return pd.DataFrame(
+            self.values[np.ix_(mask, positions)], index=self.rows[mask], columns=ratios
+        )
@@ -0,0 +1,238 @@
+"""
+ratio_cube.py - compact, memory-mapped store of ratios of many companies
+
+Keeping the ratio history of thousands of companies as thousands of small pandas
+dataframes takes a lot of memory & a long time to load. This module saves the ratios
+as one float32 array (a "cube" of symbol x fiscal year x ratio) in a .npy file, with a
+small JSON index of symbol, fiscal year & ratio names alongside it. The .npy file is
+memory-mapped, so queries such as "RoE of all companies in 2023" or "all ratios of
+TCS.NS" read just the slice they need, not the whole file.
+
+Fiscal years are labelled with the calendar year in which they end (e.g. a financial
+year ending 31-Mar-2023 is 2023).
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import json
+import pathlib
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+from . import ratios as fira
+from .ratios import FinancialStatements, get_statements
+from .statement_cache import CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR
+
+RATIO_FUNCTIONS = (
+    fira.liquidity_ratios,
+    fira.profitability_ratios,
+    fira.efficiency_ratios,
+    fira.valuation_ratios,
+    fira.leverage_ratios,
+    fira.performance_and_growth_metrics,
+)
+
+
+def company_ratios(ticker_symbol: Union[str, FinancialStatements]) -> pd.DataFrame:
+    """
+    returns all ratios of a company (outputs of all ratio functions of ratios.py, side
+    by side), as a pandas dataframe with datetime index of financial year-end dates
+    """
+    statements = get_statements(ticker_symbol)
+    return pd.concat([func(statements) for func in RATIO_FUNCTIONS], axis=1)
+
+
+def default_cube_path() -> pathlib.Path:
+    """ratio_cube.npy in the statement cache folder"""
+    return pathlib.Path(os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))) / (
+        "ratio_cube.npy"
+    )
+
+
+def _fiscal_years(dates: Iterable) -> np.ndarray:
+    return pd.DatetimeIndex(dates).year.to_numpy()
+
+
+class RatioCube:
+    """
+    Read-only, memory-mapped cube of ratios (symbol x fiscal year x ratio)
+
+    Args:
+        path (str or pathlib.Path) - path of the .npy file (default: ratio_cube.npy
+            in the statement cache folder). The index is read from the .json file of
+            the same name.
+
+    Example:
+        ```python
+        statements = [FinancialStatements(s) for s in ["AAPL", "MSFT", "TCS.NS"]]
+        cube = RatioCube.build({s.ticker_symbol: company_ratios(s) for s in statements})
+        print(cube.ratio("Return on Equity (RoE)", 2023))  # RoE of all companies in 2023
+        print(cube.company("TCS.NS"))  # all ratios of TCS, one row per fiscal year
+        ```
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = pathlib.Path(path) if path is not None else default_cube_path()
+        with open(str(self.path.with_suffix(".json")), "r") as f:
+            index = json.load(f)
+        self.symbols: List[str] = index["symbols"]
+        self.periods: List[int] = index["periods"]
+        self.ratios: List[str] = index["ratios"]
+        self._symbol_pos = {s: i for i, s in enumerate(self.symbols)}
+        self._period_pos = {p: i for i, p in enumerate(self.periods)}
+        self._ratio_pos = {r: i for i, r in enumerate(self.ratios)}
+        self.values = np.load(str(self.path), mmap_mode="r")
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __repr__(self):
+        return (
+            f"RatioCube({len(self.symbols)} symbols x {len(self.periods)} years "
+            f"x {len(self.ratios)} ratios)"
+        )
+
+    def _pos(self, positions: Dict, key, axis: str) -> int:
+        try:
+            return positions[key]
+        except KeyError:
+            raise KeyError(f"{key!r} is not a {axis} in the ratio cube") from None
+
+    def value(self, symbol: str, period: int, ratio: str) -> float:
+        """returns a single ratio value (NaN if not available)"""
+        return float(
+            self.values[
+                self._pos(self._symbol_pos, symbol, "symbol"),
+                self._pos(self._period_pos, period, "fiscal year"),
+                self._pos(self._ratio_pos, ratio, "ratio"),
+            ]
+        )
+
+    def ratio(
+        self, ratio: str, period: Optional[int] = None
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """
+        returns values of one ratio for all companies - a pandas series indexed by
+        symbol for one fiscal year, else a dataframe of symbols x fiscal years
+        """
+        r = self._pos(self._ratio_pos, ratio, "ratio")
+        if period is not None:
+            p = self._pos(self._period_pos, period, "fiscal year")
+            return pd.Series(
+                np.asarray(self.values[:, p, r]), index=self.symbols, name=ratio
+            )
+        return pd.DataFrame(
+            np.asarray(self.values[:, :, r]), index=self.symbols, columns=self.periods
+        )
+
+    def company(self, symbol: str) -> pd.DataFrame:
+        """returns all ratios of a company, one row per fiscal year (all-NaN years dropped)"""
+        s = self._pos(self._symbol_pos, symbol, "symbol")
+        df = pd.DataFrame(
+            np.asarray(self.values[s]), index=self.periods, columns=self.ratios
+        )
+        df.index.name = "fiscal_year"
+        return df.dropna(how="all")
+
+    def period(self, period: int) -> pd.DataFrame:
+        """returns all ratios of all companies for one fiscal year"""
+        p = self._pos(self._period_pos, period, "fiscal year")
+        return pd.DataFrame(
+            np.asarray(self.values[:, p, :]), index=self.symbols, columns=self.ratios
+        )
+
+    @classmethod
+    def build(
+        cls,
+        frames: Mapping[str, pd.DataFrame],
+        path: Optional[str] = None,
+        ratios: Optional[Iterable[str]] = None,
+    ) -> "RatioCube":
+        """
+        Writes ratios of many companies to a new cube (replacing any existing cube at path)
+
+        Args:
+            frames - symbol -> ratios of the company, as returned by the ratio functions
+                of ratios.py (e.g. company_ratios(symbol)), with datetime index of
+                financial year-end dates
+            path - path of the .npy file (default: ratio_cube.npy in the cache folder)
+            ratios - names of ratios to save (default: all columns of the frames)
+        """
+        if ratios is None:
+            ratios = list(
+                dict.fromkeys(c for df in frames.values() for c in df.columns)
+            )
+        ratios = list(ratios)
+        symbols = list(frames.keys())
+        periods = sorted(
+            {int(y) for df in frames.values() for y in _fiscal_years(df.index)}
+        )
+
+        def fill(values: np.ndarray):
+            period_pos = {p: i for i, p in enumerate(periods)}
+            for s, df in enumerate(frames.values()):
+                if df.empty:
+                    continue
+                df = df.reindex(columns=ratios).sort_index()
+                years = _fiscal_years(df.index)
+                # if the financial year-end changed, keep the later of two periods in a year
+                keep = ~pd.Series(years).duplicated(keep="last").to_numpy()
+                rows = [period_pos[int(y)] for y in years[keep]]
+                values[s, rows, :] = df.to_numpy(dtype=np.float32)[keep]
+
+        return cls._write(path, symbols, periods, ratios, fill)
+
+    @classmethod
+    def from_panel(cls, panel: pd.DataFrame, path: Optional[str] = None) -> "RatioCube":
+        """
+        Writes the ratios of a ratio panel (see panel.ratio_panel, which calculates the
+        same ratios as ratios.py for many companies at once) to a new cube
+        """
+        symbols = list(dict.fromkeys(panel.index.get_level_values("symbol")))
+        panel = panel.sort_index(level=["symbol", "fiscal_year"])
+        symbol_level = panel.index.get_level_values("symbol")
+        years = _fiscal_years(panel.index.get_level_values("fiscal_year"))
+        # if the financial year-end changed, keep the later of two periods in a year
+        keep = ~pd.DataFrame({"s": symbol_level, "y": years}).duplicated(keep="last")
+        keep = keep.to_numpy()
+        panel, symbol_level, years = panel[keep], symbol_level[keep], years[keep]
+        periods = sorted({int(y) for y in years})
+        ratios = list(panel.columns)
+
+        def fill(values: np.ndarray):
+            s = pd.Index(symbols).get_indexer(symbol_level)
+            p = np.searchsorted(periods, years)
+            values[s, p, :] = panel.to_numpy(dtype=np.float32)
+
+        return cls._write(path, symbols, periods, ratios, fill)
+
+    @classmethod
+    def _write(cls, path, symbols, periods, ratios, fill) -> "RatioCube":
+        path = pathlib.Path(path) if path is not None else default_cube_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to temporary files & rename, so readers never see a half-written cube
+        tmp_path = path.with_name(path.stem + ".tmp.npy")
+        values = open_memmap(
+            str(tmp_path),
+            mode="w+",
+            dtype=np.float32,
+            shape=(len(symbols), len(periods), len(ratios)),
+        )
+        values[:] = np.nan
+        fill(values)
+        values.flush()
+        del values
+
+        tmp_index_path = path.with_name(path.stem + ".tmp.json")
+        with open(str(tmp_index_path), "w") as f:
+            json.dump({"symbols": symbols, "periods": periods, "ratios": ratios}, f)
+        os.replace(str(tmp_path), str(path))
+        os.replace(str(tmp_index_path), str(path.with_suffix(".json")))
+        return cls(path)
@@ -15,10 +15,17 @@ warnings.filterwarnings("ignore")
 
 import os
 import pathlib
+from functools import cached_property
+from typing import Any, Dict, Iterable, Optional, Union
 import numpy as np
 import pandas as pd
 import yfinance as yf
 
+from .prices import AS_OF_TOLERANCE, PriceHistory, closes_at, default_price_history
+from .statement_cache import StatementCache, default_cache
+from .symbol_index import SymbolIndex, default_symbol_index
+from .tracing import span, traced
+
 # display tweaks
 # Set Pandas to display float values with 4 decimal places
 pd.options.display.float_format = "{:.4f}".format
@@ -29,23 +36,287 @@ pd.options.display.max_rows = 100  # before truncation
 np.set_printoptions(precision=4, suppress=True)
 
 
-def is_valid_ticker(symbol: str) -> bool:
+class FinancialStatements:
+    """
+    Snapshot of a company's financial statements, as downloaded from Yahoo! Finance.
+
+    Each statement is downloaded just once (on first access), transposed so that rows are
+    financial-year-end dates & columns are line items, and sorted by date. All the ratio
+    functions in this module accept a FinancialStatements instance in place of a ticker
+    symbol, so a report that calculates all ratios for a company costs one download per
+    statement instead of one per ratio function.
+
+    Args:
+        ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
+            (e.g., AAPL for Apple, AMZN for Amazon, RELIANCE.NS for Reliance Industries)
+        cache (StatementCache) - local cache to read statements from (& save them to)
+            (default: the process-wide cache, see statement_cache.default_cache())
+        force_refresh (bool) - download statements again, even if cached copies are fresh
+        frequency (str) - "annual" (default) for financial-year-end statements or
+            "quarterly" for quarterly statements (for trailing-twelve-month ratios,
+            see panel.ratio_panel)
+
+    Example:
+        ```python
+        statements = FinancialStatements("RELIANCE.NS")
+        print(statements.info["longName"])
+        print(liquidity_ratios(statements))
+        print(profitability_ratios(statements))  # no new downloads for balance sheet
+        ```
+    """
+
+    # statements available on yf.Ticker (in Yahoo's layout - line items x dates)
+    STATEMENT_NAMES = ("balance_sheet", "financials", "income_stmt", "cash_flow")
+    # quarterly statements are the same attributes, prefixed with "quarterly_"
+    FREQUENCIES = {"annual": 1, "quarterly": 4}
+
+    def __init__(
+        self,
+        ticker_symbol: str,
+        cache: Optional[StatementCache] = None,
+        force_refresh: bool = False,
+        frequency: str = "annual",
+    ):
+        if frequency not in self.FREQUENCIES:
+            raise ValueError(
+                f"frequency should be one of {list(self.FREQUENCIES)}, got {frequency!r}"
+            )
+        self.ticker_symbol = ticker_symbol
+        self.cache = cache
+        self.force_refresh = force_refresh
+        self.frequency = frequency
+        # raw (un-transposed) statements & info, filled in as they are downloaded
+        self._raw: Dict[str, Any] = {}
+
+    @classmethod
+    def from_frames(
+        cls,
+        ticker_symbol: str,
+        balance_sheet: pd.DataFrame,
+        financials: pd.DataFrame,
+        income_stmt: Optional[pd.DataFrame] = None,
+        cash_flow: Optional[pd.DataFrame] = None,
+        info: Optional[Dict[str, Any]] = None,
+        frequency: str = "annual",
+        prices: Optional[pd.Series] = None,
+    ) -> "FinancialStatements":
+        """
+        Creates a snapshot from statements that have already been downloaded, for example
+        from a local cache. Frames are expected in Yahoo's layout (line items as rows and
+        financial-year-end dates as columns), exactly as returned by yf.Ticker.
+
+        Args:
+            ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
+            balance_sheet, financials, income_stmt, cash_flow (pd.DataFrame) - the statements
+                (income_stmt defaults to financials, as both are the same on Yahoo! Finance)
+            info (dict) - the yf.Ticker(ticker_symbol).info dictionary
+            frequency (str) - "annual" or "quarterly", the frequency of the statements
+            prices (pd.Series) - daily closing prices (not split-adjusted), indexed by date
+
+        Returns:
+            a FinancialStatements instance, that will not make any network calls
+        """
+        statements = cls(ticker_symbol, frequency=frequency)
+        raw_names = {
+            name: statements.attribute_name(name) for name in cls.STATEMENT_NAMES
+        }
+        statements._raw[raw_names["balance_sheet"]] = balance_sheet
+        statements._raw[raw_names["financials"]] = financials
+        statements._raw[raw_names["income_stmt"]] = (
+            income_stmt if income_stmt is not None else financials
+        )
+        statements._raw[raw_names["cash_flow"]] = (
+            cash_flow if cash_flow is not None else pd.DataFrame()
+        )
+        statements._raw["info"] = info if info is not None else {}
+        statements._raw["prices"] = (
+            prices if prices is not None else pd.Series(dtype=float)
+        )
+        return statements
+
+    def _cache(self) -> Optional[StatementCache]:
+        return self.cache if self.cache is not None else default_cache()
+
+    @cached_property
+    def ticker(self) -> yf.Ticker:
+        return yf.Ticker(self.ticker_symbol)
+
+    @property
+    def periods_per_year(self) -> int:
+        return self.FREQUENCIES[self.frequency]
+
+    def attribute_name(self, name: str) -> str:
+        """returns yf.Ticker attribute of statement `name` at this snapshot's frequency"""
+        return name if self.frequency == "annual" else f"{self.frequency}_{name}"
+
+    def raw_statement(self, name: str) -> pd.DataFrame:
+        """
+        returns statement `name` (one of STATEMENT_NAMES) at this snapshot's frequency,
+        in Yahoo's layout (line items x dates), downloading it once
+        """
+        name = self.attribute_name(name)
+        if name not in self._raw:
+            cache = self._cache()
+            with span(f"fetch {name}"):
+                if cache is None:
+                    self._raw[name] = getattr(self.ticker, name)
+                else:
+                    self._raw[name] = cache.get_statement(
+                        self.ticker_symbol,
+                        name,
+                        loader=lambda: getattr(self.ticker, name),
+                        force_refresh=self.force_refresh,
+                    )
+        return self._raw[name]
+
+    def _statement(self, name: str) -> pd.DataFrame:
+        return self.raw_statement(name).transpose().sort_index(ascending=True)
+
+    @cached_property
+    def info(self) -> Dict[str, Any]:
+        if "info" not in self._raw:
+            cache = self._cache()
+            with span("fetch info"):
+                if cache is None:
+                    self._raw["info"] = self.ticker.info
+                else:
+                    self._raw["info"] = cache.get_info(
+                        self.ticker_symbol,
+                        loader=lambda: self.ticker.info,
+                        force_refresh=self.force_refresh,
+                    )
+        return self._raw["info"]
+
+    @property
+    def prices(self) -> pd.Series:
+        """
+        daily closing prices (not split-adjusted) over the periods of the statements,
+        downloaded once (see load_prices to download prices of many companies at once)
+        """
+        if "prices" not in self._raw:
+            load_prices([self])
+        return self._raw["prices"]
+
+    def prices_at(self, dates: Iterable) -> pd.Series:
+        """returns closing price on (or just before) each of the dates"""
+        dates = pd.DatetimeIndex(list(dates))
+        closes = self.prices.to_frame(self.ticker_symbol)
+        return pd.Series(
+            closes_at(closes, [self.ticker_symbol] * len(dates), dates), index=dates
+        )
+
+    @cached_property
+    def balance_sheet(self) -> pd.DataFrame:
+        return self._statement("balance_sheet")
+
+    @cached_property
+    def financials(self) -> pd.DataFrame:
+        return self._statement("financials")
+
+    @cached_property
+    def income_stmt(self) -> pd.DataFrame:
+        return self._statement("income_stmt")
+
+    @cached_property
+    def cash_flow(self) -> pd.DataFrame:
+        return self._statement("cash_flow")
+
+    @property
+    def has_inventory(self) -> bool:
+        # some companies may not report inventory (e.g. Reliance does, Persistent does not)
+        return "Inventory" in self.balance_sheet.columns
+
+
+@traced("fira.get_statements")
+def get_statements(
+    ticker_symbol: Union[str, FinancialStatements],
+) -> FinancialStatements:
     """
-    Checks if symbol is a valid ticker symbol. For it to be valud, yf.Ticker(symbol).info
+    Returns a FinancialStatements snapshot for ticker_symbol. If ticker_symbol is
+    already a snapshot, it is returned as-is (so nothing is downloaded again).
+    """
+    if isinstance(ticker_symbol, FinancialStatements):
+        return ticker_symbol
+    return FinancialStatements(ticker_symbol)
+
+
+@traced("fira.load_prices")
+def load_prices(
+    statements: Iterable[FinancialStatements],
+    price_history: Optional[PriceHistory] = None,
+):
+    """
+    Downloads closing prices over the statement periods of all companies that do not
+    have them yet with a single bulk download (see prices.PriceHistory), and keeps them
+    in each company's FinancialStatements snapshot
+    """
+    pending = [s for s in statements if "prices" not in s._raw]
+    if not pending:
+        return
+    dates = pd.DatetimeIndex([])
+    for stmts in pending:
+        dates = dates.union(stmts.balance_sheet.index).union(stmts.financials.index)
+    if dates.empty:
+        for stmts in pending:
+            stmts._raw["prices"] = pd.Series(dtype=float)
+        return
+    price_history = price_history or default_price_history()
+    # latest split of companies whose info is already downloaded (info's lastSplitDate
+    # is in epoch seconds) - prices cached before it are downloaded again
+    last_splits = {
+        s.ticker_symbol: pd.Timestamp(s._raw["info"]["lastSplitDate"], unit="s")
+        for s in pending
+        if isinstance((s._raw.get("info") or {}).get("lastSplitDate"), (int, float))
+    }
+    closes = price_history.closes(
+        [s.ticker_symbol for s in pending],
+        start=dates.min() - AS_OF_TOLERANCE,
+        end=dates.max(),
+        force_refresh=any(s.force_refresh for s in pending),
+        last_splits=last_splits,
+    )
+    for stmts in pending:
+        if stmts.ticker_symbol in closes.columns:
+            stmts._raw["prices"] = closes[stmts.ticker_symbol].dropna()
+        else:
+            stmts._raw["prices"] = pd.Series(dtype=float)
+
+
+@traced("fira.is_valid_ticker")
+def is_valid_ticker(
+    symbol: Union[str, FinancialStatements], index: Optional[SymbolIndex] = None
+) -> bool:
+    """
+    Checks if symbol is a valid ticker symbol. Symbols found in the local symbol index
+    are valid without any network call, else, for it to be valud, yf.Ticker(symbol).info
     should not raise an exception!
 
     Args:
         symbol(str): a ticker symbol (such as "AAPL" or "PERSISTENT.NS")
         (please visit Yahoo Finance website to get valid symbol of company)
+        or a FinancialStatements snapshot, in which case the downloaded info is
+        kept in the snapshot & re-used by the ratio functions
+        index (SymbolIndex): index of listed symbols (default: index of the listing
+        files in the `listings` folder, see symbol_index.py)
     """
+    if index is None:
+        index = default_symbol_index()
+    ticker_symbol = (
+        symbol.ticker_symbol if isinstance(symbol, FinancialStatements) else symbol
+    )
+    # a listed symbol spelled differently than on Yahoo! Finance (e.g. BRK.B for
+    # BRK-B) is still checked, as Yahoo! Finance doesn't know that spelling
+    if index is not None and index.normalize(ticker_symbol) == ticker_symbol.upper():
+        return True
     try:
-        ticker = yf.Ticker(symbol)
-        return "shortName" in ticker.info
+        statements = get_statements(symbol)
+        return "shortName" in statements.info
     except Exception as e:
         return False
 
 
-def liquidity_ratios(ticker_symbol: str) -> pd.DataFrame:
+@traced("fira.liquidity_ratios")
+def liquidity_ratios(ticker_symbol: Union[str, FinancialStatements]) -> pd.DataFrame:
     """
     Calculates the following end-of-financial-year liquidity ratios
         - Current Ratio = Current Assets / Current Liabilities
@@ -61,6 +332,8 @@ def liquidity_ratios(ticker_symbol: str) -> pd.DataFrame:
     Args:
         ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
             (e.g., AAPL for Apple, AMZN for Amazon, RELIANCE.NS for Reliance Industries)
+            or a FinancialStatements snapshot of the company, which avoids downloading
+            statements again when calculating several groups of ratios
 
     Returns:
         a pandas dataframe, with datetime index of financial year-end dates
@@ -87,14 +360,13 @@ def liquidity_ratios(ticker_symbol: str) -> pd.DataFrame:
             2024-03-31        1.1830      0.7986     0.2354
         ```
     """
-    # ticker_data, financials, balance_sheet, cash_flow = fetch_data(ticker_symbol)
-    ticker = yf.Ticker(ticker_symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
+    statements = get_statements(ticker_symbol)
+    balance_sheet = statements.balance_sheet
 
     current_assets = balance_sheet["Current Assets"]
     current_liabilities = balance_sheet["Current Liabilities"]
     # some companies may not report inventory (e.g. Reliance does, Persistent does not)
-    inventory_fields_exist = "Inventory" in ticker.balance_sheet.index
+    inventory_fields_exist = statements.has_inventory
 
     ratios = {}
     ratios["Current Ratio"] = current_assets / current_liabilities
@@ -111,7 +383,10 @@ def liquidity_ratios(ticker_symbol: str) -> pd.DataFrame:
     return pd.DataFrame(ratios)
 
 
-def profitability_ratios(ticker_symbol: str) -> pd.DataFrame:
+@traced("fira.profitability_ratios")
+def profitability_ratios(
+    ticker_symbol: Union[str, FinancialStatements],
+) -> pd.DataFrame:
     """
     Calculates the following end-of-financial-year profitability ratios
         - Return on Equity (RoE) = Net Income / Shareholder's Equity
@@ -132,6 +407,8 @@ def profitability_ratios(ticker_symbol: str) -> pd.DataFrame:
     Args:
         ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
             (e.g., AAPL for Apple, AMZN for Amazon, RELIANCE.NS for Reliance Industries)
+            or a FinancialStatements snapshot of the company, which avoids downloading
+            statements again when calculating several groups of ratios
 
     Returns:
         a pandas dataframe, with datetime index of financial year-end dates
@@ -148,10 +425,10 @@ def profitability_ratios(ticker_symbol: str) -> pd.DataFrame:
         print(df)
         ```
     """
-    ticker = yf.Ticker(ticker_symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
-    income_stmt = ticker.income_stmt.transpose().sort_index(ascending=True)
+    statements = get_statements(ticker_symbol)
+    balance_sheet = statements.balance_sheet
+    financials = statements.financials
+    income_stmt = statements.income_stmt
 
     revenue = financials["Total Revenue"]
     operating_income = financials["Operating Income"]
@@ -173,7 +450,10 @@ def profitability_ratios(ticker_symbol: str) -> pd.DataFrame:
     return pd.DataFrame(ratios)
 
 
-def efficiency_ratios(ticker_symbol: str) -> pd.DataFrame:
+@traced("fira.efficiency_ratios")
+def efficiency_ratios(
+    ticker_symbol: Union[str, FinancialStatements],
+) -> pd.DataFrame:
     """
     Calculates the following end-of-financial-year efficiency ratios
         - Asset Turnover Ratio = Revenue / Total Assets
@@ -188,14 +468,16 @@ def efficiency_ratios(ticker_symbol: str) -> pd.DataFrame:
     Args:
         ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
             (e.g., AAPL for Apple, AMZN for Amazon, RELIANCE.NS for Reliance Industries)
+            or a FinancialStatements snapshot of the company, which avoids downloading
+            statements again when calculating several groups of ratios
 
     Returns:
         a pandas dataframe, with datetime index of financial year-end dates
         and calculated efficiency ratios as columns
     """
-    ticker = yf.Ticker(ticker_symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
+    statements = get_statements(ticker_symbol)
+    balance_sheet = statements.balance_sheet
+    financials = statements.financials
 
     ratios = {}
 
@@ -206,7 +488,7 @@ def efficiency_ratios(ticker_symbol: str) -> pd.DataFrame:
     # Inventory Data
     # NOTE: inventory may or may not get reported. For example,
     # Tata Motors reports it, Persisteny Systems does not
-    inventory_fields_exist = "Inventory" in ticker.balance_sheet.index
+    inventory_fields_exist = statements.has_inventory
     if inventory_fields_exist:
         inventory = balance_sheet["Inventory"]
         average_inventory = inventory.rolling(2).mean()
@@ -218,9 +500,13 @@ def efficiency_ratios(ticker_symbol: str) -> pd.DataFrame:
     return pd.DataFrame(ratios)
 
 
-def valuation_ratios(ticker_symbol: str) -> pd.DataFrame:
+@traced("fira.valuation_ratios")
+def valuation_ratios(
+    ticker_symbol: Union[str, FinancialStatements],
+) -> pd.DataFrame:
     """
-    Calculates the following end-of-financial-year valuation ratios
+    Calculates the following end-of-financial-year valuation ratios, using the share price
+    at each financial-year-end (so market cap = closing price x shares outstanding on that date)
         - Price-to-Earnings Ratio (P/E) - Price per Share / Earnings per Share (EPS)
         - Price-to-Sales Ratio (P/S) - Market Capitalization / Revenue
         - Price-to-Book Ratio (P/B) - Market Capitalization / Book Value of Equity
@@ -243,18 +529,23 @@ def valuation_ratios(ticker_symbol: str) -> pd.DataFrame:
     Args:
         ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
             (e.g., AAPL for Apple, AMZN for Amazon, RELIANCE.NS for Reliance Industries)
+            or a FinancialStatements snapshot of the company, which avoids downloading
+            statements again when calculating several groups of ratios
 
     Returns:
         a pandas dataframe, with datetime index of financial year-end dates
         and calculated profitability ratios as columns
     """
-    ticker = yf.Ticker(ticker_symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
+    statements = get_statements(ticker_symbol)
+    balance_sheet = statements.balance_sheet
+    financials = statements.financials
 
     ratios = {}
 
-    market_cap = ticker.info["marketCap"]
+    close = statements.prices_at(balance_sheet.index)
+    shares_outstanding = balance_sheet["Ordinary Shares Number"]
+    market_cap = close * shares_outstanding
+    eps = financials["Net Income"] / shares_outstanding
     revenue = financials["Total Revenue"]
     shareholder_equity = balance_sheet["Stockholders Equity"]
     ebidta = financials.get(
@@ -266,7 +557,7 @@ def valuation_ratios(ticker_symbol: str) -> pd.DataFrame:
     cash_equivalents = balance_sheet["Cash And Cash Equivalents"]
     ev = market_cap + total_debt - cash_equivalents
 
-    ratios["Price-to-Earnings (P/E)"] = ticker.info["trailingPE"]
+    ratios["Price-to-Earnings (P/E)"] = close / eps
     ratios["Price-to-Sales (P/S)"] = market_cap / revenue
     ratios["Price-to-Book (P/B)"] = market_cap / shareholder_equity
     ratios["EV/EBIDTA"] = ev / ebidta
@@ -274,7 +565,10 @@ def valuation_ratios(ticker_symbol: str) -> pd.DataFrame:
     return pd.DataFrame(ratios)
 
 
-def leverage_ratios(ticker_symbol: str) -> pd.DataFrame:
+@traced("fira.leverage_ratios")
+def leverage_ratios(
+    ticker_symbol: Union[str, FinancialStatements],
+) -> pd.DataFrame:
     """
     Calculates the following end-of-financial-year leverage ratios
         - Debt-to-Equity Ratio (D/E) - Total Debt / Shareholders Equity
@@ -288,14 +582,16 @@ def leverage_ratios(ticker_symbol: str) -> pd.DataFrame:
     Args:
         ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
             (e.g., AAPL for Apple, AMZN for Amazon, RELIANCE.NS for Reliance Industries)
+            or a FinancialStatements snapshot of the company, which avoids downloading
+            statements again when calculating several groups of ratios
 
     Returns:
         a pandas dataframe, with datetime index of financial year-end dates
         and calculated profitability ratios as columns
     """
-    ticker = yf.Ticker(ticker_symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
+    statements = get_statements(ticker_symbol)
+    balance_sheet = statements.balance_sheet
+    financials = statements.financials
 
     total_debt = balance_sheet["Total Debt"]
     shareholder_equity = balance_sheet["Stockholders Equity"]
@@ -309,7 +605,10 @@ def leverage_ratios(ticker_symbol: str) -> pd.DataFrame:
     return pd.DataFrame(ratios)
 
 
-def performance_and_growth_metrics(ticker_symbol: str) -> pd.DataFrame:
+@traced("fira.performance_and_growth_metrics")
+def performance_and_growth_metrics(
+    ticker_symbol: Union[str, FinancialStatements],
+) -> pd.DataFrame:
     """
     Calculates the following end-of-financial-year performance & growth metrics
         - Revenue Growth (%) = (Current Year Revenue - Previous Year Revenue) / Previous Year Revenue
@@ -350,15 +649,17 @@ def performance_and_growth_metrics(ticker_symbol: str) -> pd.DataFrame:
     Args:
         ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
             (e.g., AAPL for Apple, AMZN for Amazon, RELIANCE.NS for Reliance Industries)
+            or a FinancialStatements snapshot of the company, which avoids downloading
+            statements again when calculating several groups of ratios
 
     Returns:
         a pandas dataframe, with datetime index of financial year-end dates
         and calculated profitability ratios as columns
     """
-    ticker = yf.Ticker(ticker_symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
-    cash_flow = ticker.cash_flow.transpose().sort_index(ascending=True)
+    statements = get_statements(ticker_symbol)
+    balance_sheet = statements.balance_sheet
+    financials = statements.financials
+    cash_flow = statements.cash_flow
 
     ratios = pd.DataFrame(index=financials.index)
     ratios["Revenue Growth (%)"] = financials["Total Revenue"].pct_change() * 100.0
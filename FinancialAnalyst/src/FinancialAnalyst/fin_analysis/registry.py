@@ -0,0 +1,524 @@
+"""
+registry.py - declarative registry of financial ratios
+
+Each ratio is declared once, as an expression over statement line items, for example
+    register("Return on Equity (RoE)", net_income / shareholder_equity, "profitability_ratios")
+Expressions are built from Item (a statement line item), Info (a yf.Ticker.info field)
+& operators (+, -, *, /, pct_change, rolling_mean2). The same declarations are used
+for trailing-twelve-month (TTM) ratios over quarterly statements (see to_ttm). Asking for a set of ratios compiles
+their expressions into a dependency graph (DAG), where identical sub-expressions shared
+by several ratios (such as Total Revenue, EBIT or Stockholders Equity) are a single node.
+Each node is then evaluated just once, in dependency order, and only nodes needed by the
+requested ratios are evaluated.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+class Expr:
+    """
+    Node of a ratio expression. Sub-classes define `key` (structural identity, so that
+    identical expressions are merged into one node of the graph), `deps` (input nodes)
+    and `compute` (calculates node value from the values of its inputs)
+    """
+
+    key: Tuple = ()
+    deps: Tuple["Expr", ...] = ()
+
+    def compute(self, inputs: List[np.ndarray], context) -> np.ndarray:
+        raise NotImplementedError
+
+    # operators, so expressions read like formulas
+    def __add__(self, other):
+        return BinOp("+", self, as_expr(other))
+
+    def __radd__(self, other):
+        return BinOp("+", as_expr(other), self)
+
+    def __sub__(self, other):
+        return BinOp("-", self, as_expr(other))
+
+    def __rsub__(self, other):
+        return BinOp("-", as_expr(other), self)
+
+    def __mul__(self, other):
+        return BinOp("*", self, as_expr(other))
+
+    def __rmul__(self, other):
+        return BinOp("*", as_expr(other), self)
+
+    def __truediv__(self, other):
+        return BinOp("/", self, as_expr(other))
+
+    def __rtruediv__(self, other):
+        return BinOp("/", as_expr(other), self)
+
+    def pct_change(self) -> "Expr":
+        """change (as a fraction) over previous period of the same company"""
+        return PctChange(self)
+
+    def rolling_mean2(self) -> "Expr":
+        """average of this period's & previous period's value (e.g. average inventory)"""
+        return RollingMean2(self)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, Expr) and self.key == other.key
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.key[1:]}"
+
+
+class Const(Expr):
+    def __init__(self, value: float):
+        self.value = float(value)
+        self.key = ("const", self.value)
+
+    def compute(self, inputs, context):
+        return np.full(context.nrows, self.value)
+
+
+class Item(Expr):
+    """
+    A statement line item, e.g. Item("balance_sheet", "Total Assets")
+
+    Args:
+        statement (str) - name of statement (one of FinancialStatements.STATEMENT_NAMES)
+        name (str) - name of line item, as reported by Yahoo! Finance
+        default (float) - value used for companies that don't report this line item
+            at all (default: NaN)
+    """
+
+    def __init__(self, statement: str, name: str, default: float = np.nan):
+        self.statement = statement
+        self.name = name
+        self.default = default
+        self.key = ("item", statement, name, default)
+
+    def compute(self, inputs, context):
+        values = context.col(self.statement, self.name)
+        if not np.isnan(self.default):
+            values = np.where(context.reported(values), values, self.default)
+        return values
+
+
+class Info(Expr):
+    """a yf.Ticker.info field (e.g. "marketCap"), repeated for each period of the company"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.key = ("info", field)
+
+    def compute(self, inputs, context):
+        return context.info_field(self.field)
+
+
+class BinOp(Expr):
+    OPS = {
+        "+": np.add,
+        "-": np.subtract,
+        "*": np.multiply,
+        "/": np.divide,
+    }
+
+    def __init__(self, op: str, left: Expr, right: Expr):
+        self.op = op
+        self.deps = (left, right)
+        self.key = ("binop", op, left.key, right.key)
+
+    def compute(self, inputs, context):
+        return self.OPS[self.op](inputs[0], inputs[1])
+
+
+class PctChange(Expr):
+    """change over the same period of the previous year (previous year, for annual data)"""
+
+    def __init__(self, expr: Expr):
+        self.deps = (expr,)
+        self.key = ("pct_change", expr.key)
+
+    def compute(self, inputs, context):
+        return inputs[0] / context.year_ago(inputs[0]) - 1.0
+
+
+class RollingMean2(Expr):
+    """average of value at the start & end of a year (previous & current year, for annual data)"""
+
+    def __init__(self, expr: Expr):
+        self.deps = (expr,)
+        self.key = ("rolling_mean2", expr.key)
+
+    def compute(self, inputs, context):
+        return (inputs[0] + context.year_ago(inputs[0])) / 2.0
+
+
+class TTMSum(Expr):
+    """trailing-twelve-month total of a flow (income statement or cash flow line item)"""
+
+    def __init__(self, expr: Expr):
+        self.deps = (expr,)
+        self.key = ("ttm_sum", expr.key)
+
+    def compute(self, inputs, context):
+        return context.rolling_sum(inputs[0], context.periods_per_year)
+
+
+class AvgBalance(Expr):
+    """average of a balance over the trailing twelve months (opening & closing balances)"""
+
+    def __init__(self, expr: Expr):
+        self.deps = (expr,)
+        self.key = ("avg_balance", expr.key)
+
+    def compute(self, inputs, context):
+        return (inputs[0] + context.year_ago(inputs[0])) / 2.0
+
+
+class Coalesce(Expr):
+    """value of `first` for companies that report it, else value of `fallback`"""
+
+    def __init__(self, first: Expr, fallback: Expr):
+        self.deps = (first, fallback)
+        self.key = ("coalesce", first.key, fallback.key)
+
+    def compute(self, inputs, context):
+        return np.where(context.reported(inputs[0]), inputs[0], inputs[1])
+
+
+def as_expr(value: Union[Expr, float]) -> Expr:
+    return value if isinstance(value, Expr) else Const(value)
+
+
+# statements whose line items are flows over a period (the rest are point-in-time balances)
+FLOW_STATEMENTS = ("financials", "income_stmt", "cash_flow")
+# pseudo-statement of closing share prices at each period-end (see panel.add_prices)
+PRICE_STATEMENT = "prices"
+
+
+def _walk(expr: Expr):
+    yield expr
+    for dep in expr.deps:
+        yield from _walk(dep)
+
+
+def _has_flow(expr: Expr) -> bool:
+    return any(
+        isinstance(node, Item) and node.statement in FLOW_STATEMENTS
+        for node in _walk(expr)
+    )
+
+
+def _is_balance_only(expr: Expr) -> bool:
+    """True if expr only uses balance sheet line items (& constants)"""
+    return not any(
+        isinstance(node, Info)
+        or (
+            isinstance(node, Item)
+            and (node.statement in FLOW_STATEMENTS or node.statement == PRICE_STATEMENT)
+        )
+        for node in _walk(expr)
+    )
+
+
+def uses_earlier_periods(expr: Expr) -> bool:
+    """True if value of expr for a period also depends on values of earlier periods"""
+    return any(
+        isinstance(node, (PctChange, RollingMean2, TTMSum, AvgBalance))
+        for node in _walk(expr)
+    )
+
+
+def lookback_periods(expr: Expr, periods_per_year: int = 1) -> int:
+    """
+    number of earlier periods (rows) the value of expr for a period depends on, e.g. 1 for
+    annual growth metrics, 7 for growth of a TTM total over quarterly statements
+    """
+    own = 0
+    if isinstance(expr, (PctChange, RollingMean2, AvgBalance)):
+        own = periods_per_year
+    elif isinstance(expr, TTMSum):
+        own = periods_per_year - 1
+    inputs = [lookback_periods(dep, periods_per_year) for dep in expr.deps]
+    return own + max(inputs, default=0)
+
+
+def to_ttm(expr: Expr, average_balances: bool = False) -> Expr:
+    """
+    Rewrites a ratio expression declared over annual statements so that it can be
+    evaluated over quarterly statements, as a trailing-twelve-month (TTM) ratio
+        - flows (income statement & cash flow line items) become TTM totals
+        - balances that are divided into (or divide) a flow, such as equity in RoE or
+          total assets in asset turnover, are averaged over the TTM window
+        - ratios of balances (e.g. current ratio, D/E) stay point-in-time, as does
+          market cap (price x shares at the quarter-end) in valuation ratios
+    Growth (pct_change) & rolling_mean2 compare with the same quarter of the previous
+    year, because the evaluation context lags quarterly data by 4 periods.
+    """
+    if isinstance(expr, Item):
+        if expr.statement in FLOW_STATEMENTS:
+            return TTMSum(expr)
+        if expr.statement == PRICE_STATEMENT:
+            return expr
+        return AvgBalance(expr) if average_balances else expr
+    if isinstance(expr, BinOp):
+        left, right = expr.deps
+        if expr.op == "/" and _has_flow(left) != _has_flow(right):
+            return BinOp(
+                "/",
+                to_ttm(left, average_balances or _is_balance_only(left)),
+                to_ttm(right, average_balances or _is_balance_only(right)),
+            )
+        return BinOp(
+            expr.op, to_ttm(left, average_balances), to_ttm(right, average_balances)
+        )
+    if isinstance(expr, RollingMean2):
+        # already an average over the year
+        return RollingMean2(to_ttm(expr.deps[0]))
+    if isinstance(expr, PctChange):
+        return PctChange(to_ttm(expr.deps[0], average_balances))
+    if isinstance(expr, Coalesce):
+        return Coalesce(
+            to_ttm(expr.deps[0], average_balances),
+            to_ttm(expr.deps[1], average_balances),
+        )
+    return expr
+
+
+class Ratio:
+    """a registered ratio - its name, expression & the group (ratios.py function) it belongs to"""
+
+    def __init__(self, name: str, expr: Expr, group: str):
+        self.name = name
+        self.expr = expr
+        self.group = group
+
+    @property
+    def uses_earlier_periods(self) -> bool:
+        """True if the ratio needs values of earlier periods (e.g. growth metrics)"""
+        return uses_earlier_periods(self.expr)
+
+    @property
+    def uses_info(self) -> bool:
+        """True if the ratio uses yf.Ticker.info fields (current values, not historical)"""
+        return any(isinstance(node, Info) for node in _walk(self.expr))
+
+    @property
+    def uses_prices(self) -> bool:
+        """True if the ratio uses share prices at period-ends (see panel.add_prices)"""
+        return any(
+            isinstance(node, Item) and node.statement == PRICE_STATEMENT
+            for node in _walk(self.expr)
+        )
+
+    @property
+    def inputs(self) -> List[Tuple[str, str]]:
+        """(statement, line item) pairs the ratio is calculated from"""
+        items = [node for node in _walk(self.expr) if isinstance(node, Item)]
+        return list(dict.fromkeys((item.statement, item.name) for item in items))
+
+    def __repr__(self):
+        return f"Ratio({self.name!r}, group={self.group!r})"
+
+
+# all registered ratios, in the order they were registered
+REGISTRY: Dict[str, Ratio] = {}
+
+
+def register(name: str, expr: Expr, group: str) -> Ratio:
+    """adds a ratio to the registry (replacing any ratio with the same name)"""
+    ratio = Ratio(name, expr, group)
+    REGISTRY[name] = ratio
+    return ratio
+
+
+def ratio_groups() -> Dict[str, List[str]]:
+    """returns names of registered ratios, grouped by their group, in registration order"""
+    groups: Dict[str, List[str]] = {}
+    for ratio in REGISTRY.values():
+        groups.setdefault(ratio.group, []).append(ratio.name)
+    return groups
+
+
+def resolve_names(
+    ratios: Optional[Iterable[str]] = None, groups: Optional[Iterable[str]] = None
+) -> List[str]:
+    """
+    Returns names of ratios to calculate - all ratios of the groups listed plus the
+    ratios listed (all registered ratios if neither is given). Raises KeyError for
+    unknown ratio or group names.
+    """
+    if ratios is None and groups is None:
+        return list(REGISTRY.keys())
+    names = []
+    all_groups = ratio_groups()
+    for group in groups or []:
+        if group not in all_groups:
+            raise KeyError(f"unknown ratio group {group!r}")
+        names.extend(all_groups[group])
+    for name in ratios or []:
+        if name not in REGISTRY:
+            raise KeyError(f"unknown ratio {name!r}")
+        names.append(name)
+    # drop duplicates, keep order
+    return list(dict.fromkeys(names))
+
+
+class Plan:
+    """
+    Compiled dependency graph of a set of ratios. `steps` lists the unique nodes
+    in dependency order - each is evaluated once, however many ratios share it.
+    """
+
+    def __init__(self, names: List[str], exprs: Dict[str, Expr]):
+        self.names = names
+        self.exprs = exprs
+        self.steps: List[Expr] = []
+        seen = set()
+
+        # iterative post-order walk, so inputs always come before the nodes using them
+        for expr in exprs.values():
+            stack = [(expr, False)]
+            while stack:
+                node, inputs_done = stack.pop()
+                if node.key in seen:
+                    continue
+                if inputs_done:
+                    seen.add(node.key)
+                    self.steps.append(node)
+                else:
+                    stack.append((node, True))
+                    stack.extend((dep, False) for dep in reversed(node.deps))
+
+    def evaluate(self, context) -> Dict[str, np.ndarray]:
+        """
+        Evaluates all steps over `context` (see panel.StatementPanel for the interface
+        a context provides) & returns a dict of ratio name -> values
+        """
+        values: Dict[Tuple, np.ndarray] = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for node in self.steps:
+                inputs = [values[dep.key] for dep in node.deps]
+                values[node.key] = node.compute(inputs, context)
+        return {name: values[self.exprs[name].key] for name in self.names}
+
+
+def compile_ratios(
+    ratios: Optional[Iterable[str]] = None,
+    groups: Optional[Iterable[str]] = None,
+    ttm: bool = False,
+) -> Plan:
+    """
+    compiles the requested ratios (see resolve_names) into an evaluation Plan
+    (set ttm=True to evaluate over quarterly statements, see to_ttm)
+    """
+    names = resolve_names(ratios, groups)
+    exprs = {name: REGISTRY[name].expr for name in names}
+    if ttm:
+        exprs = {name: to_ttm(expr) for name, expr in exprs.items()}
+    return Plan(names, exprs)
+
+
+# ---------------------------------------------------------------------------------
+# Ratio definitions - same formulas as the functions in ratios.py
+# ---------------------------------------------------------------------------------
+
+current_assets = Item("balance_sheet", "Current Assets")
+current_liabilities = Item("balance_sheet", "Current Liabilities")
+inventory = Item("balance_sheet", "Inventory")
+cash_equivalents = Item("balance_sheet", "Cash And Cash Equivalents")
+total_assets = Item("balance_sheet", "Total Assets")
+shareholder_equity = Item("balance_sheet", "Stockholders Equity")
+total_debt = Item("balance_sheet", "Total Debt")
+shares_outstanding = Item("balance_sheet", "Ordinary Shares Number")
+
+revenue = Item("financials", "Total Revenue")
+operating_income = Item("financials", "Operating Income")
+net_income = Item("financials", "Net Income")
+cost_of_goods_sold = Item("financials", "Cost Of Revenue")
+ebit = Item("financials", "EBIT")
+interest_expense = Item("financials", "Interest Expense")
+ebidta = Coalesce(
+    Item("financials", "EBIDTA"),
+    operating_income + Item("financials", "Depreciation & Amortization", default=0.0),
+)
+
+free_cash_flow = Item("cash_flow", "Free Cash Flow")
+
+# closing share price at each period-end, so valuation ratios are point-in-time
+price = Item(PRICE_STATEMENT, "Close")
+market_cap = price * shares_outstanding
+eps = net_income / shares_outstanding
+
+# ---- liquidity ratios ----
+register("Current Ratio", current_assets / current_liabilities, "liquidity_ratios")
+register(
+    "Quick Ratio",
+    (current_assets - inventory) / current_liabilities,
+    "liquidity_ratios",
+)
+register("Cash Ratio", cash_equivalents / current_liabilities, "liquidity_ratios")
+
+# ---- profitability ratios ----
+register(
+    "Return on Equity (RoE)", net_income / shareholder_equity, "profitability_ratios"
+)
+register("Return on Assets (RoA)", net_income / total_assets, "profitability_ratios")
+register(
+    "Return on Capital Employed (RoCE)",
+    Item("income_stmt", "EBIT") / (total_assets - current_liabilities),
+    "profitability_ratios",
+)
+register("Net Profit Margin", net_income / revenue, "profitability_ratios")
+register("Operating Margin", operating_income / revenue, "profitability_ratios")
+
+# ---- efficiency ratios ----
+register("Asset Turnover", revenue / total_assets, "efficiency_ratios")
+register(
+    "Inventory Turnover",
+    cost_of_goods_sold / inventory.rolling_mean2(),
+    "efficiency_ratios",
+)
+
+# ---- valuation ratios ----
+register("Price-to-Earnings (P/E)", price / eps, "valuation_ratios")
+register("Price-to-Sales (P/S)", market_cap / revenue, "valuation_ratios")
+register("Price-to-Book (P/B)", market_cap / shareholder_equity, "valuation_ratios")
+register(
+    "EV/EBIDTA",
+    (market_cap + total_debt - cash_equivalents) / ebidta,
+    "valuation_ratios",
+)
+
+# ---- leverage ratios ----
+register("Debt-to-Equity (D/E)", total_debt / shareholder_equity, "leverage_ratios")
+register("Interest Coverage", ebit / interest_expense, "leverage_ratios")
+
+# ---- performance & growth metrics ----
+register(
+    "Revenue Growth (%)", revenue.pct_change() * 100.0, "performance_and_growth_metrics"
+)
+register("EBIT Growth (%)", ebit.pct_change() * 100.0, "performance_and_growth_metrics")
+register(
+    "Net Profit Margin (%)",
+    (net_income / revenue) * 100.0,
+    "performance_and_growth_metrics",
+)
+register("EPS Growth (%)", eps.pct_change() * 100.0, "performance_and_growth_metrics")
+register("EPS", eps, "performance_and_growth_metrics")
+register(
+    "Debt-to-Equity", total_debt / shareholder_equity, "performance_and_growth_metrics"
+)
+register("Free Cash Flow", free_cash_flow, "performance_and_growth_metrics")
+register(
+    "FCF Growth (%)",
+    free_cash_flow.pct_change() * 100.0,
+    "performance_and_growth_metrics",
+)
@@ -0,0 +1,303 @@
+"""
+scores.py - composite accounting scores (Piotroski F, Altman Z & Beneish M) of many companies
+
+Each score combines a handful of balance sheet, income statement & cash flow line items
+of this year & the previous year:
+    - Piotroski F-Score (0-9) - financial strength, one point for each of 9 signals
+      (profitability, leverage & liquidity, operating efficiency). 8-9 is strong,
+      0-2 is weak.
+    - Altman Z-Score - bankruptcy risk, 1.2 x working capital / total assets + 1.4 x
+      retained earnings / total assets + 3.3 x EBIT / total assets + 0.6 x market cap /
+      total liabilities + 1.0 x revenue / total assets. >2.99 is safe, 1.81-2.99 is the
+      grey zone & <1.81 is distress (avoid!)
+    - Beneish M-Score - likelihood that earnings are manipulated, from 8 indices of
+      receivables, margins, asset quality, growth, depreciation, SG&A, leverage &
+      accruals. > -1.78 suggests a likely manipulator (avoid!)
+
+The scores are kernels over a StatementPanel (see panel.py) - each line item is one NumPy
+array over all periods of all companies, so a universe of thousands of companies is
+scored in one pass, from the same (cached) FinancialStatements snapshots & prices as the
+ratios. Line items that a company does not report are handled with masks, rather than
+failing the whole score:
+    - a Piotroski signal whose inputs are missing scores no point & is not counted in
+      "Piotroski Signals" (the number of signals available)
+    - a Beneish index whose inputs are missing is neutral (1, or 0 for accruals) & is
+      counted in "Beneish Imputed Indices"
+    - the Altman Z-Score is NaN unless all its inputs are reported
+The first year of each company has no previous year, so only its Piotroski signals that
+do not compare years are available & its Beneish M-Score is NaN.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .panel import StatementPanel, add_prices, statement_matrix
+from .ratios import FinancialStatements, get_statements
+from .registry import PRICE_STATEMENT
+from .tracing import traced
+
+# columns of each score in score_panel
+SCORE_COLUMNS = {
+    "piotroski": ["Piotroski F-Score", "Piotroski Signals"],
+    "altman": ["Altman Z-Score"],
+    "beneish": ["Beneish M-Score", "Beneish Imputed Indices"],
+}
+
+
+class ScoreInputs:
+    """line items of a StatementPanel, as arrays (TTM totals of flows for quarterly data)"""
+
+    def __init__(self, panel: StatementPanel):
+        self.panel = panel
+
+    def item(self, statement: str, *names: str, default: float = np.nan) -> np.ndarray:
+        """
+        first of the line items `names` that each company reports (Yahoo's names differ
+        between companies, e.g. "Accounts Receivable" or "Receivables"), else default
+        """
+        values = np.full(self.panel.nrows, default)
+        found = np.zeros(self.panel.nrows, dtype=bool)
+        for name in names:
+            col = self.panel.col(statement, name)
+            use = ~found & self.panel.reported(col)
+            values = np.where(use, col, values)
+            found |= use
+        return values
+
+    def flow(self, statement: str, *names: str, default: float = np.nan) -> np.ndarray:
+        """a flow (income statement or cash flow line item), over the trailing year"""
+        values = self.item(statement, *names, default=default)
+        if self.panel.periods_per_year == 1:
+            return values
+        return self.panel.rolling_sum(values, self.panel.periods_per_year)
+
+    def year_ago(self, values: np.ndarray) -> np.ndarray:
+        return self.panel.year_ago(values)
+
+
+def _signal(condition: np.ndarray, *inputs: np.ndarray) -> np.ndarray:
+    # 1.0 / 0.0 for each row, NaN where any input is missing
+    available = np.logical_and.reduce([~np.isnan(i) for i in inputs])
+    return np.where(available, condition.astype(float), np.nan)
+
+
+def piotroski_f_score(inputs: ScoreInputs) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Piotroski F-Score & the number of its 9 signals that could be evaluated
+    (score is NaN where no signal could be evaluated)
+    """
+    total_assets = inputs.item("balance_sheet", "Total Assets")
+    assets_start = inputs.year_ago(total_assets)
+    net_income = inputs.flow("financials", "Net Income")
+    cfo = inputs.flow("cash_flow", "Operating Cash Flow")
+    revenue = inputs.flow("financials", "Total Revenue")
+    gross_profit = inputs.flow("financials", "Gross Profit")
+    gross_profit = np.where(
+        np.isnan(gross_profit),
+        revenue - inputs.flow("financials", "Cost Of Revenue"),
+        gross_profit,
+    )
+    long_term_debt = inputs.item("balance_sheet", "Long Term Debt", "Total Debt")
+    current_ratio = inputs.item("balance_sheet", "Current Assets") / inputs.item(
+        "balance_sheet", "Current Liabilities"
+    )
+    shares = inputs.item("balance_sheet", "Ordinary Shares Number")
+
+    roa = net_income / assets_start
+    leverage = long_term_debt / total_assets
+    gross_margin = gross_profit / revenue
+    asset_turnover = revenue / assets_start
+    prev = inputs.year_ago
+
+    signals = np.vstack(
+        [
+            # profitability
+            _signal(roa > 0, roa),
+            _signal(cfo > 0, cfo),
+            _signal(roa > prev(roa), roa, prev(roa)),
+            _signal(cfo / assets_start > roa, cfo, roa),
+            # leverage, liquidity & source of funds
+            _signal(leverage < prev(leverage), leverage, prev(leverage)),
+            _signal(
+                current_ratio > prev(current_ratio), current_ratio, prev(current_ratio)
+            ),
+            _signal(shares <= prev(shares), shares, prev(shares)),
+            # operating efficiency
+            _signal(
+                gross_margin > prev(gross_margin), gross_margin, prev(gross_margin)
+            ),
+            _signal(
+                asset_turnover > prev(asset_turnover),
+                asset_turnover,
+                prev(asset_turnover),
+            ),
+        ]
+    )
+    available = (~np.isnan(signals)).sum(axis=0)
+    score = np.where(available > 0, np.nansum(signals, axis=0), np.nan)
+    return score, available
+
+
+def altman_z_score(inputs: ScoreInputs) -> np.ndarray:
+    """
+    Altman Z-Score, with market cap at the period-end share price (NaN where any input
+    is missing, including the price)
+    """
+    total_assets = inputs.item("balance_sheet", "Total Assets")
+    working_capital = inputs.item("balance_sheet", "Working Capital")
+    working_capital = np.where(
+        np.isnan(working_capital),
+        inputs.item("balance_sheet", "Current Assets")
+        - inputs.item("balance_sheet", "Current Liabilities"),
+        working_capital,
+    )
+    retained_earnings = inputs.item("balance_sheet", "Retained Earnings")
+    ebit = inputs.flow("financials", "EBIT")
+    total_liabilities = inputs.item(
+        "balance_sheet", "Total Liabilities Net Minority Interest", "Total Liabilities"
+    )
+    market_cap = inputs.item(PRICE_STATEMENT, "Close") * inputs.item(
+        "balance_sheet", "Ordinary Shares Number"
+    )
+    revenue = inputs.flow("financials", "Total Revenue")
+    return (
+        1.2 * working_capital / total_assets
+        + 1.4 * retained_earnings / total_assets
+        + 3.3 * ebit / total_assets
+        + 0.6 * market_cap / total_liabilities
+        + 1.0 * revenue / total_assets
+    )
+
+
+def beneish_m_score(inputs: ScoreInputs) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Beneish M-Score (8-variable model) & the number of its indices that were imputed
+    as neutral because their inputs are missing (score is NaN without revenue & total
+    assets of this year & the previous year)
+    """
+    prev = inputs.year_ago
+    revenue = inputs.flow("financials", "Total Revenue")
+    total_assets = inputs.item("balance_sheet", "Total Assets")
+    receivables = inputs.item("balance_sheet", "Accounts Receivable", "Receivables")
+    cogs = inputs.flow("financials", "Cost Of Revenue")
+    current_assets = inputs.item("balance_sheet", "Current Assets")
+    ppe = inputs.item("balance_sheet", "Net PPE")
+    securities = inputs.item(
+        "balance_sheet", "Available For Sale Securities", default=0.0
+    )
+    depreciation = inputs.flow(
+        "cash_flow", "Depreciation And Amortization", "Depreciation"
+    )
+    depreciation = np.where(
+        np.isnan(depreciation),
+        inputs.flow("financials", "Reconciled Depreciation"),
+        depreciation,
+    )
+    sga = inputs.flow("financials", "Selling General And Administration")
+    current_liabilities = inputs.item("balance_sheet", "Current Liabilities")
+    long_term_debt = inputs.item("balance_sheet", "Long Term Debt", default=0.0)
+    income_continuing = inputs.flow(
+        "financials", "Net Income Continuous Operations", "Net Income"
+    )
+    cfo = inputs.flow("cash_flow", "Operating Cash Flow")
+
+    def change(values: np.ndarray) -> np.ndarray:
+        return values / prev(values)
+
+    receivables_to_sales = receivables / revenue
+    gross_margin = (revenue - cogs) / revenue
+    asset_quality = 1 - (current_assets + ppe + securities) / total_assets
+    depreciation_rate = depreciation / (depreciation + ppe)
+    sga_to_sales = sga / revenue
+    leverage = (current_liabilities + long_term_debt) / total_assets
+
+    # (index, its weight & neutral value)
+    indices = [
+        (change(receivables_to_sales), 0.920, 1.0),  # DSRI
+        (1 / change(gross_margin), 0.528, 1.0),  # GMI
+        (change(asset_quality), 0.404, 1.0),  # AQI
+        (change(revenue), 0.892, 1.0),  # SGI
+        (1 / change(depreciation_rate), 0.115, 1.0),  # DEPI
+        (change(sga_to_sales), -0.172, 1.0),  # SGAI
+        ((income_continuing - cfo) / total_assets, 4.679, 0.0),  # TATA
+        (change(leverage), -0.327, 1.0),  # LVGI
+    ]
+    score = np.full(inputs.panel.nrows, -4.84)
+    imputed = np.zeros(inputs.panel.nrows, dtype=int)
+    for values, weight, neutral in indices:
+        missing = ~np.isfinite(values)
+        score += weight * np.where(missing, neutral, values)
+        imputed += missing
+    core = np.isfinite(change(revenue)) & np.isfinite(change(total_assets))
+    return np.where(core, score, np.nan), imputed
+
+
+@traced("scores.score_panel")
+def score_panel(
+    statements: Iterable[Union[str, FinancialStatements]],
+    scores: Optional[Iterable[str]] = None,
+) -> pd.DataFrame:
+    """
+    Calculates accounting scores of many companies at once
+
+    Args:
+        statements - ticker symbols and/or FinancialStatements snapshots of the companies
+            (annual, or quarterly for scores of trailing-twelve-month flows at each
+            quarter-end)
+        scores - any of "piotroski", "altman" & "beneish" (default: all)
+
+    Returns:
+        a pandas dataframe with a (symbol, fiscal_year) MultiIndex (as panel.ratio_panel)
+        and the SCORE_COLUMNS of each score as columns
+    """
+    scores = list(scores or SCORE_COLUMNS)
+    unknown = set(scores) - set(SCORE_COLUMNS)
+    if unknown:
+        raise KeyError(f"unknown scores {sorted(unknown)}")
+    statements = [get_statements(s) for s in statements]
+    frequencies = {s.frequency for s in statements}
+    if len(frequencies) > 1:
+        raise ValueError("can't mix annual & quarterly statements in one panel")
+    periods_per_year = statements[0].periods_per_year if statements else 1
+
+    matrix = statement_matrix(statements)
+    if "altman" in scores:
+        matrix = add_prices(matrix, statements)
+    inputs = ScoreInputs(StatementPanel(matrix, periods_per_year=periods_per_year))
+    columns: Dict[str, np.ndarray] = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if "piotroski" in scores:
+            columns["Piotroski F-Score"], columns["Piotroski Signals"] = (
+                piotroski_f_score(inputs)
+            )
+        if "altman" in scores:
+            columns["Altman Z-Score"] = altman_z_score(inputs)
+        if "beneish" in scores:
+            columns["Beneish M-Score"], columns["Beneish Imputed Indices"] = (
+                beneish_m_score(inputs)
+            )
+    return pd.DataFrame(columns, index=matrix.index)
+
+
+@traced("scores.accounting_scores")
+def accounting_scores(ticker_symbol: Union[str, FinancialStatements]) -> pd.DataFrame:
+    """
+    Calculates the Piotroski F-Score, Altman Z-Score & Beneish M-Score of a company
+    (see module docstring for how to interpret them)
+
+    Args:
+        ticker_symbol (string) - ticker symbol of company (as on Yahoo! Finance)
+            or a FinancialStatements snapshot of the company, which avoids downloading
+            statements again
+
+    Returns:
+        a pandas dataframe, with datetime index of financial year-end dates
+        and the scores as columns
+    """
+    return score_panel([ticker_symbol]).droplevel("symbol")
@@ -0,0 +1,315 @@
+"""
+statement_cache.py - local on-disk cache for statements downloaded from Yahoo! Finance
+
+Annual statements change only a few times a year, so there is no need to download them
+each time a company is analyzed. This module saves the raw statement frames (as returned
+by yf.Ticker) and the yf.Ticker.info dictionary in a local SQLite database. Statements
+are keyed by symbol, statement name & the latest financial-period-end date they contain:
+a download replaces the copy of the same period, a new financial year adds a row, and
+copies of only the latest `keep_periods` periods are kept (so statements as reported
+earlier can be compared with restated ones, without the database growing forever).
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import json
+import time
+import pickle
+import pathlib
+import sqlite3
+import logging
+import contextlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# cache folder can be changed by setting this environment variable
+CACHE_DIR_ENV_VAR = "FINANCIAL_ANALYST_CACHE_DIR"
+# set this environment variable (to anything) to disable the default cache
+NO_CACHE_ENV_VAR = "FINANCIAL_ANALYST_NO_CACHE"
+
+DEFAULT_CACHE_DIR = pathlib.Path(__file__).parent.parent / "cache"
+
+
+@contextlib.contextmanager
+def connect(db_path: Union[str, pathlib.Path]) -> Iterator[sqlite3.Connection]:
+    """
+    connection to an SQLite database, for use in a with block - committed (or rolled
+    back, on error) & closed when the block ends. A new connection per operation keeps
+    the databases of this package usable across threads.
+    """
+    conn = sqlite3.connect(str(db_path), timeout=30.0)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class StatementCache:
+    """
+    SQLite backed cache of raw statements & company info.
+
+    Args:
+        cache_dir (str or pathlib.Path) - folder where the cache database is created
+            (default: value of FINANCIAL_ANALYST_CACHE_DIR environment variable, else
+            the `cache` folder alongside app.py)
+        ttl_days (float) - number of days after which statements are re-downloaded
+        info_ttl_hours (float) - number of hours after which company info is re-downloaded
+            (info has current market cap & P/E, so it goes stale much faster than statements)
+        symbol_ttl_days (dict) - optional per-symbol overrides of ttl_days
+            (e.g. {"TCS.NS": 1.0} while waiting for TCS to report results)
+        keep_periods (int) - number of latest financial periods whose copies of each
+            statement are kept
+
+    Example:
+        ```python
+        cache = StatementCache(ttl_days=30)
+        statements = FinancialStatements("RELIANCE.NS", cache=cache)
+        print(liquidity_ratios(statements))  # downloads once, then served from cache
+        ```
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl_days: float = 7.0,
+        info_ttl_hours: float = 24.0,
+        symbol_ttl_days: Optional[Dict[str, float]] = None,
+        keep_periods: int = 2,
+    ):
+        if cache_dir is None:
+            cache_dir = os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "statements.sqlite"
+        self.ttl_days = ttl_days
+        self.info_ttl_hours = info_ttl_hours
+        self.symbol_ttl_days = dict(symbol_ttl_days or {})
+        self.keep_periods = max(keep_periods, 1)
+        self._create_tables()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _create_tables(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS statements (
+                    symbol TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    period_end TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (symbol, name, period_end)
+                )
+                """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS info (
+                    symbol TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+                """)
+
+    def ttl_seconds(self, symbol: str) -> float:
+        """returns time-to-live (in seconds) of cached statements for symbol"""
+        return self.symbol_ttl_days.get(symbol, self.ttl_days) * 24 * 60 * 60
+
+    @staticmethod
+    def period_end(frame: pd.DataFrame) -> str:
+        """returns latest financial-period-end date in a raw statement (dates are columns)"""
+        if frame is None or frame.empty:
+            return ""
+        return str(pd.Timestamp(max(frame.columns)).date())
+
+    def latest_period_end(
+        self, symbol: str, name: str = "balance_sheet"
+    ) -> Optional[str]:
+        """returns latest financial-period-end date cached for symbol (None if not cached)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MAX(period_end) FROM statements WHERE symbol = ? AND name = ?",
+                (symbol, name),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _cached_statement(self, symbol: str, name: str):
+        # copy of the latest period
+        with self._connect() as conn:
+            return conn.execute(
+                """
+                SELECT fetched_at, payload FROM statements
+                WHERE symbol = ? AND name = ?
+                ORDER BY period_end DESC LIMIT 1
+                """,
+                (symbol, name),
+            ).fetchone()
+
+    def cached_periods(self, symbol: str, name: str) -> List[str]:
+        """period-end dates of the cached copies of a statement, latest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT period_end FROM statements WHERE symbol = ? AND name = ?
+                ORDER BY period_end DESC
+                """,
+                (symbol, name),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def cached_statement(
+        self, symbol: str, name: str, period_end: Optional[str] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        cached copy of statement `name` whose latest period ends on period_end
+        (default: the latest period), None if there is no such copy
+        """
+        if period_end is None:
+            row = self._cached_statement(symbol, name)
+        else:
+            with self._connect() as conn:
+                row = conn.execute(
+                    """
+                    SELECT fetched_at, payload FROM statements
+                    WHERE symbol = ? AND name = ? AND period_end = ?
+                    """,
+                    (symbol, name, period_end),
+                ).fetchone()
+        return pickle.loads(row[1]) if row is not None else None
+
+    def get_statement(
+        self,
+        symbol: str,
+        name: str,
+        loader: Callable[[], pd.DataFrame],
+        force_refresh: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Returns raw statement `name` (e.g. "balance_sheet") for symbol. The cached copy is
+        returned if it is younger than the TTL, else loader() is called to download it again.
+        If the download fails (or Yahoo! Finance returns an empty frame, as it does when it
+        throttles us) the stale cached copy is returned instead.
+
+        Args:
+            symbol (str) - ticker symbol of company (as on Yahoo! Finance)
+            name (str) - name of statement (attribute of yf.Ticker, e.g. "cash_flow")
+            loader (callable) - function that downloads the statement
+            force_refresh (bool) - download again even if cached copy is fresh
+
+        Returns:
+            the raw statement, in Yahoo's layout (line items x dates)
+        """
+        cached = self._cached_statement(symbol, name)
+        if (
+            cached is not None
+            and not force_refresh
+            and (time.time() - cached[0]) < self.ttl_seconds(symbol)
+        ):
+            return pickle.loads(cached[1])
+
+        try:
+            frame = loader()
+        except Exception as e:
+            if cached is None:
+                raise
+            logger.warning(f"Using stale {name} for {symbol}, download failed: {e}")
+            return pickle.loads(cached[1])
+
+        if (frame is None or frame.empty) and cached is not None:
+            logger.warning(
+                f"Using stale {name} for {symbol}, download returned no data"
+            )
+            return pickle.loads(cached[1])
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO statements VALUES (?, ?, ?, ?, ?)",
+                (
+                    symbol,
+                    name,
+                    self.period_end(frame),
+                    time.time(),
+                    pickle.dumps(frame),
+                ),
+            )
+            conn.execute(
+                """
+                DELETE FROM statements WHERE symbol = ? AND name = ? AND period_end NOT IN (
+                    SELECT period_end FROM statements WHERE symbol = ? AND name = ?
+                    ORDER BY period_end DESC LIMIT ?
+                )
+                """,
+                (symbol, name, symbol, name, self.keep_periods),
+            )
+        return frame
+
+    def get_info(
+        self,
+        symbol: str,
+        loader: Callable[[], Dict[str, Any]],
+        force_refresh: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Returns yf.Ticker(symbol).info, from cache if it is younger than info_ttl_hours
+        (same fallback to stale copy as get_statement, if download fails)
+        """
+        with self._connect() as conn:
+            cached = conn.execute(
+                "SELECT fetched_at, payload FROM info WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        if (
+            cached is not None
+            and not force_refresh
+            and (time.time() - cached[0]) < self.info_ttl_hours * 60 * 60
+        ):
+            return json.loads(cached[1])
+
+        try:
+            info = loader()
+        except Exception as e:
+            if cached is None:
+                raise
+            logger.warning(f"Using stale info for {symbol}, download failed: {e}")
+            return json.loads(cached[1])
+
+        if not info and cached is not None:
+            return json.loads(cached[1])
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO info VALUES (?, ?, ?)",
+                (symbol, time.time(), json.dumps(info, default=str)),
+            )
+        return info
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """removes cached statements & info for symbol (or everything, if symbol is None)"""
+        with self._connect() as conn:
+            if symbol is None:
+                conn.execute("DELETE FROM statements")
+                conn.execute("DELETE FROM info")
+            else:
+                conn.execute("DELETE FROM statements WHERE symbol = ?", (symbol,))
+                conn.execute("DELETE FROM info WHERE symbol = ?", (symbol,))
+
+
+_default_cache: Optional[StatementCache] = None
+
+
+def default_cache() -> Optional[StatementCache]:
+    """
+    Returns the process-wide StatementCache used when a FinancialStatements is created
+    without an explicit cache (returns None if FINANCIAL_ANALYST_NO_CACHE is set)
+    """
+    global _default_cache
+    if os.getenv(NO_CACHE_ENV_VAR):
+        return None
+    if _default_cache is None:
+        _default_cache = StatementCache()
+    return _default_cache
@@ -0,0 +1,182 @@
+"""
+symbol_index.py - offline index of ticker symbols, for instant validation & autocomplete
+
+Checking whether a ticker symbol is valid with yf.Ticker(symbol).info is a network
+call that takes a second or more. This module builds an in-memory index of symbols
+from exchange listing files (such as NASDAQ's nasdaqlisted.txt or NSE's EQUITY_L.csv),
+with a set for O(1) validation & a sorted array for prefix autocomplete (binary search).
+Only symbols that are not in the index need to be checked over the network.
+
+Listing files are CSV (comma or pipe delimited) files with a header row. The symbol
+column is auto-detected (Symbol, SYMBOL, ACT Symbol...) as is the company name column.
+Symbols of exchanges other than US ones carry a suffix on Yahoo! Finance (e.g. .NS for
+NSE, .BO for BSE). Put the suffix just before the file extension of the listing file
+(e.g. EQUITY_L.NS.csv) and it is added to every symbol read from that file.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import csv
+import bisect
+import logging
+import pathlib
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# listing files are read from this folder (override with environment variable below)
+LISTINGS_DIR_ENV_VAR = "FINANCIAL_ANALYST_LISTINGS_DIR"
+DEFAULT_LISTINGS_DIR = pathlib.Path(__file__).parent.parent / "listings"
+
+SYMBOL_COLUMNS = ("Symbol", "SYMBOL", "ACT Symbol", "NASDAQ Symbol", "Ticker")
+NAME_COLUMNS = ("Security Name", "NAME OF COMPANY", "Company Name", "Name", "NAME")
+
+
+class SymbolIndex:
+    """
+    In-memory index of ticker symbols (& company names)
+
+    Args:
+        symbols (iterable) - ticker symbols, as used by Yahoo! Finance (e.g. "TCS.NS")
+        names (dict) - optional symbol -> company name
+
+    Example:
+        ```python
+        index = SymbolIndex.from_listing_file("listings/EQUITY_L.NS.csv")
+        print("TCS.NS" in index)      # True, no network call
+        print(index.complete("TAT"))  # ['TATACHEM.NS', 'TATACOMM.NS', 'TATAELXSI.NS', ...]
+        ```
+    """
+
+    def __init__(self, symbols: Iterable[str], names: Optional[Dict[str, str]] = None):
+        self._sorted: List[str] = sorted({s.strip().upper() for s in symbols if s})
+        self._symbols = frozenset(self._sorted)
+        self.names = {k.upper(): v for k, v in (names or {}).items()}
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.normalize(symbol) is not None
+
+    def normalize(self, symbol: str) -> Optional[str]:
+        """
+        returns symbol as spelled in the index (None if it is not in the index) - upper
+        case, with class shares spelled as on Yahoo! Finance (BRK.B is BRK-B)
+        """
+        symbol = symbol.strip().upper()
+        if symbol in self._symbols:
+            return symbol
+        # either every "." is a class share separator (BRK.B), or the last one starts
+        # the exchange suffix (e.g. ABC.A.TO)
+        base, dot, suffix = symbol.rpartition(".")
+        for candidate in (
+            symbol.replace(".", "-"),
+            base.replace(".", "-") + dot + suffix,
+        ):
+            if candidate in self._symbols:
+                return candidate
+        return None
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """returns (up to limit) symbols starting with prefix, in alphabetical order"""
+        prefix = prefix.strip().upper()
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._sorted, prefix)
+        # every symbol starting with prefix sorts before prefix + highest character
+        end = bisect.bisect_left(self._sorted, prefix + "\uffff", lo=start)
+        return self._sorted[start : min(end, start + limit)]
+
+    def merge(self, other: "SymbolIndex") -> "SymbolIndex":
+        """returns a new index with symbols of both indexes"""
+        return SymbolIndex(
+            self._sorted + other._sorted, names={**self.names, **other.names}
+        )
+
+    @classmethod
+    def from_listing_file(
+        cls,
+        file_path: str,
+        suffix: Optional[str] = None,
+        symbol_column: Optional[str] = None,
+        name_column: Optional[str] = None,
+    ) -> "SymbolIndex":
+        """
+        Builds an index from an exchange listing file.
+
+        Args:
+            file_path (str) - path to the listing file (CSV, comma or pipe delimited)
+            suffix (str) - Yahoo! Finance suffix to add to each symbol (e.g. ".NS").
+                Default is taken from the file name (e.g. ".NS" for EQUITY_L.NS.csv)
+            symbol_column, name_column (str) - column names, auto-detected by default
+        """
+        file_path = pathlib.Path(file_path)
+        if suffix is None:
+            suffixes = file_path.suffixes
+            suffix = suffixes[-2] if len(suffixes) >= 2 else ""
+
+        with open(str(file_path), "r", newline="", encoding="utf-8-sig") as f:
+            # NASDAQ listings are pipe delimited, most others comma delimited
+            header = f.readline()
+            f.seek(0)
+            delimiter = next((d for d in "|\t;" if d in header), ",")
+            reader = csv.DictReader(f, delimiter=delimiter)
+            fields = [c.strip() for c in reader.fieldnames or []]
+            reader.fieldnames = fields
+            symbol_column = symbol_column or next(
+                (c for c in SYMBOL_COLUMNS if c in fields), None
+            )
+            if symbol_column is None:
+                raise ValueError(f"no symbol column found in {file_path}: {fields}")
+            name_column = name_column or next(
+                (c for c in NAME_COLUMNS if c in fields), None
+            )
+
+            symbols, names = [], {}
+            for row in reader:
+                symbol = (row.get(symbol_column) or "").strip()
+                # NASDAQ files end with a "File Creation Time" row
+                if not symbol or " " in symbol:
+                    continue
+                # listings spell class shares BRK.B or BRK/B, Yahoo! Finance BRK-B
+                symbol = f"{symbol.replace('.', '-').replace('/', '-')}{suffix}".upper()
+                symbols.append(symbol)
+                if name_column and row.get(name_column):
+                    names[symbol] = row[name_column].strip()
+        return cls(symbols, names)
+
+
+_default_index: Optional[SymbolIndex] = None
+_default_index_loaded = False
+
+
+def default_symbol_index() -> Optional[SymbolIndex]:
+    """
+    returns index of all listing files in the listings folder (FINANCIAL_ANALYST_LISTINGS_DIR
+    environment variable, else the `listings` folder alongside app.py), loaded once per
+    process. Returns None if there are no listing files. Files that cannot be read as
+    listings (e.g. a README.txt) are skipped, with a warning.
+    """
+    global _default_index, _default_index_loaded
+    if not _default_index_loaded:
+        listings_dir = pathlib.Path(
+            os.getenv(LISTINGS_DIR_ENV_VAR, str(DEFAULT_LISTINGS_DIR))
+        )
+        index = None
+        if listings_dir.is_dir():
+            for file_path in sorted(listings_dir.iterdir()):
+                if file_path.suffix.lower() not in (".csv", ".txt"):
+                    continue
+                try:
+                    file_index = SymbolIndex.from_listing_file(str(file_path))
+                except (OSError, ValueError, csv.Error) as e:
+                    logger.warning(f"Skipping listing file {file_path}: {e}")
+                    continue
+                index = file_index if index is None else index.merge(file_index)
+        _default_index = index
+        _default_index_loaded = True
+    return _default_index
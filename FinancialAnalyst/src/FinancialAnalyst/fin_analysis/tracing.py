@@ -0,0 +1,253 @@
+"""
+tracing.py - lightweight timing of the stages of a report run
+
+A run of the app (validate ticker, download statements, calculate ratios, render
+prompts, call the LLM, write the report) is recorded as a trace of named, timed spans.
+Spans are opened with the `span` context manager or the `traced` decorator (every ratio
+function of ratios.py is decorated) & are recorded only while a `Trace` is active, so
+they cost next to nothing otherwise. Each trace is written to a JSON file, and the
+durations of all traces written so far can be summarized as p50/p95 latencies per stage.
+
+Example:
+    ```python
+    with Trace("TCS.NS") as trace:
+        with span("fetch statements"):
+            statements = FinancialStatements("TCS.NS")
+        ratios = liquidity_ratios(statements)  # recorded as "fira.liquidity_ratios"
+    print(trace.spans_frame())  # spans of this run
+    print(latency_summary())  # p50/p95 of each span over all traces
+    ```
+
+Worker threads do not inherit the active trace - run their work with `propagate(func)`
+to record its spans in the trace of the thread that submitted it.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import json
+import time
+import pathlib
+import functools
+import threading
+import contextlib
+import contextvars
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .statement_cache import CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR
+
+# trace of the current run (None = not tracing) & name of the innermost open span
+_active_trace: contextvars.ContextVar = contextvars.ContextVar(
+    "active_trace", default=None
+)
+_parent_span: contextvars.ContextVar = contextvars.ContextVar(
+    "parent_span", default=None
+)
+
+
+def default_trace_dir() -> pathlib.Path:
+    """traces folder in the statement cache folder"""
+    return pathlib.Path(os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))) / "traces"
+
+
+class Trace:
+    """
+    Timed spans of one run, written to `<trace_dir>/<timestamp>_<name>.json` when the
+    trace ends
+
+    Args:
+        name (str) - name of the run (e.g. the ticker symbol)
+        trace_dir (str or pathlib.Path) - folder of trace files (default: `traces` in
+            the statement cache folder), set write=False to keep the trace in memory only
+        write (bool) - write the trace to a JSON file when it ends
+    """
+
+    def __init__(self, name: str, trace_dir: Optional[str] = None, write: bool = True):
+        self.name = name
+        self.trace_dir = (
+            pathlib.Path(trace_dir) if trace_dir is not None else default_trace_dir()
+        )
+        self.write = write
+        self.spans: List[Dict[str, Any]] = []
+        self.started_at = datetime.now()
+        self.path: Optional[pathlib.Path] = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add_span(self, name: str, start: float, duration: float, **attributes):
+        """records a span (start is a time.perf_counter() value)"""
+        record = {
+            "name": name,
+            "parent": _parent_span.get(),
+            "start": start - self._start,
+            "duration": duration,
+            "thread": threading.current_thread().name,
+        }
+        if attributes:
+            record["attributes"] = attributes
+        with self._lock:
+            self.spans.append(record)
+
+    def __enter__(self) -> "Trace":
+        self._token = _active_trace.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.add_span("total", self._start, time.perf_counter() - self._start)
+        _active_trace.reset(self._token)
+        if self.write:
+            self.save()
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "spans": self.spans,
+        }
+
+    def save(self) -> pathlib.Path:
+        """writes the trace to its JSON file, returns path of the file"""
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%d_%H%M%S_%f")
+        self.path = self.trace_dir / f"{stamp}_{self.name}.json"
+        with open(str(self.path), "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return self.path
+
+    def spans_frame(self) -> pd.DataFrame:
+        """spans of this trace, in order of start time"""
+        with self._lock:
+            spans = list(self.spans)
+        df = pd.DataFrame(
+            spans, columns=["name", "parent", "start", "duration", "thread"]
+        )
+        return df.sort_values("start").reset_index(drop=True)
+
+
+def current_trace() -> Optional[Trace]:
+    """trace of the current run (None if not tracing)"""
+    return _active_trace.get()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """times the enclosed block as span `name` of the active trace (if any)"""
+    trace = _active_trace.get()
+    if trace is None:
+        yield
+        return
+    token = _parent_span.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _parent_span.reset(token)
+        trace.add_span(name, start, time.perf_counter() - start, **attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """decorator - times every call of the function as span `name` (default: its name)"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    returns func bound to a copy of the current context, so spans it records in a worker
+    thread go to the trace (& under the span) of the thread that called propagate
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def load_traces(
+    trace_dir: Optional[str] = None, last: Optional[int] = None
+) -> pd.DataFrame:
+    """spans of all traces (or the `last` n traces) in trace_dir, one row per span"""
+    trace_dir = (
+        pathlib.Path(trace_dir) if trace_dir is not None else default_trace_dir()
+    )
+    paths = sorted(trace_dir.glob("*.json"))
+    if last:
+        paths = paths[-last:]
+    rows = []
+    for path in paths:
+        with open(str(path), "r") as f:
+            trace = json.load(f)
+        for s in trace["spans"]:
+            rows.append(
+                {
+                    "trace": path.stem,
+                    "run": trace["name"],
+                    "name": s["name"],
+                    "duration": s["duration"],
+                }
+            )
+    return pd.DataFrame(rows, columns=["trace", "run", "name", "duration"])
+
+
+def latency_summary(
+    trace_dir: Optional[str] = None, last: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    latency of each span name over all traces (or the `last` n) - number of calls,
+    p50, p95 & max duration (in seconds), slowest stages (by p95) first
+    """
+    spans = load_traces(trace_dir, last)
+    columns = ["calls", "p50 (s)", "p95 (s)", "max (s)", "total (s)"]
+    if spans.empty:
+        return pd.DataFrame(columns=columns)
+    durations = spans.groupby("name")["duration"]
+    summary = pd.DataFrame(
+        {
+            "calls": durations.count(),
+            "p50 (s)": durations.quantile(0.50),
+            "p95 (s)": durations.quantile(0.95),
+            "max (s)": durations.max(),
+            "total (s)": durations.sum(),
+        }
+    )
+    return summary.sort_values("p95 (s)", ascending=False)
+
+
+def latency_histogram(
+    name: str, trace_dir: Optional[str] = None, bins: int = 20
+) -> pd.Series:
+    """
+    histogram of durations of span `name` over all traces - number of spans in each of
+    `bins` log-spaced duration buckets (indexed by upper bound of the bucket, in seconds)
+    """
+    spans = load_traces(trace_dir)
+    durations = spans.loc[spans["name"] == name, "duration"].to_numpy()
+    durations = durations[durations > 0]
+    if durations.size == 0:
+        return pd.Series(dtype=int, name=name)
+    edges = np.geomspace(durations.min(), durations.max() * 1.0001, bins + 1)
+    counts, edges = np.histogram(durations, bins=edges)
+    return pd.Series(counts, index=np.round(edges[1:], 6), name=name)
@@ -0,0 +1,203 @@
+"""
+llm_cache.py - local on-disk cache of LLM responses
+
+Analyzing the same company again (with unchanged statements) builds exactly the same
+prompts, so there is no need to pay for & wait on Gemini again. This module saves LLM
+responses in a local SQLite database, keyed by a hash of the model name, the rendered
+prompt & the generation parameters (temperature etc.). Entries expire after a TTL and
+the least recently used entries are evicted when the cache grows beyond its size limit.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import json
+import time
+import hashlib
+import pathlib
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from fin_analysis.statement_cache import CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR, connect
+from fin_analysis.tracing import span
+
+# LLM attributes (of llama_index LLMs) that change the response to a prompt
+GENERATION_PARAMS = ("temperature", "max_tokens", "top_p", "top_k", "generate_kwargs")
+
+
+def generation_params(llm, **kwargs) -> Dict[str, Any]:
+    """returns model name & generation parameters of llm (plus any per-call kwargs)"""
+    params = {name: getattr(llm, name, None) for name in GENERATION_PARAMS}
+    params["model"] = getattr(llm, "model", type(llm).__name__)
+    params.update(kwargs)
+    return params
+
+
+def cache_key(prompt: str, params: Dict[str, Any]) -> str:
+    """content address of a response - hash of model, generation params & prompt"""
+    payload = json.dumps(params, sort_keys=True, default=str) + "\n" + prompt
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite backed cache of LLM responses.
+
+    Args:
+        cache_dir (str or pathlib.Path) - folder where the cache database is created
+            (default: same folder as the statement cache)
+        ttl_days (float) - number of days after which a response is asked for again
+        max_size_mb (float) - size limit of saved responses, least recently used
+            responses are evicted beyond it
+
+    Example:
+        ```python
+        response_cache = LLMResponseCache()
+        text = response_cache.complete(llm, prompt)  # calls llm.complete(prompt)
+        text = response_cache.complete(llm, prompt)  # returned from cache
+        print(response_cache.stats())  # {'hits': 1, 'misses': 1, ...}
+        ```
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl_days: float = 7.0,
+        max_size_mb: float = 50.0,
+    ):
+        if cache_dir is None:
+            cache_dir = os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "llm_responses.sqlite"
+        self.ttl_days = ttl_days
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._create_tables()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _create_tables(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    response TEXT NOT NULL
+                )
+                """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+            )
+
+    def _count(self, counter: str, n: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, key: str) -> Optional[str]:
+        """returns cached response for key (None if not cached or expired)"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT created_at, response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (now - row[0]) < self.ttl_days * 24 * 60 * 60:
+                conn.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                )
+                self._count("hits")
+                return row[1]
+            if row is not None:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._count("misses")
+        return None
+
+    def put(self, key: str, response: str, model: str = ""):
+        """saves response, evicting least recently used responses beyond max size"""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, now, now, size, response),
+            )
+            total = conn.execute("SELECT SUM(size) FROM responses").fetchone()[0] or 0
+            if total > self.max_size_bytes:
+                evicted = 0
+                rows = conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_used ASC"
+                ).fetchall()
+                for old_key, old_size in rows:
+                    if total <= self.max_size_bytes or old_key == key:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+                self._count("evictions", evicted)
+
+    def complete(self, llm, prompt: str, refresh: bool = False, **kwargs) -> str:
+        """
+        returns text of llm.complete(prompt, **kwargs), from the cache if the same
+        prompt was sent to the same model with the same parameters before
+        (set refresh=True to ask the LLM again & replace the cached response)
+        """
+        params = generation_params(llm, **kwargs)
+        key = cache_key(prompt, params)
+        response = None if refresh else self.get(key)
+        if response is None:
+            with span("llm call"):
+                response = str(llm.complete(prompt, **kwargs))
+            self.put(key, response, model=str(params["model"]))
+        return response
+
+    def stream_complete(
+        self, llm, prompt: str, refresh: bool = False, **kwargs
+    ) -> Iterator[str]:
+        """
+        yields text of llm.stream_complete(prompt, **kwargs) as it is generated, and
+        caches the full response once the stream ends. A cached response (same key
+        as complete) is yielded all at once.
+        """
+        params = generation_params(llm, **kwargs)
+        key = cache_key(prompt, params)
+        response = None if refresh else self.get(key)
+        if response is not None:
+            yield response
+            return
+        chunks = []
+        with span("llm call"):
+            for chunk in llm.stream_complete(prompt, **kwargs):
+                if chunk.delta:
+                    chunks.append(chunk.delta)
+                    yield chunk.delta
+        self.put(key, "".join(chunks), model=str(params["model"]))
+
+    def clear(self):
+        """removes all cached responses"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """hit/miss/eviction counts (of this process) & number/size of cached responses"""
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+        }
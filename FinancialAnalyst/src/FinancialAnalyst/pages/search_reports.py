@@ -0,0 +1,55 @@
+"""
+search_reports.py - Streamlit page to search the analysis reports written so far
+
+Streamlit shows this page (it is in the `pages` folder alongside app.py) in the sidebar
+of the app. Reports are searched with the full-text report index (see report_index.py),
+so past conclusions are found without generating the reports again.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import streamlit as st
+
+# local modules
+from report_index import ReportIndex
+
+
+@st.cache_resource
+def get_report_index() -> ReportIndex:
+    return ReportIndex()
+
+
+def main():
+    st.title("Search Analysis Reports")
+    report_index = get_report_index()
+
+    query = st.text_input(
+        'Search reports (e.g. weak liquidity, "high debt", recommend NOT avoid):'
+    )
+    symbol = st.text_input("Only reports of company (ticker symbol, optional):")
+    limit = st.slider("Max reports", min_value=5, max_value=100, value=20, step=5)
+
+    if not query:
+        reports = report_index.reports(symbol=symbol or None)
+        st.caption(f"{len(reports)} reports indexed")
+        st.dataframe(reports, hide_index=True)
+        return
+
+    results = report_index.search(query, symbol=symbol or None, limit=limit)
+    st.caption(f"{len(results)} matching reports")
+    for row in results.itertuples():
+        with st.expander(f"{row.symbol} - {row.company_name} ({row.created_at})"):
+            st.markdown(row.snippet)
+            st.caption(row.path)
+            if st.checkbox("Show report", key=f"show_{row.id}"):
+                tables = report_index.ratio_tables(row.id)
+                for title, response in report_index.sections(row.id).items():
+                    st.markdown(f"### {title}:")
+                    if title in tables:
+                        st.dataframe(tables[title])
+                    st.markdown(response)
+
+
+main()
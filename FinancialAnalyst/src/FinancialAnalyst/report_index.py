@@ -0,0 +1,389 @@
+"""
+report_index.py - full-text searchable index of the analysis reports
+
+Analysis reports written to the `reports` folder used to be write-only - looking up what
+was concluded about a company meant generating its report all over again. This module
+keeps an SQLite index of the reports, updated as each report is written: symbol, company
+name & time of each report, Gemini's analysis of each section, the overall
+recommendation & the ratio tables. The text is indexed with SQLite's FTS5 full-text
+search, so past conclusions can be searched in milliseconds, & the ratio tables are
+kept as JSON, so they can be read back as pandas dataframes.
+
+Reports written before the index existed can be added with `index_reports_dir`, or from
+the command line:
+    python report_index.py reports/              # index all reports in the folder
+    python report_index.py --search "liquidity"  # search the indexed reports
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import io
+import os
+import re
+import json
+import pathlib
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from fin_analysis.statement_cache import CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR, connect
+
+# section titles of the report (see report_pipeline.SECTIONS) -> column of the index
+SECTION_COLUMNS = {
+    "Liquidity Ratios": "liquidity_ratios",
+    "Profitability Ratios": "profitability_ratios",
+    "Efficiency Ratios": "efficiency_ratios",
+    "Valuation Ratios": "valuation_ratios",
+    "Leverage Ratios": "leverage_ratios",
+    "Performance & Growth Metrics": "performance_and_growth_metrics",
+}
+
+# report files are named `Analysis Report {symbol}_{timestamp}.md`
+REPORT_FILE_PATTERN = re.compile(r"^Analysis Report (.+)_(\d{2}\w{3}\d{4}_\d{6})$")
+REPORT_TIMESTAMP_FORMAT = "%d%b%Y_%H%M%S"
+
+
+def parse_markdown_table(text: str) -> pd.DataFrame:
+    """
+    reads a markdown (pipe) table, as written by DataFrame.to_markdown, back into a
+    dataframe - first column is the index, numeric columns are converted to floats
+    """
+    rows = []
+    for line in text.strip().splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            continue
+        cells = [cell.strip() for cell in line.strip("|").split("|")]
+        # skip the |:---|---:| line below the header
+        if all(re.fullmatch(r":?-+:?", cell) for cell in cells if cell):
+            continue
+        rows.append(cells)
+    if not rows:
+        return pd.DataFrame()
+    header, body = rows[0], rows[1:]
+    df = pd.DataFrame([row[1:] for row in body], columns=header[1:])
+    df = df.apply(pd.to_numeric, errors="coerce")
+    df.index = [row[0] for row in body]
+    return df
+
+
+def parse_report(text: str) -> Dict:
+    """
+    splits the markdown text of a report (as written by report_pipeline) into company
+    name, business summary, ratio table & analysis of each section & overall
+    recommendation
+    """
+    titles = "|".join(re.escape(title) for title in SECTION_COLUMNS)
+    parts = re.split(rf"^### ({titles}):\s*$", text, flags=re.MULTILINE)
+    header, sections = parts[0], parts[1:]
+
+    name = re.search(r"^\*\*Company Name:\*\*\s*(.*)$", header, flags=re.MULTILINE)
+    summary = header.split("## Financial Ratios")[0]
+    summary = summary[name.end() :] if name else ""
+
+    parsed = {
+        "company_name": name.group(1).strip() if name else "",
+        "business_summary": summary.strip(),
+        "tables": {},
+        "responses": {},
+        "overall": "",
+    }
+    for title, body in zip(sections[0::2], sections[1::2]):
+        lines = body.strip().splitlines()
+        n_table_lines = 0
+        while n_table_lines < len(lines) and lines[n_table_lines].startswith("|"):
+            n_table_lines += 1
+        parsed["tables"][title] = parse_markdown_table("\n".join(lines[:n_table_lines]))
+        parsed["responses"][title] = "\n".join(lines[n_table_lines:]).strip()
+
+    # overall recommendation follows the analysis of the last section
+    if sections:
+        last_title = sections[-2]
+        last = parsed["responses"][last_title]
+        match = re.search(r"^#+\s*Overall Recommendation", last, flags=re.MULTILINE)
+        if match:
+            parsed["responses"][last_title] = last[: match.start()].strip()
+            parsed["overall"] = last[match.start() :].strip()
+    return parsed
+
+
+def _quote_query(query: str) -> str:
+    """quotes each word, so text such as D/E or P/E is not read as FTS5 query syntax"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+class ReportIndex:
+    """
+    SQLite FTS5 index of analysis reports
+
+    Args:
+        cache_dir (str or pathlib.Path) - folder where the index database is created
+            (default: same folder as the statement cache)
+
+    Example:
+        ```python
+        report_index = ReportIndex()
+        report_index.add_report_file("reports/Analysis Report TCS.NS_18Oct2024_101500.md")
+        print(report_index.search("strong liquidity", symbol="TCS.NS"))
+        tables = report_index.ratio_tables(report_id=1)  # section title -> dataframe
+        ```
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        if cache_dir is None:
+            cache_dir = os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "reports.sqlite"
+        self._lock = threading.Lock()
+        self._create_tables()
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _create_tables(self):
+        section_columns = ", ".join(SECTION_COLUMNS.values())
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    id INTEGER PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    company_name TEXT NOT NULL,
+                    path TEXT NOT NULL UNIQUE,
+                    ratio_tables TEXT NOT NULL
+                )
+                """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS reports_symbol ON reports (symbol, created_at)"
+            )
+            # text of the reports, rowid is the id of the report
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS report_text USING fts5 (
+                    symbol, company_name, business_summary, {section_columns},
+                    overall_recommendation, ratio_tables
+                )
+                """)
+
+    def add_report(
+        self,
+        symbol: str,
+        report_file_path: str,
+        company_name: str,
+        business_summary: str,
+        titles: Sequence[str],
+        tables: Sequence[pd.DataFrame],
+        responses: Sequence[str],
+        overall: str,
+        created_at: Optional[datetime] = None,
+    ) -> int:
+        """
+        Adds a report to the index (replacing an earlier entry of the same file),
+        returns the id of the report
+
+        Args:
+            symbol, company_name, business_summary - company the report is about
+            report_file_path - path of the report file
+            titles, tables, responses - title, ratio table & LLM analysis of each section
+            overall - overall recommendation
+            created_at - time the report was written (default: now)
+        """
+        created_at = (created_at or datetime.now()).isoformat(timespec="seconds")
+        ratio_tables = json.dumps(
+            {
+                title: table.to_json(orient="split", date_format="iso")
+                for title, table in zip(titles, tables)
+            }
+        )
+        sections = {column: "" for column in SECTION_COLUMNS.values()}
+        for title, response in zip(titles, responses):
+            sections[SECTION_COLUMNS[title]] = response
+        tables_text = "\n\n".join(
+            f"{title}\n{table.to_string()}" for title, table in zip(titles, tables)
+        )
+
+        with self._lock, self._connect() as conn:
+            old = conn.execute(
+                "SELECT id FROM reports WHERE path = ?", (str(report_file_path),)
+            ).fetchone()
+            if old is not None:
+                conn.execute("DELETE FROM reports WHERE id = ?", old)
+                conn.execute("DELETE FROM report_text WHERE rowid = ?", old)
+            report_id = conn.execute(
+                "INSERT INTO reports (symbol, created_at, company_name, path, "
+                "ratio_tables) VALUES (?, ?, ?, ?, ?)",
+                (symbol, created_at, company_name, str(report_file_path), ratio_tables),
+            ).lastrowid
+            conn.execute(
+                f"INSERT INTO report_text (rowid, symbol, company_name, "
+                f"business_summary, {', '.join(sections)}, overall_recommendation, "
+                f"ratio_tables) VALUES ({', '.join('?' * (len(sections) + 6))})",
+                (
+                    report_id,
+                    symbol,
+                    company_name,
+                    business_summary,
+                    *sections.values(),
+                    overall,
+                    tables_text,
+                ),
+            )
+        return report_id
+
+    def add_report_file(self, report_file_path: str) -> int:
+        """adds a report file (as written by report_pipeline.write_report) to the index"""
+        path = pathlib.Path(report_file_path)
+        match = REPORT_FILE_PATTERN.match(path.stem)
+        if match:
+            symbol = match.group(1)
+            created_at = datetime.strptime(match.group(2), REPORT_TIMESTAMP_FORMAT)
+        else:
+            symbol = path.stem
+            created_at = datetime.fromtimestamp(path.stat().st_mtime)
+        parsed = parse_report(path.read_text(encoding="utf-8"))
+        return self.add_report(
+            symbol,
+            str(path),
+            parsed["company_name"],
+            parsed["business_summary"],
+            list(parsed["tables"]),
+            list(parsed["tables"].values()),
+            list(parsed["responses"].values()),
+            parsed["overall"],
+            created_at=created_at,
+        )
+
+    def search(
+        self, query: str, symbol: Optional[str] = None, limit: int = 20
+    ) -> pd.DataFrame:
+        """
+        Full-text search of the reports, best matches first
+
+        Args:
+            query - words to search for (FTS5 query syntax, e.g. "liquidity AND weak",
+                "strong NOT debt" or "current ratio*"). Text that is not a valid query
+                (e.g. "D/E > 2") is searched for word by word.
+            symbol - search only the reports of this company
+            limit - max number of reports returned
+
+        Returns:
+            a dataframe with id, symbol, created_at, company_name, path & snippet
+            (matching text, with the matched words in bold) of each report
+        """
+        sql = (
+            "SELECT r.id, r.symbol, r.created_at, r.company_name, r.path, "
+            "snippet(report_text, -1, '**', '**', '...', 24) AS snippet "
+            "FROM report_text JOIN reports r ON r.id = report_text.rowid "
+            "WHERE report_text MATCH ?"
+        )
+        if symbol:
+            sql += " AND r.symbol = ?"
+        sql += " ORDER BY bm25(report_text) LIMIT ?"
+        columns = ["id", "symbol", "created_at", "company_name", "path", "snippet"]
+
+        def run(match_query: str):
+            params = [match_query] + ([symbol] if symbol else []) + [limit]
+            with self._connect() as conn:
+                return conn.execute(sql, params).fetchall()
+
+        if not query.strip():
+            return pd.DataFrame(columns=columns)
+        try:
+            rows = run(query)
+        except sqlite3.OperationalError:
+            rows = run(_quote_query(query))
+        return pd.DataFrame(rows, columns=columns)
+
+    def reports(self, symbol: Optional[str] = None) -> pd.DataFrame:
+        """indexed reports (of one company, or all), latest first"""
+        sql = "SELECT id, symbol, created_at, company_name, path FROM reports"
+        params = []
+        if symbol:
+            sql += " WHERE symbol = ?"
+            params.append(symbol)
+        sql += " ORDER BY created_at DESC"
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return pd.DataFrame(
+            rows, columns=["id", "symbol", "created_at", "company_name", "path"]
+        )
+
+    def sections(self, report_id: int) -> Dict[str, str]:
+        """LLM analysis of each section & the overall recommendation of a report"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(SECTION_COLUMNS.values())}, overall_recommendation "
+                f"FROM report_text WHERE rowid = ?",
+                (report_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"no report with id {report_id} in the report index")
+        return dict(zip(list(SECTION_COLUMNS) + ["Overall Recommendation"], row))
+
+    def ratio_tables(self, report_id: int) -> Dict[str, pd.DataFrame]:
+        """ratio tables of a report, section title -> dataframe"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT ratio_tables FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"no report with id {report_id} in the report index")
+        return {
+            title: pd.read_json(io.StringIO(table), orient="split")
+            for title, table in json.loads(row[0]).items()
+        }
+
+
+_default_report_index: Optional[ReportIndex] = None
+
+
+def default_report_index() -> ReportIndex:
+    """Returns the process-wide ReportIndex (in the statement cache folder)"""
+    global _default_report_index
+    if _default_report_index is None:
+        _default_report_index = ReportIndex()
+    return _default_report_index
+
+
+def index_reports_dir(
+    reports_dir: str, report_index: Optional[ReportIndex] = None
+) -> List[int]:
+    """adds all report files in reports_dir to the index, returns their ids"""
+    report_index = report_index or default_report_index()
+    return [
+        report_index.add_report_file(path)
+        for path in sorted(pathlib.Path(reports_dir).glob("Analysis Report *.md"))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index & search analysis reports (see report_index.py)"
+    )
+    parser.add_argument(
+        "reports_dir", nargs="?", help="add all reports in this folder to the index"
+    )
+    parser.add_argument("--search", metavar="QUERY", help="search indexed reports")
+    parser.add_argument("--symbol", help="search only reports of this company")
+    args = parser.parse_args()
+    if not args.reports_dir and not args.search:
+        parser.error("give a reports folder to index and/or --search QUERY")
+
+    if args.reports_dir:
+        report_ids = index_reports_dir(args.reports_dir)
+        print(f"Indexed {len(report_ids)} reports from {args.reports_dir}")
+    if args.search:
+        results = default_report_index().search(args.search, symbol=args.symbol)
+        for row in results.itertuples():
+            print(f"[{row.id}] {row.symbol} {row.created_at} - {row.path}")
+            print(f"    {row.snippet}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+report_pipeline.py - steps of the analysis report, without any Streamlit UI
+
+The Streamlit app (app.py) and the headless batch report generator (batch_reports.py)
+build the same report - company info, the ratio tables of each section, Gemini's
+analysis of each section & the overall recommendation. The steps they share (prompts,
+LLM calls, report text & report file) are in this module. Each report file written is
+also added to the searchable report index (see report_index.py).
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import pathlib
+import logging
+import functools
+from datetime import datetime
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import yaml
+
+# local modules
+import fin_analysis.ratios as fira
+from fin_analysis.tracing import propagate, span, traced
+from llm_cache import LLMResponseCache
+from report_index import REPORT_TIMESTAMP_FORMAT, ReportIndex, default_report_index
+from digest import DEFAULT_TOKEN_BUDGET, build_digest
+from structured_analysis import (
+    JSON_GENERATION_CONFIG,
+    StructuredAnalysis,
+    parse_structured_response,
+    ratio_tables_block,
+)
+
+# for supported LLMs
+from llama_index.llms.gemini import Gemini
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core import ChatPromptTemplate
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = "models/gemini-1.5-flash"
+
+config_file_path = pathlib.Path(__file__).parent / "config/prompts.yaml"
+
+# analysis reports are written to this folder
+REPORTS_DIR = pathlib.Path(__file__).parent / "reports"
+
+# report sections - (title, ratio function, prompt in config/prompts.yaml, name of the
+# ratio table field in that prompt)
+SECTIONS = [
+    (
+        "Liquidity Ratios",
+        fira.liquidity_ratios,
+        "liquidity_ratios_analysis_prompt",
+        "liquidity_ratios_table",
+    ),
+    (
+        "Profitability Ratios",
+        fira.profitability_ratios,
+        "profitability_ratios_analysis_prompt",
+        "profitability_ratios_table",
+    ),
+    (
+        "Efficiency Ratios",
+        fira.efficiency_ratios,
+        "efficiency_ratios_analysis_prompt",
+        "efficiency_ratios_table",
+    ),
+    (
+        "Valuation Ratios",
+        fira.valuation_ratios,
+        "valuation_ratios_analysis_prompt",
+        "valuation_ratios_table",
+    ),
+    (
+        "Leverage Ratios",
+        fira.leverage_ratios,
+        "leverage_ratios_analysis_prompt",
+        "leverage_ratios_table",
+    ),
+    (
+        "Performance & Growth Metrics",
+        fira.performance_and_growth_metrics,
+        "performance_and_growth_metrics_prompt",
+        "performance_and_growth_ratios_table",
+    ),
+]
+
+SECTION_TITLES = [title for title, _, _, _ in SECTIONS]
+
+# max number of section analyses requested from Gemini at the same time
+# (keep it within the requests-per-minute limit of your Gemini API key)
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("FINANCIAL_ANALYST_LLM_CONCURRENCY", "3"))
+
+# the overall assessment is asked for with a digest of the sections (key ratios & the
+# verdict of each section), that fits in this many tokens, rather than the whole report
+DIGEST_TOKEN_BUDGET = int(
+    os.getenv("FINANCIAL_ANALYST_DIGEST_TOKENS", str(DEFAULT_TOKEN_BUDGET))
+)
+
+NL2 = "\n\n"
+
+
+def create_llm() -> Gemini:
+    """instantiates the LLM (GOOGLE_API_KEY is read from the environment)"""
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return Gemini(model=LLM_MODEL)
+
+
+@functools.lru_cache(maxsize=None)
+def load_config() -> dict:
+    """loads prompts from config, once per process"""
+    assert (
+        config_file_path.exists()
+    ), f"FATAL ERROR: configuration file {config_file_path} does not exist!"
+
+    config = None
+    with open(str(config_file_path), "r") as f:
+        config = yaml.safe_load(f)
+
+    if config is None:
+        raise RuntimeError(
+            f"FATAL ERROR: unable to read from configuration file at {config_file_path}"
+        )
+    return config
+
+
+@traced("render prompt")
+def build_prompt(prompt_key: str, **kwargs) -> str:
+    """builds chat prompt from system prompt & prompt `prompt_key` in config/prompts.yaml"""
+    config = load_config()
+    messages = [
+        ChatMessage(
+            role=MessageRole.SYSTEM,
+            content=config["prompts"]["system_prompt"],
+        ),
+        ChatMessage(
+            role=MessageRole.USER,
+            content=config["prompts"][prompt_key],
+        ),
+    ]
+    return ChatPromptTemplate(messages).format(**kwargs)
+
+
+def section_tables(statements: fira.FinancialStatements) -> List[pd.DataFrame]:
+    """ratio tables of all report sections (in SECTIONS order)"""
+    return [ratio_func(statements) for _, ratio_func, _, _ in SECTIONS]
+
+
+def section_prompts(company_name: str, tables: List[pd.DataFrame]) -> List[str]:
+    """prompts asking for the analysis of each section (in SECTIONS order)"""
+    return [
+        build_prompt(
+            prompt_key,
+            company_name=company_name,
+            **{table_field: ratio_table.to_markdown()},
+        )
+        for (_, _, prompt_key, table_field), ratio_table in zip(SECTIONS, tables)
+    ]
+
+
+def overall_assessment_prompt(
+    company_name: str, tables: List[pd.DataFrame], responses: List[str]
+) -> str:
+    """prompt asking for the overall recommendation, with a digest of the sections"""
+    digest = build_digest(
+        SECTION_TITLES, tables, responses, token_budget=DIGEST_TOKEN_BUDGET
+    )
+    return build_prompt(
+        "overall_assessment_prompt",
+        company_name=company_name,
+        performance_and_assessment=digest,
+    )
+
+
+def structured_prompt(company_name: str, tables: List[pd.DataFrame]) -> str:
+    """prompt asking for the analyses of all sections as a single JSON object"""
+    return build_prompt(
+        "structured_analysis_prompt",
+        company_name=company_name,
+        ratio_tables=ratio_tables_block(SECTION_TITLES, tables),
+    )
+
+
+def complete_structured(
+    llm, response_cache: LLMResponseCache, prompt: str, refresh: bool = False
+) -> StructuredAnalysis:
+    """
+    asks for the structured analysis & validates it - an invalid response is asked
+    for again once (replacing it in the cache), then ValueError is raised
+    """
+    try:
+        return parse_structured_response(
+            response_cache.complete(
+                llm, prompt, refresh=refresh, generation_config=JSON_GENERATION_CONFIG
+            )
+        )
+    except ValueError:
+        return parse_structured_response(
+            response_cache.complete(
+                llm, prompt, refresh=True, generation_config=JSON_GENERATION_CONFIG
+            )
+        )
+
+
+def structured_responses(analysis: StructuredAnalysis) -> List[str]:
+    """analyses of the sections (in SECTIONS order) from the structured analysis"""
+    return analysis.section_responses(
+        [ratio_func.__name__ for _, ratio_func, _, _ in SECTIONS]
+    )
+
+
+def basic_info(statements: fira.FinancialStatements) -> dict:
+    """
+    company name & business summary for the report. Symbols in the local symbol index
+    are not checked with Yahoo! Finance, which may not know them (e.g. delisted
+    companies), so either can be missing from the info
+    """
+    info = statements.info
+    return {
+        "longName": info.get("longName")
+        or info.get("shortName")
+        or statements.ticker_symbol,
+        "longBusinessSummary": info.get("longBusinessSummary", ""),
+    }
+
+
+def report_header(ticker_symbol: str, info: dict) -> str:
+    """report text before the ratio sections - basic info & business summary"""
+    report = f"## Basic Info for {ticker_symbol}" + NL2
+    report += f"**Company Name:** {info['longName']}" + NL2
+    report += f"{info['longBusinessSummary']}" + NL2
+    report += f"## Financial Ratios" + NL2
+    return report
+
+
+def sections_report(tables: List[pd.DataFrame], responses: List[str]) -> str:
+    """report text of the ratio sections - title, ratio table & LLM analysis of each"""
+    report = ""
+    for title, ratio_table, response in zip(SECTION_TITLES, tables, responses):
+        report += f"### {title}:" + NL2
+        report += ratio_table.to_markdown() + NL2
+        report += response + NL2
+    return report
+
+
+def full_report(
+    ticker_symbol: str,
+    info: dict,
+    tables: List[pd.DataFrame],
+    responses: List[str],
+    overall: str,
+) -> str:
+    """markdown text of the whole report"""
+    report = report_header(ticker_symbol, info)
+    report += sections_report(tables, responses)
+    report += overall + NL2
+    return report
+
+
+def write_report(
+    ticker_symbol: str,
+    info: dict,
+    tables: List[pd.DataFrame],
+    responses: List[str],
+    overall: str,
+    reports_dir: Optional[pathlib.Path] = None,
+    report_index: Optional[ReportIndex] = None,
+) -> pathlib.Path:
+    """
+    writes the report to `Analysis Report {ticker_symbol}_{timestamp}.md` & adds it to
+    the report index (default: report_index.default_report_index())
+    """
+    reports_dir = pathlib.Path(reports_dir) if reports_dir is not None else REPORTS_DIR
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.now()
+    datetime_str = created_at.strftime(REPORT_TIMESTAMP_FORMAT)
+    report_file_path = (
+        reports_dir / f"Analysis Report {ticker_symbol}_{datetime_str}.md"
+    )
+    with span("write report"), open(str(report_file_path), "w") as f:
+        f.write(full_report(ticker_symbol, info, tables, responses, overall))
+
+    # the report file is written even if it could not be indexed
+    try:
+        with span("index report"):
+            (report_index or default_report_index()).add_report(
+                ticker_symbol,
+                str(report_file_path),
+                info["longName"],
+                info["longBusinessSummary"],
+                SECTION_TITLES,
+                tables,
+                responses,
+                overall,
+                created_at=created_at,
+            )
+    except Exception as e:
+        logger.warning(f"Unable to index report {report_file_path}: {e}")
+    return report_file_path
+
+
+def generate_analysis(
+    statements: fira.FinancialStatements,
+    llm,
+    response_cache: LLMResponseCache,
+    structured: bool = False,
+    llm_executor: Optional[Executor] = None,
+    refresh: bool = False,
+) -> Tuple[List[pd.DataFrame], List[str], str]:
+    """
+    Calculates the ratio tables of a company & asks the LLM for the analysis of each
+    section & the overall recommendation, without streaming them anywhere
+
+    Args:
+        statements - statements of the company (with prices, for valuation ratios)
+        llm, response_cache - LLM & the cache of its responses
+        structured - ask for all analyses with a single call (see structured_analysis.py)
+            instead of one call per section & one for the overall assessment
+        llm_executor - LLM calls are run on this executor, so a batch of reports can
+            share one limit on concurrent calls (default: a new pool of
+            MAX_CONCURRENT_LLM_CALLS threads)
+        refresh - ask the LLM again, even for cached responses
+
+    Returns:
+        a tuple of (ratio tables, LLM analysis of each section, overall recommendation)
+    """
+    if llm_executor is None:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LLM_CALLS) as executor:
+            return generate_analysis(
+                statements, llm, response_cache, structured, executor, refresh
+            )
+
+    company_name = basic_info(statements)["longName"]
+    tables = section_tables(statements)
+
+    if structured:
+        prompt = structured_prompt(company_name, tables)
+        analysis = llm_executor.submit(
+            propagate(complete_structured), llm, response_cache, prompt, refresh
+        ).result()
+        return tables, structured_responses(analysis), analysis.overall_recommendation
+
+    # (LLM calls run in worker threads, propagate records their spans in this trace)
+    complete = propagate(response_cache.complete)
+    futures = [
+        llm_executor.submit(complete, llm, prompt, refresh)
+        for prompt in section_prompts(company_name, tables)
+    ]
+    responses = [future.result() for future in futures]
+    prompt = overall_assessment_prompt(company_name, tables, responses)
+    overall = llm_executor.submit(complete, llm, prompt, refresh).result()
+    return tables, responses, overall
@@ -0,0 +1,80 @@
+"""
+screen_query.py - screens the ratios saved in a ratio cube with a query
+
+Runs a query (see fin_analysis/query.py) over the ratios of all companies in a ratio
+cube written by the screener (python screener.py ... --cube PATH), without downloading
+or calculating anything again.
+
+Usage:
+    python screen_query.py "RoE > 0.15 and D/E < 1 and Revenue Growth > 10" --cube nifty500_cube.npy
+    python screen_query.py "Current Ratio < 1 or Interest Coverage < 3" --period 2023
+    python screen_query.py "P/E < 15" --period all --output cheap.csv
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+# local modules
+from fin_analysis.query import QueryError, RatioTable
+from fin_analysis.ratio_cube import RatioCube, default_cube_path
+from screener import write_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Screen the ratios of a ratio cube with a query"
+    )
+    parser.add_argument(
+        "query", help='e.g. "RoE > 0.15 and D/E < 1 and Revenue Growth > 10"'
+    )
+    parser.add_argument(
+        "--cube",
+        default=str(default_cube_path()),
+        metavar="PATH",
+        help=f"ratio cube to screen (default: {default_cube_path()})",
+    )
+    parser.add_argument(
+        "--period",
+        default="latest",
+        help="fiscal year to screen, 'latest' (latest year of each company, default) "
+        "or 'all' (every year of every company)",
+    )
+    parser.add_argument(
+        "-o", "--output", help="write matches to this file (.csv or .parquet)"
+    )
+    args = parser.parse_args()
+
+    period = args.period.lower()
+    if period == "all":
+        period = None
+    elif period != "latest":
+        period = int(period)
+
+    table = RatioTable.from_cube(RatioCube(args.cube), period=period)
+    start_time = time.perf_counter()
+    try:
+        matches = table.screen(args.query)
+    except QueryError as e:
+        print(f"Invalid query: {e}", file=sys.stderr)
+        sys.exit(1)
+    query_time = time.perf_counter() - start_time
+    print(
+        f"{len(matches)} of {len(table)} rows match ({query_time * 1000:.1f} ms)",
+        file=sys.stderr,
+    )
+
+    if args.output:
+        write_frame(matches, pathlib.Path(args.output))
+        print(f"Matches written to {args.output}", file=sys.stderr)
+    else:
+        print(matches.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+screener.py - calculates financial ratios for a universe of companies & ranks them
+
+Reads a list of ticker symbols (one per line, lines starting with # are ignored),
+downloads statements of all companies using a bounded pool of threads, calculates all
+ratios in one go using the vectorized ratio panel and writes the latest year's ratios
+of every company, ranked by a ratio of your choice, to a CSV or Parquet file.
+Companies whose statements could not be downloaded (or are malformed) are written to a
+separate `<output>_failures.csv` file instead of aborting the run.
+
+Usage:
+    python screener.py nifty500.txt --output nifty500_screen.csv
+    python screener.py sp500.txt --output sp500.parquet --rank-by "Debt-to-Equity (D/E)" --ascending
+    python screener.py nifty500.txt --output nifty500_screen.csv --cube nifty500_cube.npy
+    python screener.py sp500.txt --output sp500_factors.csv --factors --factor-weights value=2,quality=1
+    python screener.py nifty500.txt --output quality.csv --where "RoE > 0.15 and D/E < 1"
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+# local modules
+import fin_analysis.ratios as fira
+from fin_analysis.factors import FactorModel, company_sectors, latest_ratios
+from fin_analysis.panel import PANEL_GROUPS, ratio_panel, statement_matrix
+from fin_analysis.query import QueryError, RatioTable, parse_query, ratio_aliases
+from fin_analysis.ratio_cube import RatioCube
+
+
+def read_symbols(symbols_file_path: pathlib.Path) -> List[str]:
+    """reads ticker symbols from file, one per line (blank lines & # comments are skipped)"""
+    symbols = []
+    with open(str(symbols_file_path), "r") as f:
+        for line in f:
+            symbol = line.split("#")[0].strip()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+    return symbols
+
+
+def fetch_statements(
+    symbol: str, force_refresh: bool = False, frequency: str = "annual"
+) -> fira.FinancialStatements:
+    """downloads (or reads from cache) all statements & info needed for the ratios"""
+    statements = fira.FinancialStatements(
+        symbol, force_refresh=force_refresh, frequency=frequency
+    )
+    if not fira.is_valid_ticker(statements):
+        raise ValueError(f"{symbol} appears to be an invalid ticker symbol")
+    for name in fira.FinancialStatements.STATEMENT_NAMES:
+        if getattr(statements, name).empty:
+            raise ValueError(f"no {name} data available for {symbol}")
+    # statements the ratio panel can't stack (e.g. values that aren't numbers) fail
+    # here, for this symbol only, instead of aborting the panel of all symbols
+    try:
+        statement_matrix([statements])
+    except Exception as e:
+        raise ValueError(f"malformed statements for {symbol}: {e}") from e
+    return statements
+
+
+def fetch_universe(
+    symbols: List[str],
+    max_workers: int = 8,
+    force_refresh: bool = False,
+    frequency: str = "annual",
+) -> Tuple[List[fira.FinancialStatements], Dict[str, str]]:
+    """
+    Downloads statements of all symbols using a pool of max_workers threads
+
+    Returns:
+        a tuple of (list of FinancialStatements, dict of symbol -> error message
+        for symbols that failed)
+    """
+    fetched: Dict[str, fira.FinancialStatements] = {}
+    failures: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_statements, symbol, force_refresh, frequency): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                fetched[symbol] = future.result()
+            except Exception as e:
+                failures[symbol] = f"{type(e).__name__}: {e}"
+    # keep the order of the symbols file
+    return [fetched[s] for s in symbols if s in fetched], failures
+
+
+def rank_latest(
+    panel: pd.DataFrame, rank_by: str, ascending: bool = False
+) -> pd.DataFrame:
+    """returns latest period's ratios of each company, ranked by column rank_by"""
+    latest = panel.groupby(level="symbol").tail(1).reset_index(level="fiscal_year")
+    latest = latest.sort_values(rank_by, ascending=ascending, na_position="last")
+    latest.insert(0, "Rank", latest[rank_by].rank(ascending=ascending, method="min"))
+    return latest
+
+
+def parse_weights(weights: str) -> Dict[str, float]:
+    """parses factor weights, e.g. "value=2,quality=1,growth=1" """
+    parsed = {}
+    for item in filter(None, (w.strip() for w in weights.split(","))):
+        factor, _, weight = item.partition("=")
+        parsed[factor.strip()] = float(weight) if weight else 1.0
+    return parsed
+
+
+def rank_factors(
+    panel: pd.DataFrame,
+    statements: List[fira.FinancialStatements],
+    weights: Dict[str, float],
+) -> pd.DataFrame:
+    """
+    returns latest period's ratios of each company with its factor scores, ranked by
+    the composite factor score (see fin_analysis/factors.py)
+    """
+    model = FactorModel(weights=weights)
+    model.fit(latest_ratios(panel), company_sectors(statements))
+    latest = panel.groupby(level="symbol").tail(1).reset_index(level="fiscal_year")
+    return model.scores().join(latest)
+
+
+def write_frame(df: pd.DataFrame, output_path: pathlib.Path, index: bool = True):
+    if output_path.suffix.lower() == ".parquet":
+        df.to_parquet(str(output_path), index=index)
+    else:
+        df.to_csv(str(output_path), index=index)
+
+
+def main():
+    all_ratios = [r for ratios in PANEL_GROUPS.values() for r in ratios]
+
+    parser = argparse.ArgumentParser(
+        description="Calculate & rank financial ratios for a list of companies"
+    )
+    parser.add_argument("symbols_file", help="file with one ticker symbol per line")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="screen.csv",
+        help="output file, .csv or .parquet (default: screen.csv)",
+    )
+    parser.add_argument(
+        "--rank-by",
+        default="Return on Equity (RoE)",
+        choices=all_ratios,
+        metavar="RATIO",
+        help="ratio to rank companies by (default: 'Return on Equity (RoE)')",
+    )
+    parser.add_argument(
+        "--ascending", action="store_true", help="rank lowest values first"
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=8,
+        help="number of threads downloading statements (default: 8)",
+    )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="download statements again, even if cached copies are fresh",
+    )
+    parser.add_argument(
+        "--quarterly",
+        action="store_true",
+        help="use quarterly statements & rank on trailing-twelve-month (TTM) ratios",
+    )
+    parser.add_argument(
+        "--where",
+        metavar="QUERY",
+        help="write only companies whose latest ratios match the query, e.g. "
+        '"RoE > 0.15 and D/E < 1 and Revenue Growth > 10" (see fin_analysis/query.py) '
+        "- ranks are still among all companies",
+    )
+    parser.add_argument(
+        "--factors",
+        action="store_true",
+        help="rank companies by a composite of value, quality & growth scores, each "
+        "ratio standardized within the company's sector (instead of --rank-by)",
+    )
+    parser.add_argument(
+        "--factor-weights",
+        default="value=1,quality=1,growth=1",
+        metavar="WEIGHTS",
+        help="weights of the factors in the composite score with --factors "
+        "(default: value=1,quality=1,growth=1)",
+    )
+    parser.add_argument(
+        "--cube",
+        metavar="PATH",
+        help="also save all years' ratios of all companies to a memory-mapped ratio "
+        "cube (.npy) at PATH, for fast slice queries (see fin_analysis/ratio_cube.py)",
+    )
+    args = parser.parse_args()
+    if args.cube and args.quarterly:
+        parser.error("--cube holds annual ratios, it can't be used with --quarterly")
+    if args.where:
+        try:
+            query_ratios = parse_query(args.where).ratios()
+        except QueryError as e:
+            parser.error(f"invalid --where query: {e}")
+        # check ratio names now, not after all statements are downloaded
+        aliases = ratio_aliases(all_ratios)
+        unknown = [r for r in query_ratios if r.strip().lower() not in aliases]
+        if unknown:
+            parser.error(f"invalid --where query: unknown ratio {unknown[0]!r}")
+
+    symbols = read_symbols(pathlib.Path(args.symbols_file))
+    if not symbols:
+        print(f"No symbols found in {args.symbols_file}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Screening {len(symbols)} symbols from {args.symbols_file}")
+
+    start_time = time.perf_counter()
+    statements, failures = fetch_universe(
+        symbols,
+        max_workers=args.fetch_workers,
+        force_refresh=args.force_refresh,
+        frequency="quarterly" if args.quarterly else "annual",
+    )
+    fetch_time = time.perf_counter() - start_time
+    print(
+        f"Fetched {len(statements)} symbols ({len(failures)} failed) in {fetch_time:.2f}s "
+        f"({len(symbols) / max(fetch_time, 1e-9):.1f} symbols/sec)"
+    )
+
+    compute_start_time = time.perf_counter()
+    panel = ratio_panel(statements)
+    if args.factors:
+        ranked = rank_factors(panel, statements, parse_weights(args.factor_weights))
+    else:
+        ranked = rank_latest(panel, args.rank_by, ascending=args.ascending)
+    if args.where:
+        latest = latest_ratios(panel)
+        matches = latest.index[RatioTable.from_frame(latest).mask(args.where)]
+        ranked = ranked[ranked.index.isin(matches)]
+        print(f"{len(ranked)} companies match {args.where!r}")
+    compute_time = time.perf_counter() - compute_start_time
+    print(
+        f"Calculated ratios in {compute_time:.2f}s "
+        f"({len(statements) / max(compute_time, 1e-9):.1f} symbols/sec)"
+    )
+
+    output_path = pathlib.Path(args.output)
+    write_frame(ranked, output_path)
+    print(f"Ranked ratios written to {output_path}")
+
+    if args.cube:
+        cube = RatioCube.from_panel(panel, args.cube)
+        print(f"{cube} written to {args.cube}")
+
+    if failures:
+        failures_path = output_path.with_name(f"{output_path.stem}_failures.csv")
+        failures_df = pd.DataFrame(
+            sorted(failures.items()), columns=["symbol", "error"]
+        )
+        write_frame(failures_df, failures_path, index=False)
+        print(f"{len(failures)} failures written to {failures_path}")
+
+    total_time = time.perf_counter() - start_time
+    print(
+        f"Screened {len(symbols)} symbols in {total_time:.2f}s "
+        f"({len(symbols) / max(total_time, 1e-9):.1f} symbols/sec)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+structured_analysis.py - analysis of all ratio sections with a single LLM call
+
+Instead of one Gemini call per ratio section plus one for the overall recommendation,
+all six ratio tables are sent in one prompt and Gemini is asked for a JSON object with
+the commentary of each section & the overall recommendation. This module defines the
+schema of that JSON object, validates Gemini's response against it and returns the
+commentary in report section order, so it can be shown in the same layout.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import re
+import json
+from typing import List, Sequence
+
+import pandas as pd
+from pydantic import BaseModel, Field, ValidationError
+
+# per-call generation config that makes Gemini respond with JSON only
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+
+class StructuredAnalysis(BaseModel):
+    """
+    commentary of all report sections, as returned by Gemini - one field per ratio
+    function of fin_analysis/ratios.py (same name), plus the overall recommendation
+    """
+
+    liquidity_ratios: str = Field(min_length=1)
+    profitability_ratios: str = Field(min_length=1)
+    efficiency_ratios: str = Field(min_length=1)
+    valuation_ratios: str = Field(min_length=1)
+    leverage_ratios: str = Field(min_length=1)
+    performance_and_growth_metrics: str = Field(min_length=1)
+    overall_recommendation: str = Field(min_length=1)
+
+    def section_responses(self, field_names: Sequence[str]) -> List[str]:
+        """commentary of the sections, in the order of field_names"""
+        return [getattr(self, name) for name in field_names]
+
+
+def ratio_tables_block(titles: Sequence[str], tables: Sequence[pd.DataFrame]) -> str:
+    """all ratio tables as one markdown block, each under a '### title' heading"""
+    return "\n\n".join(
+        f"### {title}\n{table.to_markdown()}" for title, table in zip(titles, tables)
+    )
+
+
+_JSON_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+def parse_structured_response(text: str) -> StructuredAnalysis:
+    """
+    parses & validates Gemini's JSON response (a ```json fence around it is ignored),
+    raises ValueError if it is not valid JSON or does not match StructuredAnalysis
+    """
+    match = _JSON_FENCE.match(text)
+    if match:
+        text = match.group(1)
+    try:
+        return StructuredAnalysis.model_validate(json.loads(text))
+    except (json.JSONDecodeError, ValidationError) as e:
+        raise ValueError(f"Invalid structured analysis from LLM: {e}") from e
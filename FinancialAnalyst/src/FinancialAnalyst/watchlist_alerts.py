@@ -0,0 +1,132 @@
+"""
+watchlist_alerts.py - refreshes ratio history of a watchlist & raises threshold alerts
+
+Reads a watchlist of ticker symbols (one per line, as for screener.py), downloads
+statements of all companies, refreshes their ratio history (see fin_analysis/history.py)
+and checks the alert rules (see fin_analysis/alerts.py) only for the companies & ratios
+that changed. New alerts are added to the outbox in the statement cache folder & printed.
+
+Usage:
+    python watchlist_alerts.py watchlist.txt --force-refresh
+    python watchlist_alerts.py --add-rule "Expensive" "P/E > 40" "priced for perfection"
+    python watchlist_alerts.py --rules
+    python watchlist_alerts.py --outbox --ack
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import argparse
+import pathlib
+import time
+
+# local modules
+import fin_analysis.ratios as fira
+from fin_analysis.alerts import AlertEngine, AlertRule
+from fin_analysis.query import QueryError
+from screener import fetch_universe, read_symbols
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh ratio history of a watchlist & raise threshold alerts"
+    )
+    parser.add_argument(
+        "symbols_file", nargs="?", help="text file with one ticker symbol per line"
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=8,
+        help="number of threads downloading statements (default: 8)",
+    )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="download statements again, even if cached copies are fresh",
+    )
+    parser.add_argument(
+        "--add-rule",
+        nargs=3,
+        metavar=("NAME", "QUERY", "DESCRIPTION"),
+        help='save an alert rule, e.g. "Expensive" "P/E > 40" "priced for perfection" '
+        "& check it against the stored ratios of all companies",
+    )
+    parser.add_argument("--remove-rule", metavar="NAME", help="delete an alert rule")
+    parser.add_argument("--rules", action="store_true", help="list the alert rules")
+    parser.add_argument(
+        "--outbox", action="store_true", help="print alerts not yet delivered"
+    )
+    parser.add_argument(
+        "--ack",
+        action="store_true",
+        help="mark the alerts printed by --outbox as delivered",
+    )
+    args = parser.parse_args()
+    if not (
+        args.symbols_file
+        or args.add_rule
+        or args.remove_rule
+        or args.rules
+        or args.outbox
+    ):
+        parser.error("give a watchlist file and/or a rule or outbox option")
+
+    engine = AlertEngine()
+    rule = None
+    if args.add_rule:
+        # check the query (& its ratio names) before anything is changed or downloaded
+        try:
+            rule = AlertRule(*args.add_rule)
+            rule.inputs(engine.store.ratios)
+        except QueryError as e:
+            parser.error(f"invalid rule query: {e}")
+
+    if args.remove_rule:
+        engine.remove_rule(args.remove_rule)
+        print(f"Removed rule {args.remove_rule!r}")
+    if rule is not None:
+        engine.add_rule(rule)
+        alerts = engine.scan(rules=[rule.name])
+        print(f"Saved rule {rule.name!r} - {len(alerts)} companies match")
+    if args.rules:
+        for rule in engine.rules.values():
+            print(f"{rule.name}: {rule.expression} - {rule.description}")
+
+    if args.symbols_file:
+        symbols = read_symbols(pathlib.Path(args.symbols_file))
+        start_time = time.perf_counter()
+        statements, failures = fetch_universe(
+            symbols, max_workers=args.fetch_workers, force_refresh=args.force_refresh
+        )
+        # period-end prices of all companies in one bulk download, instead of one
+        # download per company in RatioHistoryStore.refresh
+        fira.load_prices(statements)
+        results = [engine.store.refresh(stmts) for stmts in statements]
+        alerts = engine.process(results)
+        refresh_time = time.perf_counter() - start_time
+        changed = sum(result.changed for result in results)
+        print(
+            f"Refreshed {len(statements)} symbols ({len(failures)} failed, "
+            f"{changed} changed) in {refresh_time:.2f}s - {len(alerts)} new alerts"
+        )
+        for alert in alerts:
+            print(f"  [{alert.event}] {alert.message}")
+        for symbol, error in failures.items():
+            print(f"  failed {symbol}: {error}")
+
+    if args.outbox:
+        alerts = engine.outbox()
+        for alert in alerts:
+            created_at = time.strftime(
+                "%Y-%m-%d %H:%M", time.localtime(alert.created_at)
+            )
+            print(f"[{alert.id}] {created_at} [{alert.event}] {alert.message}")
+        if args.ack:
+            engine.mark_delivered(alert.id for alert in alerts)
+            print(f"Marked {len(alerts)} alerts as delivered")
+
+
+if __name__ == "__main__":
+    main()
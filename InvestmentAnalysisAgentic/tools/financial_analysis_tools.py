@@ -16,6 +16,7 @@ from .ratios import (
     get_valuation_ratios,
     get_leverage_ratios,
     get_performance_and_growth_metrics,
+    get_info,
 )
 
 # created similar to Agno's YFinanceTools
@@ -66,7 +67,7 @@ class FinancialAnalysisTools(Toolkit):
             str: JSON containing company profile and overview.
         """
         try:
-            company_info_full = yf.Ticker(symbol).info
+            company_info_full = get_info(symbol)
             if company_info_full is None:
                 return f"Could not fetch company info for {symbol}"
 
@@ -21,6 +21,9 @@ import json
 import yfinance as yf
 from agno.utils.log import logger
 
+from .statement_cache import default_cache
+from .symbol_index import default_symbol_index
+
 
 # display tweaks
 # Set Pandas to display float values with 4 decimal places
@@ -32,6 +35,36 @@ pd.options.display.max_rows = 100  # before truncation
 np.set_printoptions(precision=4, suppress=True)
 
 
+def get_statement(symbol: str, name: str, force_refresh: bool = False) -> pd.DataFrame:
+    """
+    Returns statement `name` (attribute of yf.Ticker, such as "balance_sheet") for symbol,
+    transposed so rows are financial-year-end dates, sorted by date. Statements are served
+    from the local statement cache, so repeat tool calls do not go back to Yahoo! Finance
+    (force_refresh downloads them again, even if the cached copy is fresh).
+    """
+    cache = default_cache()
+    if cache is None:
+        raw = getattr(yf.Ticker(symbol), name)
+    else:
+        raw = cache.get_statement(
+            symbol,
+            name,
+            loader=lambda: getattr(yf.Ticker(symbol), name),
+            force_refresh=force_refresh,
+        )
+    return raw.transpose().sort_index(ascending=True)
+
+
+def get_info(symbol: str, force_refresh: bool = False) -> dict:
+    """returns yf.Ticker(symbol).info, served from the local statement cache"""
+    cache = default_cache()
+    if cache is None:
+        return yf.Ticker(symbol).info
+    return cache.get_info(
+        symbol, loader=lambda: yf.Ticker(symbol).info, force_refresh=force_refresh
+    )
+
+
 def is_valid_ticker(symbol: str) -> bool:
     """
     Checks if symbol is a valid ticker symbol. For it to be valud, yf.Ticker(symbol).info
@@ -40,10 +73,14 @@ def is_valid_ticker(symbol: str) -> bool:
     Args:
         symbol(str): a ticker symbol (such as "AAPL" or "PERSISTENT.NS")
         (please visit Yahoo Finance website to get valid symbol of company)
+    Symbols found in the local symbol index (see symbol_index.py) are valid without
+    any call to Yahoo! Finance.
     """
+    index = default_symbol_index()
+    if index is not None and symbol.strip().upper() in index:
+        return True
     try:
-        ticker = yf.Ticker(symbol)
-        return "shortName" in ticker.info
+        return "shortName" in get_info(symbol)
     except Exception as e:
         return False
 
@@ -71,13 +108,12 @@ def get_liquidity_ratios(symbol: str) -> pd.DataFrame:
     
     logger.debug(f"Calculatig liquidity ratios for {symbol}")
 
-    ticker = yf.Ticker(symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
+    balance_sheet = get_statement(symbol, "balance_sheet")
 
     current_assets = balance_sheet["Current Assets"]
     current_liabilities = balance_sheet["Current Liabilities"]
     # some companies may not report inventory (e.g. Reliance does, Persistent does not)
-    inventory_fields_exist = "Inventory" in ticker.balance_sheet.index
+    inventory_fields_exist = "Inventory" in balance_sheet.columns
 
     ratios = {}
     ratios["Current Ratio"] = current_assets / current_liabilities
@@ -122,10 +158,9 @@ def get_profitability_ratios(symbol: str) -> pd.DataFrame:
         str: markdown version of the profitability ratios with rows ordered by date
            and columns having values for each of the profitability ratio
     """
-    ticker = yf.Ticker(symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
-    income_stmt = ticker.income_stmt.transpose().sort_index(ascending=True)
+    balance_sheet = get_statement(symbol, "balance_sheet")
+    financials = get_statement(symbol, "financials")
+    income_stmt = get_statement(symbol, "income_stmt")
 
     revenue = financials["Total Revenue"]
     operating_income = financials["Operating Income"]
@@ -168,9 +203,8 @@ def get_efficiency_ratios(symbol: str) -> pd.DataFrame:
         str: markdown version of the efficiency ratios with rows ordered by date
            and columns having values for each of the efficiency ratio
     """
-    ticker = yf.Ticker(symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
+    balance_sheet = get_statement(symbol, "balance_sheet")
+    financials = get_statement(symbol, "financials")
 
     ratios = {}
 
@@ -181,7 +215,7 @@ def get_efficiency_ratios(symbol: str) -> pd.DataFrame:
     # Inventory Data
     # NOTE: inventory may or may not get reported. For example,
     # Tata Motors reports it, Persisteny Systems does not
-    inventory_fields_exist = "Inventory" in ticker.balance_sheet.index
+    inventory_fields_exist = "Inventory" in balance_sheet.columns
     if inventory_fields_exist:
         inventory = balance_sheet["Inventory"]
         average_inventory = inventory.rolling(2).mean()
@@ -224,13 +258,13 @@ def get_valuation_ratios(symbol: str) -> pd.DataFrame:
         str: markdown version of the valuation ratios with rows ordered by date
            and columns having values for each of the valuation ratio
     """
-    ticker = yf.Ticker(symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
+    balance_sheet = get_statement(symbol, "balance_sheet")
+    financials = get_statement(symbol, "financials")
 
     ratios = {}
 
-    market_cap = ticker.info["marketCap"]
+    info = get_info(symbol)
+    market_cap = info["marketCap"]
     revenue = financials["Total Revenue"]
     shareholder_equity = balance_sheet["Stockholders Equity"]
     ebidta = financials.get(
@@ -242,7 +276,7 @@ def get_valuation_ratios(symbol: str) -> pd.DataFrame:
     cash_equivalents = balance_sheet["Cash And Cash Equivalents"]
     ev = market_cap + total_debt - cash_equivalents
 
-    ratios["Price-to-Earnings (P/E)"] = ticker.info["trailingPE"]
+    ratios["Price-to-Earnings (P/E)"] = info["trailingPE"]
     ratios["Price-to-Sales (P/S)"] = market_cap / revenue
     ratios["Price-to-Book (P/B)"] = market_cap / shareholder_equity
     ratios["EV/EBIDTA"] = ev / ebidta
@@ -270,9 +304,8 @@ def get_leverage_ratios(symbol: str) -> pd.DataFrame:
         str: markdown version of the leverage ratios with rows ordered by date
            and columns having values for each of the leverage ratio
     """
-    ticker = yf.Ticker(symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
+    balance_sheet = get_statement(symbol, "balance_sheet")
+    financials = get_statement(symbol, "financials")
 
     total_debt = balance_sheet["Total Debt"]
     shareholder_equity = balance_sheet["Stockholders Equity"]
@@ -333,10 +366,9 @@ def get_performance_and_growth_metrics(symbol: str) -> pd.DataFrame:
         str: markdown version of the performance & growth metrics with rows ordered by date
            and columns having values for each of the performance & growth metric
     """
-    ticker = yf.Ticker(symbol)
-    balance_sheet = ticker.balance_sheet.transpose().sort_index(ascending=True)
-    financials = ticker.financials.transpose().sort_index(ascending=True)
-    cash_flow = ticker.cash_flow.transpose().sort_index(ascending=True)
+    balance_sheet = get_statement(symbol, "balance_sheet")
+    financials = get_statement(symbol, "financials")
+    cash_flow = get_statement(symbol, "cash_flow")
 
     ratios = pd.DataFrame(index=financials.index)
     ratios["Revenue Growth (%)"] = financials["Total Revenue"].pct_change() * 100.0
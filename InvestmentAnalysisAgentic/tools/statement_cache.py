@@ -0,0 +1,142 @@
+"""
+statement_cache.py - local on-disk cache for statements downloaded from Yahoo! Finance
+
+Annual statements change only a few times a year, so there is no need to download them
+each time a tool is called. This module saves the raw statement frames (as returned by
+yf.Ticker) and the yf.Ticker.info dictionary in a local SQLite database, one row per
+symbol & statement, re-downloaded after a TTL. The stale copy is returned when the
+download fails or returns no data.
+
+This is a minimal version of FinancialAnalyst's fin_analysis/statement_cache.py (which
+adds per-symbol TTLs & invalidation), kept here so the tools have no dependency on it.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import time
+import pickle
+import pathlib
+import sqlite3
+import contextlib
+from typing import Any, Callable, Iterator, Optional
+
+from agno.utils.log import logger
+
+# cache folder can be changed by setting this environment variable
+CACHE_DIR_ENV_VAR = "INVESTMENT_ANALYSIS_CACHE_DIR"
+# set this environment variable (to anything) to disable the cache
+NO_CACHE_ENV_VAR = "INVESTMENT_ANALYSIS_NO_CACHE"
+
+DEFAULT_CACHE_DIR = pathlib.Path(__file__).parent.parent / "cache"
+
+
+class StatementCache:
+    """
+    SQLite backed cache of raw statements & company info (by default in the `cache`
+    folder in the InvestmentAnalysisAgentic folder)
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl_days: float = 7.0,
+        info_ttl_hours: float = 24.0,
+    ):
+        cache_dir = pathlib.Path(
+            cache_dir or os.getenv(CACHE_DIR_ENV_VAR, str(DEFAULT_CACHE_DIR))
+        )
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = cache_dir / "statements.sqlite"
+        self.ttl_seconds = ttl_days * 24 * 60 * 60
+        self.info_ttl_seconds = info_ttl_hours * 60 * 60
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tool_cache (
+                    key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, payload BLOB NOT NULL
+                )
+                """)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(
+        self,
+        key: str,
+        ttl_seconds: float,
+        loader: Callable[[], Any],
+        force_refresh: bool = False,
+    ) -> Any:
+        # cached value if younger than the TTL, else loader() (stale value on failure)
+        with self._connect() as conn:
+            cached = conn.execute(
+                "SELECT fetched_at, payload FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if (
+            cached is not None
+            and not force_refresh
+            and time.time() - cached[0] < ttl_seconds
+        ):
+            return pickle.loads(cached[1])
+
+        try:
+            value = loader()
+        except Exception as e:
+            if cached is None:
+                raise
+            logger.warning(f"Using stale {key}, download failed: {e}")
+            return pickle.loads(cached[1])
+        empty = value.empty if hasattr(value, "empty") else not value
+        if empty and cached is not None:
+            logger.warning(f"Using stale {key}, download returned no data")
+            return pickle.loads(cached[1])
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?)",
+                (key, time.time(), pickle.dumps(value)),
+            )
+        return value
+
+    def get_statement(
+        self,
+        symbol: str,
+        name: str,
+        loader: Callable[[], Any],
+        force_refresh: bool = False,
+    ) -> Any:
+        """
+        raw statement `name` (attribute of yf.Ticker, e.g. "cash_flow") of symbol
+        (force_refresh downloads again even if the cached copy is fresh)
+        """
+        return self._get(f"{symbol}/{name}", self.ttl_seconds, loader, force_refresh)
+
+    def get_info(
+        self, symbol: str, loader: Callable[[], dict], force_refresh: bool = False
+    ) -> dict:
+        """yf.Ticker(symbol).info (force_refresh as for get_statement)"""
+        return self._get(f"{symbol}/info", self.info_ttl_seconds, loader, force_refresh)
+
+
+_default_cache: Optional[StatementCache] = None
+
+
+def default_cache() -> Optional[StatementCache]:
+    """
+    Returns the process-wide StatementCache used by the ratio tools
+    (returns None if INVESTMENT_ANALYSIS_NO_CACHE is set)
+    """
+    global _default_cache
+    if os.getenv(NO_CACHE_ENV_VAR):
+        return None
+    if _default_cache is None:
+        _default_cache = StatementCache()
+    return _default_cache
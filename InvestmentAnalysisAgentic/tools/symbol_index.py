@@ -0,0 +1,84 @@
+"""
+symbol_index.py - offline set of listed ticker symbols, for instant validation
+
+Checking whether a ticker symbol is valid with yf.Ticker(symbol).info is a network
+call that takes a second or more. This module reads the symbols of exchange listing
+files (such as NASDAQ's nasdaqlisted.txt or NSE's EQUITY_L.csv) in the listings folder
+into a set, so only symbols that are not listed need to be checked over the network.
+Put the Yahoo! Finance suffix of the exchange just before the file extension of the
+listing file (e.g. EQUITY_L.NS.csv) and it is added to every symbol of that file.
+
+This is a minimal version of FinancialAnalyst's fin_analysis/symbol_index.py (which
+adds company names & prefix autocomplete), kept here so the tools have no dependency
+on it.
+
+Author: Manish Bhobe
+My experiments with Python, AI and Generative AI
+Code is meant for learning purposes ONLY!
+"""
+
+import os
+import csv
+import pathlib
+from typing import FrozenSet, Optional
+
+from agno.utils.log import logger
+
+# listing files are read from this folder (override with environment variable below)
+LISTINGS_DIR_ENV_VAR = "INVESTMENT_ANALYSIS_LISTINGS_DIR"
+DEFAULT_LISTINGS_DIR = pathlib.Path(__file__).parent.parent / "listings"
+
+SYMBOL_COLUMNS = ("Symbol", "SYMBOL", "ACT Symbol", "NASDAQ Symbol", "Ticker")
+
+
+def read_listing_file(file_path: pathlib.Path) -> FrozenSet[str]:
+    """symbols of a listing file (CSV, comma or pipe delimited, with a header row)"""
+    suffixes = file_path.suffixes
+    suffix = suffixes[-2] if len(suffixes) >= 2 else ""
+    with open(str(file_path), "r", newline="", encoding="utf-8-sig") as f:
+        header = f.readline()
+        f.seek(0)
+        delimiter = next((d for d in "|\t;" if d in header), ",")
+        reader = csv.DictReader(f, delimiter=delimiter)
+        reader.fieldnames = [c.strip() for c in reader.fieldnames or []]
+        column = next((c for c in SYMBOL_COLUMNS if c in reader.fieldnames), None)
+        if column is None:
+            raise ValueError(f"no symbol column found in {file_path}")
+        symbols = ((row.get(column) or "").strip() for row in reader)
+        # listings spell class shares BRK.B or BRK/B, Yahoo! Finance BRK-B
+        return frozenset(
+            f"{s.replace('.', '-').replace('/', '-')}{suffix}".upper()
+            for s in symbols
+            if s and " " not in s
+        )
+
+
+_default_index: Optional[FrozenSet[str]] = None
+_default_index_loaded = False
+
+
+def default_symbol_index() -> Optional[FrozenSet[str]]:
+    """
+    returns the set of symbols of all listing files in the listings folder
+    (INVESTMENT_ANALYSIS_LISTINGS_DIR environment variable, else the `listings` folder
+    in the InvestmentAnalysisAgentic folder), loaded once per process. Returns None if
+    there are no listing files. Files that cannot be read as listings (e.g. a README.txt)
+    are skipped, with a warning.
+    """
+    global _default_index, _default_index_loaded
+    if not _default_index_loaded:
+        listings_dir = pathlib.Path(
+            os.getenv(LISTINGS_DIR_ENV_VAR, str(DEFAULT_LISTINGS_DIR))
+        )
+        symbol_sets = []
+        if listings_dir.is_dir():
+            for file_path in sorted(listings_dir.iterdir()):
+                if file_path.suffix.lower() not in (".csv", ".txt"):
+                    continue
+                try:
+                    symbol_sets.append(read_listing_file(file_path))
+                except (OSError, ValueError, csv.Error) as e:
+                    logger.warning(f"Skipping listing file {file_path}: {e}")
+        _default_index = frozenset().union(*symbol_sets) if symbol_sets else None
+        _default_index_loaded = True
+    return _default_index